@@ -0,0 +1,88 @@
+"""Rows/sec of the old row-by-row inserts against the batched BulkWriter.
+
+Runs against the local PostgreSQL configured in .secrets/keys.toml and only touches a
+temporary table. Usage:
+
+    python -m benchmarks.bench_bulk_insert --rows 20000 --batch-size 500
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from utils.helpers import connect_to_db
+from utils.bulk_insert import BulkWriter
+
+COLUMNS = ['title', 'link', 'date', 'source', 'text', 'sentiment', 'sentiment_score']
+
+
+def make_rows(n):
+    start = datetime(2024, 1, 1)
+    return [
+        (f"Title {i}", f"https://example.com/{i}", start + timedelta(minutes=i), "bench",
+         "Some article text " * 20, "Positive", 0.25)
+        for i in range(n)
+    ]
+
+
+def create_table(conn):
+    cur = conn.cursor()
+    cur.execute('''CREATE TEMP TABLE IF NOT EXISTS bench_articles (
+        title TEXT,
+        link TEXT,
+        date TIMESTAMP,
+        source TEXT,
+        text TEXT,
+        sentiment TEXT,
+        sentiment_score NUMERIC
+    )''')
+    cur.execute("TRUNCATE bench_articles")
+    conn.commit()
+    cur.close()
+
+
+def row_by_row(conn, rows):
+    """The pattern the ingestion modules used before: one INSERT and one commit per row."""
+    cur = conn.cursor()
+    for row in rows:
+        cur.execute('''INSERT INTO bench_articles (title, link, date, source, text, sentiment, sentiment_score)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)''', row)
+        conn.commit()
+    cur.close()
+
+
+def bulk(conn, rows, method, batch_size):
+    with BulkWriter(conn, 'bench_articles', COLUMNS, batch_size=batch_size, method=method) as writer:
+        writer.add_many(rows)
+
+
+def timed(conn, func, *args):
+    create_table(conn)
+    start = time.perf_counter()
+    func(conn, *args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    conn = connect_to_db()
+
+    results = {}
+    for name, func, extra in [
+        ("row_by_row", row_by_row, ()),
+        ("execute_values", bulk, ("values", args.batch_size)),
+        ("copy", bulk, ("copy", args.batch_size)),
+    ]:
+        seconds = timed(conn, func, rows, *extra)
+        results[name] = {"seconds": round(seconds, 3), "rows_per_sec": round(len(rows) / seconds, 1)}
+
+    conn.close()
+    print(json.dumps({"rows": args.rows, "batch_size": args.batch_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
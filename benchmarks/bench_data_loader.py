@@ -0,0 +1,93 @@
+"""Latency and peak memory of `SELECT *` into pandas against the typed, column-pruned loader.
+
+Fills a scratch article table with synthetic rows (dropped afterwards), then loads the
+(day, sentiment_score) pairs both ways. Peak memory is measured with tracemalloc, which
+sees the pandas/numpy buffers. Runs against the local PostgreSQL configured in
+.secrets/keys.toml. Usage:
+
+    python -m benchmarks.bench_data_loader --articles 1000000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import pandas as pd
+from utils.helpers import connect_to_db, pandas_db_connection
+from utils.bulk_insert import BulkWriter
+from utils.data_loader import load_articles
+
+TABLE = 'bench_loader_articles'
+COLUMNS = ['title', 'link', 'date', 'source', 'text', 'sentiment', 'sentiment_score']
+
+
+def fill_table(conn, n, seed=42):
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(f'''CREATE TABLE {TABLE} (
+        title TEXT,
+        link TEXT,
+        date TIMESTAMP,
+        source TEXT,
+        text TEXT,
+        sentiment TEXT,
+        sentiment_score NUMERIC,
+        day DATE GENERATED ALWAYS AS (date::date) STORED
+    )''')
+    conn.commit()
+    cur.close()
+
+    start = datetime(2020, 1, 1)
+    with BulkWriter(conn, TABLE, COLUMNS, batch_size=20_000) as writer:
+        for i in range(n):
+            score = round(rng.uniform(-1, 1), 4)
+            writer.add((f"Title {i}", f"https://example.com/{i}", start + timedelta(minutes=3 * i),
+                        rng.choice(["Reuters", "Bloomberg", "CNBC"]), "Some article text " * 40,
+                        'Positive' if score > 0 else 'Negative', score))
+
+
+def measure(load):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    frame = load()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return frame, {"seconds": round(seconds, 3), "peak_mb": round(peak / 2**20, 1),
+                   "frame_mb": round(frame.memory_usage(deep=True).sum() / 2**20, 1)}
+
+
+def load_select_all():
+    # What the analysis functions did before: every column, then keep two of them
+    frame = pd.read_sql_query(f"SELECT * FROM {TABLE}", pandas_db_connection())
+    frame['date'] = pd.to_datetime(frame['date']).dt.date
+    return frame[['date', 'sentiment_score']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    fill_table(conn, args.articles)
+
+    try:
+        _, select_all = measure(load_select_all)
+        _, loader = measure(lambda: load_articles(TABLE, ['sentiment_score']))
+    finally:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    print(json.dumps({"articles": args.articles, "select_all": select_all, "data_loader": loader}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
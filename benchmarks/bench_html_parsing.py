@@ -0,0 +1,121 @@
+"""Pages per second and peak memory of the HTML parsing backends over saved fixture pages.
+
+Parses the fixture pages of benchmarks/fixtures/ (an FT listing, an NVIDIA newsroom listing
+and an NVIDIA article) with every available backend of utils/html_parsing.py and with the
+former full-page BeautifulSoup 'html.parser' code as a baseline. Every backend runs in its
+own process so that its peak RSS is not mixed with the others; the results of all the
+backends are also checked to be identical. Usage:
+
+    python -m benchmarks.bench_html_parsing --pages 300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from utils.html_parsing import available_backends, parse_ft_listing, parse_nvidia_listing, parse_article_text
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PARSERS = {
+    "ft_listing": parse_ft_listing,
+    "nvidia_listing": parse_nvidia_listing,
+    "nvidia_article": parse_article_text,
+}
+
+
+def _baseline_ft(html):
+    # The former code: whole page with html.parser, then find/find_all per teaser
+    soup = BeautifulSoup(html, 'html.parser')
+    teasers = []
+    for news in soup.find_all('div', class_='o-teaser__content'):
+        date = news.find('time', class_='o-teaser__timestamp-date')
+        heading = news.find('a', class_='js-teaser-heading-link')
+        standfirst = news.find('p', class_='o-teaser__standfirst')
+        teasers.append((date.get_text().strip() if date else None, heading.get_text().strip() if heading else None,
+                        heading['href'] if heading else None, standfirst.get_text().strip() if standfirst else None))
+    return teasers
+
+
+def _baseline_nvidia(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return [(article.find('span', class_="index-item-text-info-date").get_text().strip(),
+             article.find('a').get_text().strip(), article.find('a').get('href'))
+            for article in soup.find_all('div', class_="index-item-text")]
+
+
+def _baseline_article(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return " ".join([p.get_text() for p in soup.find_all('p')])
+
+
+BASELINE = {"ft_listing": _baseline_ft, "nvidia_listing": _baseline_nvidia, "nvidia_article": _baseline_article}
+
+
+def load_fixtures():
+    fixtures = {}
+    for kind in PARSERS:
+        with open(os.path.join(FIXTURES, f"{kind}.html"), encoding="utf-8") as file:
+            fixtures[kind] = file.read()
+    return fixtures
+
+
+def rss_mb():
+    with open('/proc/self/statm') as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def _run(backend, pages, queue):
+    fixtures = load_fixtures()
+    parse = (lambda kind, html: BASELINE[kind](html)) if backend == "baseline" else \
+        (lambda kind, html: PARSERS[kind](html, backend))
+    results = {kind: parse(kind, html) for kind, html in fixtures.items()}  # Warm up
+
+    report = {"backend": backend, "kinds": {}}
+    rss_before = rss_mb()
+    for kind, html in fixtures.items():
+        start = time.perf_counter()
+        for _ in range(pages):
+            parse(kind, html)
+        elapsed = time.perf_counter() - start
+        # Python allocations of one parse (lxml/selectolax allocate in C, see the RSS figures)
+        tracemalloc.start()
+        parse(kind, html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["kinds"][kind] = {
+            "pages_per_second": round(pages / elapsed, 1),
+            "ms_per_page": round(elapsed / pages * 1000, 3),
+            "python_peak_kb": round(peak / 1024, 1),
+        }
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    report["rss_growth_mb"] = round(rss_mb() - rss_before, 1)
+    queue.put((report, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300, help="Parses of every fixture page per backend")
+    parser.add_argument("--backends", nargs="+", default=["baseline"] + available_backends())
+    args = parser.parse_args()
+
+    reports, outputs = [], {}
+    for backend in args.backends:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run, args=(backend, args.pages, queue))
+        process.start()
+        report, outputs[backend] = queue.get()
+        process.join()
+        reports.append(report)
+
+    reference = outputs.get("bs4") or next(iter(outputs.values()))
+    for report in reports:
+        report["same_result_as_bs4"] = {kind: outputs[report["backend"]][kind] == reference[kind] for kind in PARSERS}
+    print(json.dumps({"pages": args.pages, "fixtures": list(PARSERS), "backends": reports}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
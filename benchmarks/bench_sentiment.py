@@ -0,0 +1,56 @@
+"""Articles/sec of inline TextBlob scoring against the batched SentimentScorer.
+
+Uses a fixed, seeded corpus so runs are comparable, and checks that every score matches
+TextBlob polarity within the tolerance. No database needed. Usage:
+
+    python -m benchmarks.bench_sentiment --articles 2000 --workers 4
+"""
+import argparse
+import json
+import random
+import time
+from utils.sentiment import SentimentScorer, textblob_polarity
+
+WORDS = ("nvidia chips demand strong weak growth record revenue decline great terrible market "
+         "investors good bad profit loss new data center gaming excellent poor stock rally slump "
+         "not very really quite outlook guidance beat miss expectations").split()
+TOLERANCE = 1e-9
+
+
+def make_corpus(n, words_per_article=120, seed=42):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_article)) + "." for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.articles)
+
+    start = time.perf_counter()
+    reference = textblob_polarity(corpus)
+    inline_seconds = time.perf_counter() - start
+
+    scorer = SentimentScorer(workers=args.workers)
+    scorer.scores(corpus[:scorer.min_parallel])  # Start the worker processes outside of the timing
+    start = time.perf_counter()
+    scores = scorer.scores(corpus)
+    pool_seconds = time.perf_counter() - start
+    scorer.close()
+
+    max_diff = max(abs(a - b) for a, b in zip(reference, scores))
+    print(json.dumps({
+        "articles": args.articles,
+        "workers": args.workers,
+        "inline_articles_per_sec": round(args.articles / inline_seconds, 1),
+        "pool_articles_per_sec": round(args.articles / pool_seconds, 1),
+        "max_abs_diff": max_diff,
+        "within_tolerance": max_diff <= TOLERANCE,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
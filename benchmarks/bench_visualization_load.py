@@ -0,0 +1,86 @@
+"""Memory and throughput of /visualization_1 renders under concurrent load.
+
+Renders synthetic NVIDIA closes and sentiment series (no database needed) through the
+render pool, `--concurrency` at a time, for a number of rounds. The resident memory after
+every round should level off instead of growing with the number of renders, and no
+pyplot figure should be left open. Usage:
+
+    python -m benchmarks.bench_visualization_load --renders 200 --concurrency 8 --format png
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from utils.render_pool import run_render, shutdown_render_pool
+from utils.visualization_1 import render_visualization_1
+
+LABELS = ['api_news', 'nvidia_original', 'ft_nvidia']
+
+
+def make_data(days, seed=42):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=days, freq='D')
+    df_nvidia_stock = pd.DataFrame({'date': dates, 'close': 100 + rng.normal(size=days).cumsum()})
+    df_sentiments = pd.concat([
+        pd.DataFrame({'date': dates, 'sentiment_score': rng.normal(0, 0.3, size=days), 'source': label})
+        for label in LABELS
+    ]).sort_values(by='date')
+    return df_nvidia_stock, df_sentiments
+
+
+def rss_mb():
+    with open('/proc/self/statm') as file:
+        pages = int(file.read().split()[1])
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+
+
+async def run(args):
+    df_nvidia_stock, df_sentiments = make_data(args.days)
+    rounds = []
+    start = time.perf_counter()
+    for _ in range(args.renders // args.concurrency):
+        round_start = time.perf_counter()
+        images = await asyncio.gather(*[
+            run_render(render_visualization_1, df_nvidia_stock, df_sentiments, False, args.format, args.dpi)
+            for _ in range(args.concurrency)
+        ])
+        rounds.append({
+            "seconds": round(time.perf_counter() - round_start, 3),
+            "image_bytes": len(images[0]),
+            "rss_mb": rss_mb(),
+        })
+    elapsed = time.perf_counter() - start
+    return rounds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--days", type=int, default=1500)
+    parser.add_argument("--format", default="png", choices=["png", "svg", "webp"])
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args()
+
+    rss_start = rss_mb()
+    rounds, elapsed = asyncio.run(run(args))
+    shutdown_render_pool()
+    renders = len(rounds) * args.concurrency
+    print(json.dumps({
+        "renders": renders,
+        "concurrency": args.concurrency,
+        "format": args.format,
+        "renders_per_second": round(renders / elapsed, 2),
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rounds[-1]["rss_mb"] if rounds else rss_start,
+        "open_pyplot_figures": len(plt.get_fignums()),
+        "rounds": rounds,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Walk-forward backtest time against the number of days: block updates vs refitting.
+
+Uses synthetic features shaped like the /analysis_1 ones (three sentiment scores, two
+closes), so no database is needed. The incremental time per day should stay flat as the
+number of days grows, while refitting grows with the window; with windows of a few hundred
+days or less the two are close. Usage:
+
+    python -m benchmarks.bench_walk_forward --days 2000 4000 8000 --window 750
+"""
+import argparse
+import json
+import time
+import numpy as np
+from utils.walk_forward import walk_forward, refit_walk_forward
+
+TOLERANCE = 1e-6
+
+
+def make_data(days, seed=42):
+    rng = np.random.default_rng(seed)
+    sentiment = rng.normal(0, 0.2, size=(days, 3))
+    closes = 100 + rng.normal(size=(days, 2)).cumsum(axis=0)
+    X = np.column_stack([sentiment, closes])
+    y = X @ np.array([2.0, -1.0, 0.5, 0.8, 0.3]) + 20 + rng.normal(size=days)
+    return X, y
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, nargs="+", default=[2000, 4000, 8000])
+    parser.add_argument("--window", type=int, default=750)
+    parser.add_argument("--horizon", type=int, default=1)
+    parser.add_argument("--expanding", action="store_true")
+    args = parser.parse_args()
+
+    runs = []
+    for days in args.days:
+        X, y = make_data(days)
+        (incremental, _), incremental_seconds = timed(walk_forward, X, y, args.window, args.horizon, args.expanding)
+        refit, refit_seconds = timed(refit_walk_forward, X, y, args.window, args.horizon, args.expanding)
+        max_diff = float(np.nanmax(np.abs(incremental - refit)))
+        runs.append({
+            "days": days,
+            "incremental_seconds": round(incremental_seconds, 4),
+            "incremental_us_per_day": round(incremental_seconds / days * 1e6, 1),
+            "refit_seconds": round(refit_seconds, 4),
+            "refit_us_per_day": round(refit_seconds / days * 1e6, 1),
+            "max_abs_diff": max_diff,
+            "within_tolerance": max_diff <= TOLERANCE,
+        })
+
+    print(json.dumps({"window": args.window, "horizon": args.horizon, "expanding": args.expanding,
+                      "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
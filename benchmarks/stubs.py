@@ -0,0 +1,177 @@
+"""Offline stand-ins for the external services, fed with the synthetic data.
+
+    stock_provider()   utils.stock_providers.FixtureProvider instead of Yahoo Finance
+    finnhub_client()   utils.finnhub_fetch.FakeFinnhubClient instead of finnhub.Client
+    NewsSiteStub       local HTTP server with NVIDIA newsroom listing and article pages
+    FtSiteStub         local HTTP server with Financial Times search result pages
+
+Every stub can add a fixed latency per request, so the ingestion benchmarks exercise the
+same overlap of network waits, parsing, scoring and inserts as a real run.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from utils.settings import reload_settings
+from utils.stock_providers import FixtureProvider
+from utils.finnhub_fetch import FakeFinnhubClient
+from benchmarks.synthetic_data import make_stock_bars, make_finnhub_news, make_articles
+
+LISTING_PAGE_SIZE = 15      # Teasers per newsroom listing page
+FT_LISTING_PAGE_SIZE = 25   # Teasers per FT search results page
+
+
+def stock_provider(first_day, last_day, seed=42):
+    return FixtureProvider(make_stock_bars(first_day, last_day, seed=seed))
+
+
+def finnhub_client(first_day, last_day, per_day, latency=0.0, seed=42):
+    """FakeFinnhubClient over synthetic news; the Finnhub rate limit is lifted for it."""
+    os.environ['FASTAPI_SCRAPE_API_FINHUB__CALLS_PER_MINUTE'] = '60000'
+    reload_settings()
+    return FakeFinnhubClient(make_finnhub_news(first_day, last_day, per_day, seed=seed), latency=latency)
+
+
+class _StubServer:
+    """Threaded HTTP server on 127.0.0.1 answering every GET with `page(url)` (None is a 404).
+
+    Subclasses build the pages and point the settings at the server in `configure(root)`.
+    The pages are sent with Cache-Control: no-store, so the HTTP cache never answers for it.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def page(self, url):
+        raise NotImplementedError
+
+    def configure(self, root):
+        raise NotImplementedError
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = stub.page(urlsplit(self.path))
+                if body is None:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.configure(f"http://127.0.0.1:{self._server.server_port}")
+        reload_settings()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class NewsSiteStub(_StubServer):
+    """NVIDIA newsroom served on 127.0.0.1, newest article first.
+
+        with NewsSiteStub(first_day, last_day, per_day=5, latency=0.05) as site:
+            scrape_nvidia_news_site(str(first_day), str(last_day))
+
+    Entering the stub points the [original_nvidia_site] URLs at it (FASTAPI_SCRAPE_* overrides).
+    """
+
+    def __init__(self, first_day, last_day, per_day, latency=0.0, seed=42):
+        super().__init__(latency)
+        rows = make_articles('nvidia_originalsite_scrape', first_day, last_day, per_day, seed=seed)
+        rows.sort(key=lambda row: row[2], reverse=True)
+        self.articles = [(f"a{i}", title, moment, text) for i, (title, _, moment, _, text, _, _) in enumerate(rows)]
+        self.by_slug = {slug: (title, text) for slug, title, _, text in self.articles}
+
+    def listing_page(self, page):
+        start = (page - 1) * LISTING_PAGE_SIZE
+        teasers = "".join(
+            f'<div class="index-item-text"><a href="/news/{slug}">{title}</a>'
+            f'<span class="index-item-text-info-date">{moment.strftime("%B %d, %Y")}</span></div>'
+            for slug, title, moment, _ in self.articles[start:start + LISTING_PAGE_SIZE]
+        )
+        return f"<html><body><div class=\"index\">{teasers}</div></body></html>"
+
+    def article_page(self, slug):
+        title, text = self.by_slug[slug]
+        paragraphs = "".join(f"<p>{sentence}</p>" for sentence in text.split(". "))
+        return f"<html><body><h1>{title}</h1><article>{paragraphs}</article></body></html>"
+
+    def page(self, url):
+        if url.path == "/news":
+            return self.listing_page(int(parse_qs(url.query).get("page", ["1"])[0]))
+        if url.path.startswith("/news/") and url.path[6:] in self.by_slug:
+            return self.article_page(url.path[6:])
+        return None
+
+    def configure(self, root):
+        os.environ['FASTAPI_SCRAPE_ORIGINAL_NVIDIA_SITE__SITE_NV_URL'] = root + "/news?"
+        os.environ['FASTAPI_SCRAPE_ORIGINAL_NVIDIA_SITE__RELATIVE_SITE_NV_URL'] = root
+        os.environ['FASTAPI_SCRAPE_ORIGINAL_NVIDIA_SITE__REQUESTS_PER_SECOND'] = '1000'
+
+
+class FtSiteStub(_StubServer):
+    """Financial Times NVIDIA search results served on 127.0.0.1, newest article first.
+
+        with FtSiteStub(first_day, last_day, per_day=5, latency=0.05, page_delay=0.1):
+            scrape_nvidia_ft(str(first_day), str(last_day))
+
+    Entering the stub points the [fin_times_site] URLs at it and sets its `page_delay`, the
+    seconds the scraper waits between two listing pages (one second against the real site).
+    """
+
+    def __init__(self, first_day, last_day, per_day, latency=0.0, page_delay=0.0, seed=42):
+        super().__init__(latency)
+        rows = make_articles('nvidia_fintimes_scrape', first_day, last_day, per_day, seed=seed)
+        rows.sort(key=lambda row: row[2], reverse=True)
+        self.articles = [(f"a{i}", title, moment, text) for i, (title, _, moment, _, text, _, _) in enumerate(rows)]
+        self.page_delay = page_delay
+
+    def listing_page(self, page):
+        start = (page - 1) * FT_LISTING_PAGE_SIZE
+        teasers = "".join(
+            f'<div class="o-teaser__content">'
+            f'<time class="o-teaser__timestamp-date">{moment.strftime("%B %d, %Y")}</time>'
+            f'<a class="js-teaser-heading-link" href="/content/{slug}">{title}</a>'
+            f'<p class="o-teaser__standfirst">{text}</p></div>'
+            for slug, title, moment, text in self.articles[start:start + FT_LISTING_PAGE_SIZE]
+        )
+        return f"<html><body><ul class=\"search-results\">{teasers}</ul></body></html>"
+
+    def page(self, url):
+        if url.path == "/search":
+            return self.listing_page(int(parse_qs(url.query).get("page", ["1"])[0]))
+        return None
+
+    def configure(self, root):
+        os.environ['FASTAPI_SCRAPE_FIN_TIMES_SITE__SITE_FT'] = root + "/search?q=nvidia"
+        os.environ['FASTAPI_SCRAPE_FIN_TIMES_SITE__FT_SUP'] = ""
+        os.environ['FASTAPI_SCRAPE_FIN_TIMES_SITE__LINK_FT_FOR_HREF'] = root
+        os.environ['FASTAPI_SCRAPE_FIN_TIMES_SITE__PAGE_DELAY'] = str(self.page_delay)
@@ -0,0 +1,260 @@
+"""End-to-end benchmark suite: ingestion throughput and endpoint latency on synthetic data.
+
+Runs in a scratch database on the local PostgreSQL (see benchmarks/synthetic_data.py) with
+the offline stubs of benchmarks/stubs.py instead of Yahoo Finance, Finnhub, the NVIDIA
+newsroom and the Financial Times, so two runs on the same box only differ by the code of the commit:
+
+    ingest_stock_values          scrape_nvidia_stock from a FixtureProvider
+    ingest_nvidia_news_api       get_nvidia_news_via_api from a FakeFinnhubClient
+    ingest_nvidia_originalsite   scrape_nvidia_news_site from a local HTTP server
+    ingest_nvidia_fintimes       scrape_nvidia_ft from a local HTTP server
+    analysis_1, analysis_1_walk_forward, analysis_2, visualization_1, visualization_2
+                                 GET latency through the FastAPI app, `cold` (response cache
+                                 invalidated before every request) and `warm` (cache hits)
+
+The ingestion scenarios report rows/sec over `--ingest-days` days; the tables are then
+filled with `--years` years of data for the endpoint scenarios. The FT scraper waits
+`--page-delay` seconds between listing pages (one second against the real site). The results
+are printed as JSON (and written to `--output`); `--compare` puts two result files side by side. Usage:
+
+    python -m benchmarks.suite --years 3 --articles-per-day 20 --output bench_$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --compare bench_old.json bench_new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi.testclient import TestClient
+import main as app_module
+from utils import (scrape_nvidia_stock, get_nvidia_news_via_api, scrape_nvidia_news_site, scrape_nvidia_ft,
+                   bump_data_version, close_db_pools, close_scorer, shutdown_render_pool)
+from utils.db import db_connection
+from benchmarks.synthetic_data import (DEFAULT_DATABASE, SYMBOLS, use_bench_database, clear_tables, day_range,
+                                       fill_database)
+from benchmarks.stubs import stock_provider, finnhub_client, NewsSiteStub, FtSiteStub
+
+INGESTION_SCENARIOS = ['ingest_stock_values', 'ingest_nvidia_news_api', 'ingest_nvidia_originalsite',
+                       'ingest_nvidia_fintimes']
+
+# Scenario -> (path, query parameters)
+ENDPOINT_SCENARIOS = {
+    'analysis_1': ("/analysis_1", {"mode": "fit"}),
+    'analysis_1_walk_forward': ("/analysis_1", {"mode": "walk_forward", "horizon": 5}),
+    'analysis_2': ("/analysis_2", {"max_lag": 7}),
+    'visualization_1': ("/visualization_1", {"format": "png"}),
+    'visualization_2': ("/visualization_2", {"format": "json"}),
+}
+SCENARIOS = INGESTION_SCENARIOS + list(ENDPOINT_SCENARIOS)
+
+
+def git_commit():
+    """(commit hash, whether the tree has uncommitted changes), or (None, None) outside of git."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def machine_info():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SHOW server_version")
+        postgres = cur.fetchone()[0]
+        cur.close()
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "postgres": postgres,
+    }
+
+
+def count_rows(table):
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        count = cur.fetchone()[0]
+        cur.close()
+    return count
+
+
+# ============================
+#    Ingestion scenarios
+# ============================
+
+def run_ingestion(name, args):
+    """Ingest `--ingest-days` days into empty tables; returns rows, seconds and rows/sec."""
+    first_day, last_day = day_range(args.ingest_days / 365.25, args.end_date)
+    with db_connection() as conn:
+        clear_tables(conn)
+
+    if name == 'ingest_stock_values':
+        table = 'stock_values'
+        provider = stock_provider(first_day, last_day, args.seed)
+        start = time.perf_counter()
+        # The provider's end date is exclusive
+        scrape_nvidia_stock(str(first_day), str(last_day + timedelta(days=1)), tickers=list(SYMBOLS),
+                            provider=provider)
+    elif name == 'ingest_nvidia_news_api':
+        table = 'nvidia_news_api'
+        client = finnhub_client(first_day, last_day, args.articles_per_day, args.latency, args.seed)
+        start = time.perf_counter()
+        get_nvidia_news_via_api(str(first_day), str(last_day), client=client)
+    elif name == 'ingest_nvidia_originalsite':
+        table = 'nvidia_originalsite_scrape'
+        with NewsSiteStub(first_day, last_day, args.articles_per_day, args.latency, args.seed):
+            start = time.perf_counter()
+            scrape_nvidia_news_site(str(first_day), str(last_day))
+    else:
+        table = 'nvidia_fintimes_scrape'
+        with FtSiteStub(first_day, last_day, args.articles_per_day, args.latency, args.page_delay, args.seed):
+            start = time.perf_counter()
+            scrape_nvidia_ft(str(first_day), str(last_day))
+
+    seconds = time.perf_counter() - start
+    rows = count_rows(table)
+    return {
+        "table": table,
+        "days": (last_day - first_day).days + 1,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds else 0.0,
+    }
+
+
+# ============================
+#    Endpoint scenarios
+# ============================
+
+def _latencies(seconds):
+    values = np.array(seconds) * 1000
+    return {
+        "requests": len(values),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+def run_endpoint(client, name, repeat):
+    """`repeat` cold and `repeat` warm GETs of one endpoint."""
+    path, params = ENDPOINT_SCENARIOS[name]
+    result = {"path": path, "params": params}
+    for mode in ("cold", "warm"):
+        seconds = []
+        for _ in range(repeat):
+            if mode == "cold":
+                bump_data_version()
+            start = time.perf_counter()
+            response = client.get(path, params=params)
+            seconds.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: {path} answered {response.status_code}: {response.text[:200]}")
+        result[mode] = _latencies(seconds)
+    result["response_bytes"] = len(response.content)
+    return result
+
+
+# ============================
+#    Comparison
+# ============================
+
+# Metric of every scenario and whether higher is better
+_KEY_METRICS = [("rows_per_second", True), ("cold.p50_ms", False), ("warm.p50_ms", False)]
+
+
+def _metric(result, path):
+    for key in path.split("."):
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(base_file, new_file):
+    """Key metrics of two result files and their ratio (> 1 means the new run is faster)."""
+    with open(base_file) as file:
+        base = json.load(file)
+    with open(new_file) as file:
+        new = json.load(file)
+    rows = {}
+    for name in base["scenarios"].keys() & new["scenarios"].keys():
+        for path, higher_is_better in _KEY_METRICS:
+            before, after = _metric(base["scenarios"][name], path), _metric(new["scenarios"][name], path)
+            if before is None or after is None or not before or not after:
+                continue
+            rows[f"{name}.{path}"] = {
+                "base": before,
+                "new": after,
+                "speedup": round(after / before if higher_is_better else before / after, 3),
+            }
+    return {"base": base.get("commit"), "new": new.get("commit"), "metrics": dict(sorted(rows.items()))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=float, default=3, help="Years of data for the endpoint scenarios")
+    parser.add_argument("--articles-per-day", type=int, default=20)
+    parser.add_argument("--ingest-days", type=int, default=90, help="Days ingested by the ingestion scenarios")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every stubbed request")
+    parser.add_argument("--page-delay", type=float, default=0.0,
+                        help="Seconds the FT scraper waits between listing pages")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per endpoint and cache mode")
+    parser.add_argument("--end-date", default=None, help="Last day of the data (default: yesterday)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Scratch database, emptied by the run")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--output", default=None, help="Also write the results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2))
+        return
+
+    use_bench_database(args.database)
+
+    commit, dirty = git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios:
+            if name in INGESTION_SCENARIOS:
+                results["scenarios"][name] = run_ingestion(name, args)
+
+        endpoints = [name for name in args.scenarios if name in ENDPOINT_SCENARIOS]
+        if endpoints:
+            results["data"] = fill_database(args.years, args.articles_per_day, args.end_date, args.seed)
+            client = TestClient(app_module.app)
+            for name in endpoints:
+                results["scenarios"][name] = run_endpoint(client, name, args.repeat)
+    finally:
+        shutdown_render_pool()
+        close_scorer()
+        close_db_pools()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Seeded synthetic data for the benchmarks: stock bars and articles of the three sources.
+
+Fills `stock_values` (read through the nvda/aapl/amd_stock_values views) with daily bars of
+NVDA, AAPL and AMD and the three article tables with `--articles-per-day` articles per day,
+for `--years` years up to `--end-date`, then rebuilds daily_sentiment and the feature
+matrix. The same seed always gives the same rows, so runs on different commits read the
+same data.
+
+The tables are emptied first, so the generator refuses to run on the database configured in
+.secrets/keys.toml: it writes into a scratch database (created when missing, default
+`fastapi_scrape_bench`) on the same PostgreSQL server. Usage:
+
+    python -m benchmarks.synthetic_data --years 3 --articles-per-day 20
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+from utils.settings import get_settings, reload_settings, MAIN_DIR
+from utils.db import connect_kwargs, db_connection
+from utils.bulk_insert import BulkWriter
+from utils.schema import ARTICLE_TABLES, ARTICLE_COLUMNS, migrate_article_table
+from utils.daily_sentiment import rebuild_daily_sentiment
+from utils.feature_store import rebuild_features
+from utils.cache import bump_data_version
+from utils.ingestion_state import create_state_table
+from utils.nvidia_stock_values_api import create_stock_table
+
+DEFAULT_DATABASE = 'fastapi_scrape_bench'
+SYMBOLS = {'NVDA': 100.0, 'AAPL': 150.0, 'AMD': 90.0}   # Symbol -> first close
+SOURCES = ['Reuters', 'Bloomberg', 'CNBC', 'MarketWatch', 'Yahoo']
+WORDS = ("nvidia chips demand strong weak growth record revenue decline great terrible market "
+         "investors good bad profit loss new data center gaming excellent poor stock rally slump "
+         "not very really quite outlook guidance beat miss expectations").split()
+
+
+# ============================
+#    Scratch database
+# ============================
+
+def use_bench_database(name=DEFAULT_DATABASE):
+    """Point the application at the scratch database `name`, creating it when missing.
+
+    The feature matrix and the on-disk response cache are moved to .cache/bench/ as well, so
+    the benchmarks never touch the application's files. Must run before the first database
+    connection of the process: everything goes through FASTAPI_SCRAPE_* overrides.
+    """
+    credentials = get_settings().database_credentials
+    if credentials is None:
+        raise Exception("Missing [database_credentials] section in keys.toml.")
+    if name == credentials.database:
+        raise ValueError(f"{name} is the application database, the benchmarks need a scratch database")
+
+    kwargs = connect_kwargs(credentials)
+    kwargs['dbname'] = 'postgres'
+    conn = psycopg2.connect(**kwargs)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+    if cur.fetchone() is None:
+        cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    cur.close()
+    conn.close()
+
+    bench_dir = os.path.join(MAIN_DIR, ".cache", "bench")
+    os.environ['FASTAPI_SCRAPE_DATABASE_CREDENTIALS__DATABASE'] = name
+    os.environ['FASTAPI_SCRAPE_FEATURE_STORE__DIRECTORY'] = os.path.join(bench_dir, "features")
+    os.environ['FASTAPI_SCRAPE_RESPONSE_CACHE__DIRECTORY'] = os.path.join(bench_dir, "responses")
+    reload_settings()
+
+
+# ============================
+#    Generators
+# ============================
+
+def day_range(years, end_date=None):
+    """(first day, last day) of `years` years ending at end_date (default: yesterday)."""
+    last_day = pd.to_datetime(end_date).date() if end_date else date.today() - timedelta(days=1)
+    return last_day - timedelta(days=round(365.25 * years)) + timedelta(days=1), last_day
+
+
+def make_stock_bars(first_day, last_day, symbols=SYMBOLS, seed=42):
+    """Daily bars of every business day, long format (utils.stock_providers.LONG_COLUMNS)."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(first_day, last_day).date
+    parts = []
+    for symbol, first_close in symbols.items():
+        # Geometric random walk with a small drift, open near the previous close
+        close = first_close * np.exp(np.cumsum(rng.normal(0.0005, 0.02, size=len(days))))
+        open_ = np.concatenate([[first_close], close[:-1]]) * (1 + rng.normal(0, 0.005, size=len(days)))
+        spread = np.abs(rng.normal(0, 0.01, size=len(days)))
+        parts.append(pd.DataFrame({
+            'symbol': symbol,
+            'date': days,
+            'open': open_,
+            'high': np.maximum(open_, close) * (1 + spread),
+            'low': np.minimum(open_, close) * (1 - spread),
+            'close': close,
+            'volume': rng.integers(10**6, 10**8, size=len(days)).astype(float),
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def make_articles(table, first_day, last_day, per_day, words=60, seed=42):
+    """Rows (utils.schema.ARTICLE_COLUMNS) of `per_day` articles for every day, already scored.
+
+    The sentiment is drawn at random rather than computed, the scorer is benchmarked on its own.
+    """
+    rng = random.Random(f"{seed}:{table}")
+    rows = []
+    day = first_day
+    while day <= last_day:
+        for i in range(per_day):
+            moment = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+            score = round(rng.uniform(-1, 1), 4)
+            sentiment = 'Positive' if score > 0 else 'Negative' if score < 0 else 'Neutral'
+            rows.append((f"{table} article {day} #{i}", f"https://bench.example/{table}/{day}/{i}", moment,
+                         rng.choice(SOURCES), _text(rng, words), sentiment, score))
+        day += timedelta(days=1)
+    return rows
+
+
+def make_finnhub_news(first_day, last_day, per_day, seed=42):
+    """company_news items (dicts with a unix `datetime`) for utils.finnhub_fetch.FakeFinnhubClient."""
+    rng = random.Random(f"{seed}:finnhub")
+    news = []
+    day = first_day
+    n = 0
+    while day <= last_day:
+        midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+        for i in range(per_day):
+            news.append({'id': n, 'datetime': int(midnight) + rng.randrange(86400),
+                         'headline': f"Finnhub headline {day} #{i}", 'url': f"https://bench.example/finnhub/{n}",
+                         'summary': _text(rng, 40), 'source': rng.choice(SOURCES)})
+            n += 1
+        day += timedelta(days=1)
+    return news
+
+
+# ============================
+#    Database fill
+# ============================
+
+def clear_tables(conn):
+    """Empty the stock and article tables, their aggregates and the ingestion state."""
+    create_stock_table(conn)
+    create_state_table(conn)
+    for table in ARTICLE_TABLES:
+        migrate_article_table(conn, table)
+    cur = conn.cursor()
+    cur.execute(f"TRUNCATE stock_values, daily_sentiment, ingestion_state, {', '.join(ARTICLE_TABLES)}")
+    conn.commit()
+    cur.close()
+
+
+def fill_database(years, articles_per_day, end_date=None, seed=42):
+    """Replace the content of the six tables with synthetic data; returns the rows per table."""
+    first_day, last_day = day_range(years, end_date)
+    counts = {}
+    with db_connection() as conn:
+        clear_tables(conn)
+
+        bars = make_stock_bars(first_day, last_day, seed=seed)
+        with BulkWriter(conn, 'stock_values', list(bars.columns)) as writer:
+            writer.add_many(bars.itertuples(index=False, name=None))
+        counts['stock_values'] = len(bars)
+
+        for table in ARTICLE_TABLES:
+            rows = make_articles(table, first_day, last_day, articles_per_day, seed=seed)
+            with BulkWriter(conn, table, ARTICLE_COLUMNS) as writer:
+                writer.add_many(rows)
+            rebuild_daily_sentiment(conn, table)
+            counts[table] = len(rows)
+
+    rebuild_features()
+    bump_data_version()
+    return {"first_day": str(first_day), "last_day": str(last_day), "rows": counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--articles-per-day", type=int, default=20)
+    parser.add_argument("--end-date", default=None, help="Last day generated (default: yesterday)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Scratch database filled")
+    args = parser.parse_args()
+
+    use_bench_database(args.database)
+    start = time.perf_counter()
+    result = fill_database(args.years, args.articles_per_day, args.end_date, args.seed)
+    result.update({"database": args.database, "seconds": round(time.perf_counter() - start, 2)})
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,127 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import subprocess
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import StreamingResponse
 import importlib
+import json
+import time
+from datetime import datetime
 import utils
 
 # ============================
 #    FastAPI app
 # ============================
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled engine and psycopg2 pool shared by every request and ingestion job
+    try:
+        utils.init_db_pools()
+        utils.migrate_schema()
+        # Catch up with data written while the server was down (migrations, other processes)
+        utils.rebuild_features()
+    except Exception as e:
+        print(f"Database not ready at startup, pools and migrations are retried on first use: {e}")
+    yield
+    # Running ingestion jobs are left to finish; queued ones are dropped and marked cancelled
+    utils.shutdown_jobs()
+    utils.shutdown_render_pool()
+    utils.close_scorer()
+    utils.close_db_pools()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def observe_request_duration(request: Request, call_next):
+    # Latency of every request, labelled with the route template so that /jobs/{job_id} is one series
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        endpoint = route.path if route is not None else 'unmatched'
+        utils.HTTP_REQUEST_SECONDS.labels(endpoint=endpoint, method=request.method,
+                                          status=str(status)).observe(time.perf_counter() - start)
 
 class DateRange(BaseModel):
     start_date: str
     end_date: str
 
+class StockRequest(DateRange):
+    tickers: Optional[List[str]] = Field(None, description="Symbols to fetch, defaults to the [stocks] tickers of keys.toml")
+
 class DatabaseRequest(BaseModel):
     db_name: str
 
+
+def start_ingestion_job(background_tasks: BackgroundTasks, name: str, func, date_range: DateRange,
+                        incremental: bool = False, **kwargs):
+    """Register an ingestion job and let the worker pool run it after the response is sent."""
+    # Checked here so that a bad date is a 400 answer instead of a job failing in the background
+    try:
+        start_date = datetime.strptime(date_range.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(date_range.end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be in the Year-Month-Day format")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    job = utils.create_job(name, {**date_range.model_dump(), "incremental": incremental})
+    background_tasks.add_task(utils.run_job, job, func, date_range.start_date, date_range.end_date,
+                              incremental=incremental, **kwargs)
+    return {"message": f"{name} job started.", "job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+
+INCREMENTAL_QUERY = Query(False, description="Only fetch what is newer than the previous run of this source")
+
+
+def etag_response(request: Request, entry):
+    """Answer with a cached entry, or an empty 304 when the client already holds it (If-None-Match)."""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+async def cached_response(request: Request, endpoint: str, params: dict, build, run=run_in_threadpool):
+    """Serve `endpoint` from the response cache, calling `build()` -> (body bytes, media type) on a miss.
+
+    A miss is built with `run` (the thread pool by default) instead of on the event loop.
+    Entries are invalidated when ingestion writes new data. Clients that send the ETag of their
+    copy in If-None-Match get an empty 304 answer.
+    """
+    cache = utils.get_response_cache()
+    key = cache.key(endpoint, params)
+    entry = cache.get(key)
+    if entry is None:
+        body, media_type = await run(build)
+        entry = cache.put(key, body, media_type)
+    return etag_response(request, entry)
+
+
+async def cached_render(request: Request, endpoint: str, params: dict, build):
+    """Same as cached_response, but a miss is built on the render pool."""
+    return await cached_response(request, endpoint, params, build, run=utils.run_render)
+
+
+def check_day_range(start_date: Optional[str], end_date: Optional[str]):
+    """400 answer for a malformed or reversed start_date / end_date filter."""
+    try:
+        utils.parse_day_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def json_body(result):
+    return json.dumps(result, allow_nan=False).encode(), "application/json"
+
 # ============================
 # Endpoints: Post
 # ============================
@@ -27,76 +129,79 @@ class DatabaseRequest(BaseModel):
 # Endpoint 1: Scrape Financial Times NVIDIA news
 @app.post(
     "/scrape_nvidia_ft",
+    status_code=202,
     summary="Scrape Financial Times NVIDIA News",
     description="""
         This endpoint scrapes news articles related to NVIDIA from the Financial Times website.
         The user can specify a date range using `start_date` and `end_date` in the request body in the `Year-Month-Day` format.
         The scraped data includes article titles, publication dates, and sentiment analysis.
         The data will be inserted into the PostgreSQL database.
+        The request returns immediately with a `job_id`; follow the progress at `/jobs/{job_id}`.
+        With `incremental=true` only the articles/days newer than the previous run are fetched.
     """
 )
-async def post_scrape_nvidia_ft(date_range: DateRange):
-    try:
-        result = utils.scrape_nvidia_ft(date_range.start_date, date_range.end_date)
-        return {"message": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def post_scrape_nvidia_ft(date_range: DateRange, background_tasks: BackgroundTasks,
+                                incremental: bool = INCREMENTAL_QUERY):
+    return start_ingestion_job(background_tasks, "scrape_nvidia_ft", utils.scrape_nvidia_ft, date_range, incremental)
 
 
 # Endpoint 2: Scrape NVIDIA stock data via yfinance
 @app.post(
     "/get_nvidia_stock",
+    status_code=202,
     summary="Api call to NVIDIA-APPLE-AMD Stock Data",
     description="""
         This endpoint make API calls for historical stock data for NVIDIA-APPLE-AMD using the `yfinance` API.
         The user can specify a date range using `start_date` and `end_date` in the request body in the `Year-Month-Day` format.
+        An optional `tickers` list in the body replaces the configured symbols; all of them are fetched in one batched call
+        and stored in the `stock_values` table.
         The stock data includes open, close, high, low prices, and trading volume for the specified date range.
         The data will be inserted into the PostgreSQL database.
+        The request returns immediately with a `job_id`; follow the progress at `/jobs/{job_id}`.
+        With `incremental=true` only the articles/days newer than the previous run are fetched.
     """
 )
-async def post_scrape_nvidia_stock(date_range: DateRange):
-    try:
-        result = utils.scrape_nvidia_stock(date_range.start_date, date_range.end_date)
-        return {"message": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def post_scrape_nvidia_stock(date_range: StockRequest, background_tasks: BackgroundTasks,
+                                   incremental: bool = INCREMENTAL_QUERY):
+    return start_ingestion_job(background_tasks, "get_nvidia_stock", utils.scrape_nvidia_stock, date_range, incremental,
+                               tickers=date_range.tickers)
 
 
 # Endpoint 3: Fetch NVIDIA news via Finnhub API
 @app.post(
     "/get_nvidia_news_via_api",
+    status_code=202,
     summary="Fetch NVIDIA News via Finnhub API",
     description="""
         This endpoint fetches news articles related to NVIDIA using the Finnhub API.
         The user can specify a date range using `start_date` and `end_date` in the request body in the `Year-Month-Day` format.
         The API returns news headlines, publication dates, URLs, and sentiment scores.
         The data will be inserted into the PostgreSQL database for future analysis.
+        The request returns immediately with a `job_id`; follow the progress at `/jobs/{job_id}`.
+        With `incremental=true` only the articles/days newer than the previous run are fetched.
     """
 )
-async def post_get_nvidia_news_via_api(date_range: DateRange):
-    try:
-        result = utils.get_nvidia_news_via_api(date_range.start_date, date_range.end_date)
-        return {"message": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def post_get_nvidia_news_via_api(date_range: DateRange, background_tasks: BackgroundTasks,
+                                       incremental: bool = INCREMENTAL_QUERY):
+    return start_ingestion_job(background_tasks, "get_nvidia_news_via_api", utils.get_nvidia_news_via_api, date_range, incremental)
 
 # Endpoint 4: Scrape NVIDIA's official site
 @app.post(
     "/scrape_nvidia_news_site",
+    status_code=202,
     summary="Fetch NVIDIA News from the official NVIDIA site",
         description="""
             This endpoint scrapes news articles related to NVIDIA from the official NVIDIA site.
             The user can specify a date range using `start_date` and `end_date` in the request body in the `Year-Month-Day` format.
             The API returns news headlines, publication dates, URLs, and sentiment scores.
             The data will be inserted into the PostgreSQL database for future analysis.
+            The request returns immediately with a `job_id`; follow the progress at `/jobs/{job_id}`.
+            With `incremental=true` only the articles newer than the previous run are fetched.
         """
     )
-async def post_scrape_nvidia_news_site(date_range: DateRange):
-    try:
-        result = utils.scrape_nvidia_news_site(date_range.start_date, date_range.end_date)
-        return {"message": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def post_scrape_nvidia_news_site(date_range: DateRange, background_tasks: BackgroundTasks,
+                                       incremental: bool = INCREMENTAL_QUERY):
+    return start_ingestion_job(background_tasks, "scrape_nvidia_news_site", utils.scrape_nvidia_news_site, date_range, incremental)
     
 
 # ============================
@@ -113,15 +218,29 @@ async def post_scrape_nvidia_news_site(date_range: DateRange):
         2. The mean sentiment scores for each day from three different sources (API news, NVIDIA original site, and Financial Times).
         3. The dates.
         Optionally, the sentiment scores can be rescaled between -1 and 1 by setting the `rescale` parameter to True.
+        The image is returned as `format` png (default), svg or webp, `width` x `height` inches at `dpi`,
+        and `start_date` / `end_date` (`Year-Month-Day`) restrict the plotted days.
     """,
 )
-async def visualization_sent_vs_date(rescale: bool = Query(False, description="Whether to rescale sentiment scores between -1 and 1")):
+async def visualization_sent_vs_date(request: Request,
+                                     rescale: bool = Query(False, description="Whether to rescale sentiment scores between -1 and 1"),
+                                     format: str = Query("png", pattern="^(png|svg|webp)$", description="png, svg or webp"),
+                                     dpi: int = Query(100, ge=50, le=300, description="Resolution of the image"),
+                                     width: float = Query(10.0, gt=1, le=30, description="Width in inches"),
+                                     height: float = Query(6.0, gt=1, le=30, description="Height in inches"),
+                                     start_date: Optional[str] = Query(None, description="First day plotted"),
+                                     end_date: Optional[str] = Query(None, description="Last day plotted")):
+    check_day_range(start_date, end_date)
+    params = {"rescale": rescale, "format": format, "dpi": dpi, "width": width, "height": height,
+              "start_date": start_date, "end_date": end_date}
+
+    def build():
+        image = utils.get_visualization_1(rescale, start_date, end_date, format, dpi, width, height)
+        return image.getvalue(), utils.IMAGE_FORMATS[format]
+
     try:
-        # Call the get_visualization function and pass the rescale parameter
-        image_buffer = utils.get_visualization_1(rescale)
-        
-        # Return the image as a StreamingResponse
-        return StreamingResponse(image_buffer, media_type="image/png")
+        # Rendered on the render pool, off the event loop (cached until new data arrives)
+        return await cached_render(request, "visualization_1", params, build)
     
     except Exception as e:
         print(f"Error: {e}")
@@ -135,16 +254,32 @@ async def visualization_sent_vs_date(rescale: bool = Query(False, description="W
     description="""
         This endpoint generates a plot comparing the stock values of NVIDIA, Apple, and AMD for each day.
         The plot includes the daily stock prices as well as their high and low values.
+        It is returned as `format` json (a Plotly figure for Plotly.newPlot, the default), html (a self-contained page),
+        or a png, svg or webp image, `width` x `height` pixels. Every series is downsampled (LTTB) to at most `width` points,
+        and `start_date` / `end_date` (`Year-Month-Day`) restrict the plotted days.
     """,
 )
-async def get_visualisation_2():
+async def get_visualisation_2(request: Request,
+                              format: str = Query("json", pattern="^(json|html|png|svg|webp)$",
+                                                  description="json (plotly figure), html, png, svg or webp"),
+                              width: int = Query(1000, ge=200, le=4000, description="Width in pixels"),
+                              height: int = Query(600, ge=200, le=4000, description="Height in pixels"),
+                              start_date: Optional[str] = Query(None, description="First day plotted"),
+                              end_date: Optional[str] = Query(None, description="Last day plotted")):
+    check_day_range(start_date, end_date)
+    params = {"format": format, "width": width, "height": height, "start_date": start_date, "end_date": end_date}
+
+    def build():
+        return utils.get_visualization_2(format, start_date, end_date, width, height)
+
     try:
-        # Call the actual visualization function (assume it's defined elsewhere)
-        utils.get_visualization_2()
+        # Built on the render pool and cached until new data arrives
+        return await cached_render(request, "visualization_2", params, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    return {"message": "Data visualisation completed successfully."}
 
 
 # Endpoint 3: Analysis 1 - Simple Linear Regression Model
@@ -153,26 +288,37 @@ async def get_visualisation_2():
     summary="Linear Regression Analysis of NVIDIA Stock",
     description="""
         This endpoint runs a simple linear regression model to predict NVIDIA stock prices based on sentiment scores from different sources.
-        The result is returned as a JSON object containing:
+        With `mode=fit` (default) the model is fitted on all the days and the result is returned as a JSON object containing:
         1. The model's coefficients.
         2. The intercept.
-        3. Predictions for the last 30 percent of days.
-        4. Actual stock prices for the last 30 percent of days.
-        5. The dates for the last 30 percent of days.
+        3. The in-sample predictions and actual stock prices.
+        4. The mean squared error and R squared of the fit.
+        With `mode=walk_forward` the model is backtested: it is refitted every `horizon` days on the previous `window` days
+        (default: the first 70 percent of days; all the previous days with `expanding=true`) and predicts the following days.
+        The result contains the out-of-sample predictions, actual prices and dates, the overall MSE, MAE and R squared,
+        and the errors of every window.
     """,
 )
-async def linear_regression_analysis():
+async def linear_regression_analysis(request: Request,
+                                     mode: str = Query("fit", description="fit or walk_forward"),
+                                     window: Optional[int] = Query(None, ge=2, description="Training days per walk-forward step"),
+                                     horizon: int = Query(1, ge=1, description="Days predicted per walk-forward step"),
+                                     expanding: bool = Query(False, description="Grow the training window instead of rolling it")):
+    params = {"mode": mode, "window": window, "horizon": horizon, "expanding": expanding}
     try:
-        # Call the linear_regression_analysis function and pass the rescale parameter
-        result = utils.linear_regression_analysis()
-        return result
+        # Call the linear_regression_analysis function (cached until new data arrives)
+        return await cached_response(request, "analysis_1", params,
+                               lambda: json_body(utils.linear_regression_analysis(mode, window, horizon, expanding)))
     
-    except Exception as e:
+    except ValueError as e:
         print(f"Error: {e}")
-        if "ValueError: Out of range float values are not JSON compliant: nan" in str(e):
+        if "Out of range float values are not JSON compliant" in str(e):
             raise HTTPException(status_code=400, detail="Need more data to predict stock prices.")
         else:
-            raise HTTPException(status_code=500, detail="Error generating the linear regression analysis")
+            raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Error generating the linear regression analysis")
 
 
 
@@ -183,12 +329,164 @@ async def linear_regression_analysis():
     description="""
         This endpoint computes the correlation between sentiment scores from different sources (API news, NVIDIA original site, and Financial Times) 
         and NVIDIA stock values on a per-day basis.
-        The result is returned as a JSON object containing correlation values.
+        The result is returned as a JSON object containing correlation values: the concurrent and preceding-day
+        correlations per source, a `lag_matrix` with the correlation of every source and price field for every lag
+        between `min_lag` and `max_lag` trading days, and the `best_lag` (strongest absolute correlation) per source.
+        `fields` is a comma-separated list of price fields among open, high, low, close and mean ((high + low) / 2).
     """,
 )
-async def sentiment_analysis():
+async def sentiment_analysis(request: Request,
+                             max_lag: int = Query(7, ge=0, le=60, description="Largest sentiment lag in trading days"),
+                             min_lag: int = Query(0, ge=0, le=60, description="Smallest sentiment lag in trading days"),
+                             fields: str = Query("open,close,mean", description="Comma-separated price fields")):
+    field_list = [field.strip() for field in fields.split(",") if field.strip()]
+    params = {"max_lag": max_lag, "min_lag": min_lag, "fields": ",".join(field_list)}
     try:
-        return utils.sentiment_analysis()
+        return await cached_response(request, "analysis_2", params,
+                               lambda: json_body(utils.sentiment_analysis(max_lag, field_list, min_lag)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+# ============================
+# Endpoints: Export
+# ============================
+
+# Endpoint 1: Stream a table as Arrow IPC, Parquet or CSV
+@app.get(
+    "/export/{table}",
+    summary="Export a table",
+    description="""
+        This endpoint streams the rows of an article table (`nvidia_news_api`, `nvidia_fintimes_scrape`,
+        `nvidia_originalsite_scrape`), `daily_sentiment` or `stock_values` as an Arrow IPC stream (default),
+        a Parquet file or CSV. The rows are read in chunks with a server-side cursor, so any table size
+        is exported with constant server memory.
+        Optional filters: `start_date` and `end_date` (inclusive, `Year-Month-Day`), `source` (repeatable;
+        the ticker symbol for `stock_values`) and `columns` (repeatable) to export only some columns.
+    """,
+)
+def export_table(table: str,
+                 format: str = Query("arrow", description="arrow, parquet or csv"),
+                 start_date: Optional[str] = Query(None, description="First day to export"),
+                 end_date: Optional[str] = Query(None, description="Last day to export"),
+                 source: Optional[List[str]] = Query(None, description="Sources (or symbols) to export"),
+                 columns: Optional[List[str]] = Query(None, description="Columns to export, default all"),
+                 chunk_size: int = Query(10_000, ge=1, le=100_000, description="Rows read per chunk")):
+    try:
+        body, media_type, file_name = utils.stream_export(table, format, columns, start_date, end_date, source,
+                                                          chunk_size)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Table {table} cannot be exported")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+
+# ============================
+# Endpoints: Jobs
+# ============================
+
+# Endpoint 1: List ingestion jobs
+@app.get(
+    "/jobs",
+    summary="List ingestion jobs",
+    description="""
+        This endpoint lists the ingestion jobs started by the POST endpoints, newest first,
+        with their status and progress (pages, items, rows inserted and elapsed time).
+    """,
+)
+async def get_jobs():
+    return utils.list_jobs()
+
+
+# Endpoint 2: Status of one ingestion job
+@app.get(
+    "/jobs/{job_id}",
+    summary="Ingestion job status",
+    description="""
+        This endpoint returns the status and progress of a single ingestion job.
+    """,
+)
+async def get_job(job_id: str):
+    job = utils.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+
+# ============================
+# Endpoints: Database and cache
+# ============================
+
+# Endpoint 1: Connection pool statistics
+@app.get(
+    "/db/pool_stats",
+    summary="Database connection pool statistics",
+    description="""
+        This endpoint reports the usage of the shared SQLAlchemy engine pool and psycopg2 connection pool
+        (connections checked out, idle and overflow).
+    """,
+)
+async def get_pool_stats():
+    return utils.pool_stats()
+
+
+# Endpoint 2: Response cache statistics
+@app.get(
+    "/cache/stats",
+    summary="Response cache statistics",
+    description="""
+        This endpoint reports the entries, hits and misses of the analysis/visualization response cache
+        and the current data version (bumped by every ingestion batch).
+    """,
+)
+async def get_cache_stats():
+    return utils.get_response_cache().stats()
+
+
+# Endpoint 3: Sentiment cache statistics
+@app.get(
+    "/sentiment_cache/stats",
+    summary="Sentiment score cache statistics",
+    description="""
+        This endpoint reports the size, hits and misses of the content-hash cache that lets the ingestion
+        skip the sentiment scoring of texts it has already scored.
+    """,
+)
+async def get_sentiment_cache_stats():
+    return utils.sentiment_cache_stats()
+
+
+# Endpoint 4: HTTP page cache statistics
+@app.get(
+    "/http_cache/stats",
+    summary="Scraped page cache statistics",
+    description="""
+        This endpoint reports how the scrapers' page requests were answered: from the on-disk cache without a request
+        (hits), by a 304 Not Modified revalidation, or by a full download, and the disk space used by the cached pages.
+    """,
+)
+async def get_http_cache_stats():
+    return utils.http_cache_stats()
+
+
+# ============================
+# Endpoints: Monitoring
+# ============================
+
+# Endpoint 1: Prometheus metrics
+@app.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="""
+        This endpoint exposes the latency histograms and counters of the API requests, the outgoing fetches, the
+        sentiment scoring, the database reads and writes, the analysis and visualization steps and the ingestion jobs,
+        in the Prometheus text format.
+    """,
+)
+def get_metrics():
+    body, media_type = utils.metrics_payload()
+    return Response(content=body, media_type=media_type)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import pandas as pd
+from utils.correlation import MIN_PAIRS, lagged_correlations, best_lags
+
+LAGS = [0, 1, 2, 5, 7]
+
+
+def seeded_data(n=120, sources=3, fields=2, missing=0.3, seed=3):
+    rng = np.random.default_rng(seed)
+    scores = rng.normal(size=(n, sources))
+    scores[rng.random(scores.shape) < missing] = np.nan
+    # Prices far from zero and partly driven by the previous day's score
+    prices = 500 + np.cumsum(rng.normal(size=(n, fields)), axis=0)
+    prices[1:, 0] += 3 * np.nan_to_num(scores[:-1, 0])
+    prices[rng.random(prices.shape) < missing / 3] = np.nan
+    return scores, prices
+
+
+def pandas_correlations(scores, prices, lags):
+    """The baseline: Series.shift and Series.corr for every lag, source and field."""
+    r = np.full((len(lags), scores.shape[1], prices.shape[1]), np.nan)
+    for i, lag in enumerate(lags):
+        for s in range(scores.shape[1]):
+            for f in range(prices.shape[1]):
+                r[i, s, f] = pd.Series(scores[:, s]).shift(lag).corr(pd.Series(prices[:, f]))
+    return r
+
+
+def test_matches_pandas_shift_and_corr():
+    scores, prices = seeded_data()
+    r, pairs = lagged_correlations(scores, prices, LAGS)
+
+    assert (pairs >= MIN_PAIRS).all()
+    np.testing.assert_allclose(r, pandas_correlations(scores, prices, LAGS), rtol=1e-9, atol=1e-12)
+
+
+def test_pairs_count_the_rows_where_both_sides_are_present():
+    scores, prices = seeded_data()
+    _, pairs = lagged_correlations(scores, prices, LAGS)
+
+    for i, lag in enumerate(LAGS):
+        shifted = pd.DataFrame(scores).shift(lag).to_numpy()
+        expected = (~np.isnan(shifted)[:, :, None] & ~np.isnan(prices)[:, None, :]).sum(axis=0)
+        np.testing.assert_array_equal(pairs[i], expected)
+
+
+def test_sparse_lags_are_nan_below_min_pairs():
+    # Two overlapping pairs: pandas answers +-1, the engine answers NaN
+    scores = np.array([[0.1], [np.nan], [0.4], [np.nan], [np.nan]])
+    prices = np.array([[10.0], [11.0], [12.5], [12.0], [13.0]])
+    r, pairs = lagged_correlations(scores, prices, [0])
+
+    assert pairs[0, 0, 0] == 2 < MIN_PAIRS
+    assert abs(pandas_correlations(scores, prices, [0])[0, 0, 0]) == pytest.approx(1.0)
+    assert np.isnan(r[0, 0, 0])
+
+
+def test_best_lags_pick_the_strongest_absolute_correlation():
+    scores, prices = seeded_data()
+    r, _ = lagged_correlations(scores, prices, LAGS)
+    lag, field, value = best_lags(r, LAGS)[0]
+
+    assert (lag, field) == (1, 0)
+    assert value == np.nanmax(np.abs(r[:, 0, :]))
@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta, timezone
+import finnhub
+from utils.finnhub_fetch import FinnhubNewsFetcher, FakeFinnhubClient, split_windows
+
+FIRST_DAY, LAST_DAY = date(2024, 1, 1), date(2024, 1, 31)
+
+
+def make_news(per_day, first_day=FIRST_DAY, last_day=LAST_DAY):
+    news = []
+    day = first_day
+    while day <= last_day:
+        midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+        for i in range(per_day):
+            news.append({'id': len(news), 'datetime': int(midnight) + 3600 * i, 'headline': f"{day} #{i}",
+                         'url': f"https://news.example/{len(news)}"})
+        day += timedelta(days=1)
+    return news
+
+
+def fetch_all(fetcher, first_day=FIRST_DAY, last_day=LAST_DAY):
+    """{window: articles or exception} of one fetch."""
+    return dict(fetcher.fetch(first_day, last_day))
+
+
+def fetcher(client, **kwargs):
+    # No rate limit and no backoff wait, the fake client answers at once
+    return FinnhubNewsFetcher(client, calls_per_minute=60000, backoff=0, **kwargs)
+
+
+def test_split_windows_cover_the_range_without_overlap():
+    windows = split_windows(FIRST_DAY, LAST_DAY, 7)
+
+    assert windows[0][0] == FIRST_DAY and windows[-1][1] == LAST_DAY
+    assert all(end - start <= timedelta(days=6) for start, end in windows)
+    assert all(following[0] == end + timedelta(days=1) for (_, end), following in zip(windows, windows[1:]))
+
+
+def test_fetch_returns_every_article_once_per_window():
+    news = make_news(per_day=3)
+    client = FakeFinnhubClient(news)
+    results = fetch_all(fetcher(client, window_days=7))
+
+    assert sorted(results) == split_windows(FIRST_DAY, LAST_DAY, 7)
+    assert sorted(item['id'] for articles in results.values() for item in articles) == [item['id'] for item in news]
+    assert client.calls == len(results)
+
+
+def test_truncated_window_is_split_until_complete():
+    news = make_news(per_day=4)
+    client = FakeFinnhubClient(news, max_items=10)
+    results = fetch_all(fetcher(client, window_days=7, max_items=10))
+
+    assert sorted(item['id'] for articles in results.values() for item in articles) == [item['id'] for item in news]
+    # Every 7-day window (28 articles) comes back truncated at 10 and is split in two
+    assert client.calls > len(results)
+
+
+def test_rate_limited_calls_are_retried():
+    news = make_news(per_day=2)
+    client = FakeFinnhubClient(news, rate_limited_calls=3)
+    news_fetcher = fetcher(client, window_days=31, workers=1)
+    results = fetch_all(news_fetcher)
+
+    assert len(results[(FIRST_DAY, LAST_DAY)]) == len(news)
+    assert news_fetcher.retries == 3
+    assert client.calls == 4
+
+
+def test_window_fails_once_the_retries_are_exhausted():
+    client = FakeFinnhubClient(make_news(per_day=1), rate_limited_calls=10)
+    results = fetch_all(fetcher(client, window_days=31, workers=1, max_retries=2))
+
+    assert isinstance(results[(FIRST_DAY, LAST_DAY)], finnhub.FinnhubAPIException)
+    assert client.calls == 3
+
+
+def test_article_returned_by_two_windows_is_kept_once():
+    news = make_news(per_day=1)
+    # Same Finnhub id on the first and the last day: two windows return it
+    news.append(dict(news[0], datetime=news[-1]['datetime'] + 60))
+    results = fetch_all(fetcher(FakeFinnhubClient(news), window_days=7))
+    ids = [item['id'] for articles in results.values() for item in articles]
+
+    assert sorted(ids) == list(range(len(news) - 1))
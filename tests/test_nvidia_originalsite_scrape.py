@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+import utils.nvidia_originalsite_scrape as site
+
+# Newsroom served by the stub, newest first: (slug, title, date)
+ARTICLES = [
+    ("gtc", "GTC keynote", datetime(2024, 3, 18)),
+    ("earnings", "Record quarterly revenue", datetime(2024, 2, 21)),
+    ("driver", "New driver release", datetime(2024, 2, 5)),
+    ("ces", "CES announcements", datetime(2024, 1, 8)),
+    ("old", "Older news", datetime(2023, 12, 1)),
+]
+PAGE_SIZE = 2
+
+
+class Writer:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+
+
+class Progress:
+    def update(self, pages=0, items=0, rows=0):
+        pass
+
+    def update_stages(self, stats):
+        pass
+
+
+def listing_page(page):
+    teasers = "".join(
+        f'<div class="index-item-text"><a href="/news/{slug}">{title}</a>'
+        f'<span class="index-item-text-info-date">{day.strftime("%B %d, %Y")}</span></div>'
+        for slug, title, day in ARTICLES[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    )
+    return f"<html><body>{teasers}</body></html>"
+
+
+@pytest.fixture
+def newsroom(monkeypatch):
+    """Local newsroom; `failing` holds the slugs answered with a 500. Yields (base URL, state)."""
+    state = {"failing": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            slug = url.path.removeprefix("/news/")
+            if url.path == "/news":
+                body = listing_page(int(parse_qs(url.query)["page"][0]))
+            elif slug in state["failing"]:
+                self.send_error(500)
+                return
+            elif any(slug == known for known, _, _ in ARTICLES):
+                body = f"<html><body><nav><p>Menu</p></nav><article><p>About {slug}.</p><p>Great news.</p></article></body></html>"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # Deterministic scores, without the scorer's process pool
+    monkeypatch.setattr(site, "score_texts", lambda texts: [(0.5, "Positive") for _ in texts])
+    yield f"http://127.0.0.1:{server.server_port}", state
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def scrape(root, start_date, end_date, state=None):
+    writer = Writer()
+    newest = asyncio.run(site._scrape(root + "/news?", root, start_date, end_date, writer, Progress(),
+                                      concurrency=4, rate_per_host=1000, state=state))
+    return writer.rows, newest
+
+
+def test_scrape_stores_the_articles_of_the_date_range(newsroom):
+    root, _ = newsroom
+    rows, newest = scrape(root, datetime(2024, 1, 1), datetime(2024, 2, 28))
+
+    assert sorted(rows) == sorted([
+        (title, f"{root}/news/{slug}", day, "NVIDIA", f"About {slug}. Great news.", "Positive", 0.5)
+        for slug, title, day in ARTICLES[1:4]
+    ])
+    assert newest == (datetime(2024, 2, 21), f"{root}/news/earnings")
+
+
+def test_scrape_stops_at_the_high_water_mark(newsroom):
+    root, _ = newsroom
+    state = {"last_timestamp": datetime(2024, 2, 5), "last_url": f"{root}/news/driver", "covered_until": None}
+    rows, newest = scrape(root, datetime(2024, 1, 1), datetime(2024, 3, 31), state)
+
+    assert sorted(row[1] for row in rows) == [f"{root}/news/earnings", f"{root}/news/gtc"]
+    assert newest == (datetime(2024, 3, 18), f"{root}/news/gtc")
+
+
+def test_failed_article_leaves_no_high_water_mark(newsroom):
+    root, stub = newsroom
+    stub["failing"].add("earnings")
+    rows, newest = scrape(root, datetime(2024, 1, 1), datetime(2024, 3, 31))
+
+    assert sorted(row[1] for row in rows) == sorted(f"{root}/news/{slug}" for slug in ("gtc", "driver", "ces"))
+    assert newest is None
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import utils.walk_forward as wf
+
+
+def seeded_data(n=300, features=3, seed=7):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, features))
+    y = 2.0 + X @ rng.normal(size=features) + rng.normal(scale=0.5, size=n)
+    return X, y
+
+
+def assert_same_backtest(X, y, window, horizon, expanding):
+    predictions, steps, betas = wf.walk_forward(X, y, window, horizon, expanding, coefficients=True)
+    reference, reference_betas = wf.refit_walk_forward(X, y, window, horizon, expanding, coefficients=True)
+
+    assert np.isnan(predictions[:window]).all()
+    np.testing.assert_allclose(predictions[window:], reference[window:], rtol=1e-8, atol=1e-8)
+    np.testing.assert_allclose(betas, reference_betas, rtol=1e-8, atol=1e-8)
+    assert len(steps) == len(betas)
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+@pytest.mark.parametrize("horizon", [1, 5])
+def test_block_updates_match_the_refit(expanding, horizon):
+    X, y = seeded_data()
+    assert_same_backtest(X, y, window=60, horizon=horizon, expanding=expanding)
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+def test_periodic_rebuild_of_the_sums_matches_the_refit(monkeypatch, expanding):
+    # Rebuild X'X and X'y every 4 steps instead of every REFRESH_EVERY
+    monkeypatch.setattr(wf, "REFRESH_EVERY", 4)
+    X, y = seeded_data()
+    assert_same_backtest(X, y, window=50, horizon=3, expanding=expanding)
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+def test_singular_window_falls_back_to_lstsq(expanding):
+    # A feature that is always 0 (a source without articles) makes X'X singular
+    X, y = seeded_data()
+    X[:, 1] = 0.0
+    with pytest.raises(np.linalg.LinAlgError):
+        np.linalg.solve(wf._with_intercept(X).T @ wf._with_intercept(X), np.zeros(X.shape[1] + 1))
+
+    assert_same_backtest(X, y, window=40, horizon=2, expanding=expanding)
@@ -1,20 +1,55 @@
 from .analysis_1 import linear_regression_analysis
-from .visualization_1 import get_visualization_1
-from .visualization_2 import get_visualization_2
+from .visualization_1 import get_visualization_1, IMAGE_FORMATS
+from .visualization_2 import get_visualization_2, FIGURE_FORMATS
 from .analysis_2 import sentiment_analysis
 from .nvidia_fintimes_scrape import scrape_nvidia_ft
 from .nvidia_stock_values_api import scrape_nvidia_stock
 from .nvidia_news_api import get_nvidia_news_via_api
 from .nvidia_originalsite_scrape import scrape_nvidia_news_site
+from .jobs import create_job, run_job, get_job, list_jobs, shutdown_jobs
+from .db import init_db_pools, close_db_pools, pool_stats
+from .schema import migrate_schema
+from .cache import get_response_cache, bump_data_version
+from .sentiment import score_texts, close_scorer, sentiment_cache_stats
+from .export import stream_export, parse_day_range
+from .feature_store import load_features, rebuild_features
+from .render_pool import run_render, shutdown_render_pool
+from .http_cache import http_cache_stats
+from .metrics import metrics_payload, HTTP_REQUEST_SECONDS
 
 # Exposing specific functions at the package level
 __all__ = [
     'linear_regression_analysis',
     'get_visualization_1',
+    'IMAGE_FORMATS',
     'get_visualization_2',
+    'FIGURE_FORMATS',
     'sentiment_analysis',
     'scrape_nvidia_ft',
     'scrape_nvidia_stock',
     'get_nvidia_news_via_api',
-    'scrape_nvidia_news_site'
+    'scrape_nvidia_news_site',
+    'create_job',
+    'run_job',
+    'get_job',
+    'list_jobs',
+    'shutdown_jobs',
+    'init_db_pools',
+    'close_db_pools',
+    'pool_stats',
+    'migrate_schema',
+    'get_response_cache',
+    'bump_data_version',
+    'score_texts',
+    'close_scorer',
+    'sentiment_cache_stats',
+    'stream_export',
+    'parse_day_range',
+    'load_features',
+    'rebuild_features',
+    'run_render',
+    'shutdown_render_pool',
+    'http_cache_stats',
+    'metrics_payload',
+    'HTTP_REQUEST_SECONDS'
 ]
\ No newline at end of file
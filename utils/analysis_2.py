@@ -1,13 +1,26 @@
 import pandas as pd
 import numpy as np
-from .helpers import pandas_db_connection
+from .feature_store import load_features
+from .correlation import lagged_correlations, best_lags
+from .metrics import timed_step
 
 # ============================
 #    Analysis func 2
 # ============================
 
+# Source label in daily_sentiment -> (response key, key prefix of the single-lag summary)
+SOURCES = {
+    'ft': ('FT', '[FT]'),
+    'api_news': ('news api', '[news api]'),
+    'original': ('original', '[original]'),
+}
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'mean']   # mean = (high + low) / 2
+DEFAULT_FIELDS = ['open', 'close', 'mean']
+MAX_LAG = 60
+
+
 def safe_value(value, label="value"):
-    """In case of near dates the scarcity of data can cause the pandas correlatin method to produce NaN values 
+    """In case of near dates the scarcity of data can cause the pandas correlatin method to produce NaN values
     which will cause the program to crash. This function will replace NaN values with 0. An extra security net is added
     by wraping the return statement in a try-except block."""
 
@@ -16,166 +29,88 @@ def safe_value(value, label="value"):
         return 0
     else:
         return float(value)
-    
-
-def sentiment_analysis(): #TODO ADD DAY SHIFT AS A PARAMETER MAYBE
-
-    conn = pandas_db_connection()
-
-#=========================================FINANCIAL TIMES DATA ============================================
-
-    query_ft = f'''SELECT * FROM nvidia_fintimes_scrape'''
-    query_nvidia_stocks = f'''SELECT * FROM  nvda_stock_values; '''
-
-    # Import dataframes from the database
-    ft_nvidia_values_df = pd.read_sql_query(query_ft, conn)
-    nvidia_values_df = pd.read_sql_query(query_nvidia_stocks, conn)
-    # Convert 'date' columns to datetime
-    ft_nvidia_values_df['date'] = pd.to_datetime(ft_nvidia_values_df['date']).dt.date
-    nvidia_values_df['date'] = pd.to_datetime(nvidia_values_df['date']).dt.date
-
-    # Select the 'date' and 'sentiment_score' columns in the correct way
-    ft_nvidia_values_df = ft_nvidia_values_df[['date', 'sentiment_score']]
-
-    # Group 'ft_nvidia_values_df' by 'date' and calculate the mean for sentiment_score
-    ft_nvidia_values_df = ft_nvidia_values_df.groupby('date').mean()
-    # Main_Value-sentiment correlation
-
-    #We can create a new df that will contain the mean value of the stock data and the sentiment value for each day, but datetime doesn not match
-    #so we have to find a way to match the dates of the two dataframes. 
-
-    value_sentiment_df = pd.merge(ft_nvidia_values_df, nvidia_values_df, on='date', how='outer')
-    value_sentiment_df=value_sentiment_df.dropna(subset=['low'])
-    value_sentiment_df['mean']=value_sentiment_df[['high','low']].mean(axis=1)
-
-    if 'sentiment_score' in value_sentiment_df.columns:
-        value_sentiment_df['sentiment_score'] = value_sentiment_df['sentiment_score'].fillna(method='ffill').fillna(method='bfill')
-
-
-
-
-#===================================== NVIDIA NEWS API========================================================================
 
-    query_news_api = f'''SELECT date, sentiment_score FROM nvidia_news_api;'''
 
-    nvidia_news_api_df=pd.read_sql_query(query_news_api, conn)
-    nvidia_news_api_df['date']=pd.to_datetime(nvidia_news_api_df['date']).dt.date
-    nvidia_news_api_df=nvidia_news_api_df[['date','sentiment_score']]
-    nvidia_news_api_df=nvidia_news_api_df.groupby('date').mean()
-    nvidia_news_score_value=pd.merge(nvidia_values_df,nvidia_news_api_df, on='date', how='outer')
-    nvidia_news_score_value=nvidia_news_score_value.dropna(subset='low')
-    nvidia_news_score_value['mean']=nvidia_news_score_value[['high','low']].mean(axis=1)
-    if 'sentiment_score' in nvidia_news_score_value.columns:
-        nvidia_news_score_value['sentiment_score'] = nvidia_news_score_value['sentiment_score'].fillna(method='ffill').fillna(method='bfill')
+def aligned_arrays():
+    """NVIDIA prices (n, len(PRICE_FIELDS)) and daily sentiment (n, len(SOURCES)) on the trading days.
 
-#==================================== NVIDIA ORIGINAL SITE ===================================================================
+    Read from the feature store. The sentiment of the trading days without articles is carried
+    forward (and backward before the first article), so that a lag of k means k trading days earlier.
+    """
+    features = load_features()
+    traded = ~np.isnan(features.column('low_nvda'))
 
-    query_news_original = f'''SELECT date, sentiment_score FROM nvidia_originalsite_scrape;'''
+    prices = np.column_stack([features.column(f'{field}_nvda')[traded] for field in PRICE_FIELDS[:4]])
+    prices = np.column_stack([prices, prices[:, 1:3].mean(axis=1)])   # mean = (high + low) / 2
 
-    nvidia_original_df= pd.read_sql_query(query_news_original, conn)
-    nvidia_original_df['date']=pd.to_datetime(nvidia_original_df['date']).dt.date
-    nvidia_original_df=nvidia_original_df[['date','sentiment_score']]
-    nvidia_original_df=nvidia_original_df.groupby('date').mean()
-    nvidia_original_df=pd.merge(nvidia_original_df,nvidia_values_df,on='date', how='outer')
-    
-    nvidia_original_df=nvidia_original_df.dropna(subset='low')
-    nvidia_original_df['mean']=nvidia_original_df[['high','low']].mean(axis=1)
-    if 'sentiment_score' in nvidia_original_df.columns:
-        nvidia_original_df['sentiment_score'] = nvidia_original_df['sentiment_score'].fillna(method='ffill').fillna(method='bfill')
+    sentiment = pd.DataFrame({source: features.column(f'sentiment_{source}')[traded] for source in SOURCES})
+    sentiment = sentiment.ffill().bfill()
 
+    return features.days[traded], sentiment.to_numpy(dtype=float), prices
 
-#============================================== CORRELATIONS =================================================================
 
-#FT
-    MeanValue_Sentiment_Correlation = value_sentiment_df[['mean', 'sentiment_score']].corr().iloc[0, 1]
-    CloseValue_Sentiment_Correlation = value_sentiment_df[['close', 'sentiment_score']].corr().iloc[0, 1]
-    value_sentiment_df['prev_day_sentiment_score'] = value_sentiment_df['sentiment_score'].shift(1)
-    # Calculate the correlation between the sentiment score of the previous day and the stock value of the current day
-    PrevDaySentiment_mean_Correlation = value_sentiment_df[['mean', 'prev_day_sentiment_score']].corr().iloc[0, 1]
-    # Calculate the correlation between the sentiment score of the previous day and the stock open value of the current day
-    PrevDaySentiment_Open_Correlation = value_sentiment_df[['open', 'prev_day_sentiment_score']].corr().iloc[0, 1]
-    # Calculate the correlation between the sentiment score of the previous day and the stock close value of the current day
-    PrevDaySentiment_Close_Correlation = value_sentiment_df[['close', 'prev_day_sentiment_score']].corr().iloc[0, 1]
+def _summary(r, lags, source_index, prefix):
+    """The five correlations of the original report, taken from the lag matrix."""
+    def value(lag, field):
+        return safe_value(round(r[lags.index(lag), source_index, PRICE_FIELDS.index(field)], 2))
 
-#API
-    api_mean_correlation=nvidia_news_score_value[['mean','sentiment_score']].corr().iloc[0,1]
-    api_close_correlation=nvidia_news_score_value[['close','sentiment_score']].corr().iloc[0,1]
-    nvidia_news_score_value['prev_day_sentiment_score']=nvidia_news_score_value['sentiment_score'].shift(1)
-    api_mean_previous_score_correlation=nvidia_news_score_value[['mean','prev_day_sentiment_score']].corr().iloc[0,1]
-    api_open_previous_score_correlation=nvidia_news_score_value[['open','prev_day_sentiment_score']].corr().iloc[0,1]
-    api_close_previous_score_correlation=nvidia_news_score_value[['close','prev_day_sentiment_score']].corr().iloc[0,1]
-
-#ORIGINAL 
-
-    origin_mean_sentiment_corr=nvidia_original_df[['mean','sentiment_score']].corr().iloc[0,1]
-    origin_close_sentiment_corr=nvidia_original_df[['close','sentiment_score']].corr().iloc[0,1]
-    nvidia_original_df['prev_day_sentiment_score']=nvidia_original_df['sentiment_score'].shift(1)
-    origin_mean_prevscore_corr=nvidia_original_df[['mean','prev_day_sentiment_score']].corr().iloc[0,1]
-    origin_open_prevscore_corr=nvidia_original_df[['open','prev_day_sentiment_score']].corr().iloc[0,1]
-    origin_close_prevscore_corr=nvidia_original_df[['close','prev_day_sentiment_score']].corr().iloc[0,1]
-
-
-#=============================================== RETURN ================================================================
-
-    try:
-        ft_dict = {
-            "[FT] concurrent mean value - sentiment correlation": safe_value(MeanValue_Sentiment_Correlation.round(2)),
-            "[FT] concurrent close value - sentiment correlation": safe_value(CloseValue_Sentiment_Correlation.round(2)),
-            "[FT] preceding sentiment - mean value correlation": safe_value(PrevDaySentiment_mean_Correlation.round(2)),
-            "[FT] preceding sentiment - open value correlation": safe_value(PrevDaySentiment_Open_Correlation.round(2)),
-            "[FT] preceding sentiment - close value correlation": safe_value(PrevDaySentiment_Close_Correlation.round(2))
-        }
-    except Exception as e:
-        ft_dict = {
-            "[FT] concurrent mean value - sentiment correlation": 0,
-            "[FT] concurrent close value - sentiment correlation": 0,
-            "[FT] preceding sentiment - mean value correlation": 0,
-            "[FT] preceding sentiment - open value correlation": 0,
-            "[FT] preceding sentiment - close value correlation": 0
-        }
-
-    try:
-        news_api_dict = {
-            "[news api] concurrent mean value - sentiment correlation": safe_value(api_mean_correlation.round(2)),
-            "[news api] concurrent close value - sentiment correlation": safe_value(api_close_correlation.round(2)),
-            "[news api] preceding sentiment - mean value correlation": safe_value(api_mean_previous_score_correlation.round(2)),
-            "[news api] preceding sentiment - open value correlation": safe_value(api_open_previous_score_correlation.round(2)),
-            "[news api] preceding sentiment - close value correlation": safe_value(api_close_previous_score_correlation.round(2))
-        }
-    except Exception as e:
-        news_api_dict = {
-            "[news api] concurrent mean value - sentiment correlation": 0,
-            "[news api] concurrent close value - sentiment correlation": 0,
-            "[news api] preceding sentiment - mean value correlation": 0,
-            "[news api] preceding sentiment - open value correlation": 0,
-            "[news api] preceding sentiment - close value correlation": 0
-        }
-
-    try:
-        original_dict = {
-            "[original] concurrent mean value - sentiment correlation": safe_value(origin_mean_sentiment_corr.round(2)),
-            "[original] concurrent close value - sentiment correlation": safe_value(origin_close_sentiment_corr.round(2)),
-            "[original] preceding sentiment - mean value correlation": safe_value(origin_mean_prevscore_corr.round(2)),
-            "[original] preceding sentiment - open value correlation": safe_value(origin_open_prevscore_corr.round(2)),
-            "[original] preceding sentiment - close value correlation": safe_value(origin_close_prevscore_corr.round(2))
-        }
-    except Exception as e:
-        original_dict = {
-            "[original] concurrent mean value - sentiment correlation": 0,
-            "[original] concurrent close value - sentiment correlation": 0,
-            "[original] preceding sentiment - mean value correlation": 0,
-            "[original] preceding sentiment - open value correlation": 0,
-            "[original] preceding sentiment - close value correlation": 0
-        }
-
-    #It's obvious that zeroe
-
-    # Return the merged dictionary
-    merged_dict = {
-        "FT": ft_dict,
-        "news api": news_api_dict,
-        "original": original_dict
+    return {
+        f"{prefix} concurrent mean value - sentiment correlation": value(0, 'mean'),
+        f"{prefix} concurrent close value - sentiment correlation": value(0, 'close'),
+        f"{prefix} preceding sentiment - mean value correlation": value(1, 'mean'),
+        f"{prefix} preceding sentiment - open value correlation": value(1, 'open'),
+        f"{prefix} preceding sentiment - close value correlation": value(1, 'close'),
     }
 
-    return merged_dict
 
+def sentiment_analysis(max_lag=7, fields=None, min_lag=0):
+    """Correlation of each source's daily sentiment, lagged by min_lag..max_lag trading days, with the NVIDIA prices.
+
+    Every source x field x lag is computed in one vectorized pass. The response keeps the
+    concurrent/preceding-day summary per source and adds the lag matrix of the requested
+    `fields` and the strongest lag per source.
+    """
+    fields = list(fields or DEFAULT_FIELDS)
+    unknown = [field for field in fields if field not in PRICE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown price fields: {', '.join(unknown)}")
+    if not 0 <= min_lag <= max_lag <= MAX_LAG:
+        raise ValueError(f"Lags must satisfy 0 <= min_lag <= max_lag <= {MAX_LAG}")
+
+    with timed_step('analysis_2', 'merge'):
+        dates, scores, prices = aligned_arrays()
+
+    # Lags 0 and 1 are always computed for the summary
+    lags = sorted(set(range(min_lag, max_lag + 1)) | {0, 1})
+    with timed_step('analysis_2', 'correlate'):
+        r, pairs = lagged_correlations(scores, prices, lags)
+
+    requested = [lags.index(lag) for lag in range(min_lag, max_lag + 1)]
+    field_indexes = [PRICE_FIELDS.index(field) for field in fields]
+    r_requested = r[np.ix_(requested, range(len(SOURCES)), field_indexes)]
+    requested_lags = [lags[i] for i in requested]
+
+    result = {}
+    lag_matrix = {}
+    best_lag = {}
+    for s, (source, (key, prefix)) in enumerate(SOURCES.items()):
+        result[key] = _summary(r, lags, s, prefix)
+        lag_matrix[source] = {
+            field: [None if np.isnan(value) else round(float(value), 4) for value in r_requested[:, s, f]]
+            for f, field in enumerate(fields)
+        }
+    for source, best in zip(SOURCES, best_lags(r_requested, requested_lags)):
+        if best is not None:
+            lag, f, value = best
+            best = {"lag": lag, "field": fields[f], "correlation": round(float(value), 4),
+                    "pairs": int(pairs[lags.index(lag), list(SOURCES).index(source), field_indexes[f]])}
+        best_lag[source] = best
+
+    result.update({
+        "days": len(dates),
+        "lags": requested_lags,
+        "fields": fields,
+        "lag_matrix": lag_matrix,
+        "best_lag": best_lag,
+    })
+    return result
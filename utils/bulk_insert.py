@@ -0,0 +1,126 @@
+import csv
+from io import StringIO
+from psycopg2.extras import execute_values
+from utils.cache import bump_data_version
+from utils.metrics import timed, DB_WRITE_SECONDS, DB_WRITE_ERRORS, DB_ROWS
+
+# ============================
+#    Batched bulk writer
+# ============================
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class BulkWriter:
+    """Buffer rows in memory and write them in batches, one transaction per batch.
+
+    method="copy" streams each batch with COPY FROM STDIN (fastest, plain appends).
+    method="values" uses execute_values and is required when `on_conflict` is given,
+    e.g. on_conflict="(date) DO NOTHING". With an ON CONFLICT ... DO UPDATE clause pass the key
+    column as `dedupe_on`, since Postgres refuses to update the same row twice in one statement.
+    `before_batch(cursor, batch)` and `after_batch(cursor, batch)` run inside the batch transaction
+    before and after the insert, e.g. to maintain an aggregate, and `after_commit(conn, batch)` once
+    the batch is committed, e.g. to update data kept outside the database.
+
+    Use it as a context manager so the last partial batch is flushed:
+
+        with BulkWriter(conn, "nvidia_news_api", ["title", "link"]) as writer:
+            writer.add((title, link))
+    """
+
+    def __init__(self, conn, table, columns, batch_size=DEFAULT_BATCH_SIZE, method="copy",
+                 on_conflict=None, dedupe_on=None, before_batch=None, after_batch=None, after_commit=None,
+                 progress=None):
+        if method not in ("copy", "values"):
+            raise ValueError(f"Unknown bulk insert method: {method}")
+        if on_conflict and method == "copy":
+            method = "values"
+        self.conn = conn
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.method = method
+        self.on_conflict = on_conflict
+        self.dedupe_on = dedupe_on
+        self.before_batch = before_batch
+        self.after_batch = after_batch
+        self.after_commit = after_commit
+        self.progress = progress
+        self.rows_written = 0
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._buffer = []
+
+    def add(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        """Write the buffered rows in a single transaction and return how many were inserted."""
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        cursor = self.conn.cursor()
+        try:
+            with timed(DB_WRITE_SECONDS, DB_WRITE_ERRORS, table=self.table):
+                if self.before_batch is not None:
+                    self.before_batch(cursor, batch)
+                if self.method == "copy":
+                    inserted = self._copy(cursor, batch)
+                else:
+                    inserted = self._values(cursor, batch)
+                if self.after_batch is not None:
+                    self.after_batch(cursor, batch)
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self.rows_written += inserted
+        DB_ROWS.labels(table=self.table).inc(inserted)
+        if inserted:
+            if self.after_commit is not None:
+                self.after_commit(self.conn, batch)
+            # Cached analysis/visualization results are stale now
+            bump_data_version()
+        if self.progress is not None:
+            self.progress.update(rows=inserted)
+        return inserted
+
+    def _copy(self, cursor, batch):
+        buf = StringIO()
+        writer = csv.writer(buf)
+        for row in batch:
+            # NULL is sent as \N so that empty strings are kept as empty strings
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buf.seek(0)
+        cursor.copy_expert(
+            f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+        )
+        return len(batch)
+
+    def _values(self, cursor, batch):
+        if self.dedupe_on:
+            # Keep the last row for each key of the batch (NULL keys never conflict)
+            key = self.columns.index(self.dedupe_on)
+            latest = {row[key]: row for row in batch if row[key] is not None}
+            batch = [row for row in batch if row[key] is None] + list(latest.values())
+        query = f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES %s"
+        if self.on_conflict:
+            query += f" ON CONFLICT {self.on_conflict}"
+        execute_values(cursor, query, batch, page_size=len(batch))
+        return cursor.rowcount
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from utils.settings import get_settings
+
+# ============================
+#    Response cache
+# ============================
+
+# Results of the analysis/visualization endpoints are cached per (endpoint, parameters, data version).
+# The ingestion paths bump the data version after every committed batch, which invalidates every
+# entry at once. With a directory configured the entries and the version are also kept on disk,
+# so they survive restarts and are shared by several worker processes.
+
+DEFAULT_MAX_ENTRIES = 128
+VERSION_FILE = "data_version"
+
+
+class CacheEntry:
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ResultCache:
+    """LRU cache of rendered responses keyed by endpoint, parameters and data version."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = 0
+        self._version_mtime = None
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---- data version ----
+
+    def _version_path(self):
+        return os.path.join(self.directory, VERSION_FILE)
+
+    def data_version(self):
+        if not self.directory:
+            return self._version
+        try:
+            mtime = os.stat(self._version_path()).st_mtime_ns
+        except FileNotFoundError:
+            return self._version
+        if mtime != self._version_mtime:
+            with open(self._version_path()) as file:
+                self._version = int(file.read().strip() or 0)
+            self._version_mtime = mtime
+        return self._version
+
+    def bump_data_version(self):
+        """Invalidate every cached result (called after new data is committed)."""
+        with self._lock:
+            self._version = self.data_version() + 1
+            if self.directory:
+                tmp_path = self._version_path() + ".tmp"
+                with open(tmp_path, "w") as file:
+                    file.write(str(self._version))
+                os.replace(tmp_path, self._version_path())
+                for name in os.listdir(self.directory):
+                    if name.endswith(".pkl"):
+                        os.remove(os.path.join(self.directory, name))
+            self._entries.clear()
+
+    # ---- entries ----
+
+    def key(self, endpoint, params):
+        """Key of a result, taken before building it so that it carries the data version it was built from."""
+        return (endpoint, tuple(sorted(params.items())), self.data_version())
+
+    def _file(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.directory:
+            try:
+                with open(self._file(key), "rb") as file:
+                    entry = pickle.load(file)
+            except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+                entry = None
+            if entry is not None:
+                self._store(key, entry)
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, body, media_type):
+        """Store a result under the key returned by key() before it was built.
+
+        A result built while an ingestion bumped the data version may already be stale: it is
+        returned for the current request but not stored.
+        """
+        entry = CacheEntry(body, media_type)
+        if key[2] != self.data_version():
+            return entry
+        self._store(key, entry)
+        if self.directory:
+            tmp_path = self._file(key) + ".tmp"
+            with open(tmp_path, "wb") as file:
+                pickle.dump(entry, file)
+            os.replace(tmp_path, self._file(key))
+        return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                if self.directory:
+                    try:
+                        os.remove(self._file(old_key))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "data_version": self.data_version(),
+            "directory": self.directory,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide cache, configured from the optional [response_cache] section."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                config = get_settings().response_cache
+                _cache = ResultCache(config.max_entries, config.directory)
+            except Exception as e:
+                print(f"Response cache uses its defaults: {e}")
+                _cache = ResultCache()
+        return _cache
+
+
+def bump_data_version():
+    get_response_cache().bump_data_version()
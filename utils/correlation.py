@@ -0,0 +1,64 @@
+import numpy as np
+
+# ============================
+#    Lagged correlation engine
+# ============================
+
+# Correlations over fewer (score, price) pairs are reported as NaN. Series.corr (min_periods=1)
+# reports +-1 for two pairs, a value that only says the two points differ.
+MIN_PAIRS = 3
+
+
+def shift_rows(values, lags):
+    """Stack `values` (n, k) shifted down by every lag: result[i, t] = values[t - lags[i]], NaN padded."""
+    n = len(values)
+    shifted = np.full((len(lags), *values.shape), np.nan)
+    for i, lag in enumerate(lags):
+        if lag < n:
+            shifted[i, lag:] = values[:n - lag]
+    return shifted
+
+
+def lagged_correlations(scores, prices, lags):
+    """Pearson correlation of every score column, lagged, with every price column.
+
+    `scores` (n, S) and `prices` (n, F) are aligned row by row; NaN marks a missing value and
+    only the pairs where both sides are present are used, as Series.corr does (except that
+    fewer than MIN_PAIRS pairs give NaN). Returns
+    (r, pairs), both shaped (len(lags), S, F): r[i, s, f] correlates scores[t - lags[i], s]
+    with prices[t, f].
+    """
+    scores = np.asarray(scores, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    # Centering first keeps the sums of squares accurate for prices far from zero
+    scores = scores - np.nanmean(scores, axis=0) if len(scores) else scores
+    prices = prices - np.nanmean(prices, axis=0) if len(prices) else prices
+
+    x = shift_rows(scores, lags)[:, :, :, None]    # (L, n, S, 1)
+    y = prices[None, :, None, :]                    # (1, n, 1, F)
+    valid = ~np.isnan(x) & ~np.isnan(y)             # (L, n, S, F)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    pairs = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sx, sy = x.sum(axis=1), y.sum(axis=1)
+        cov = (x * y).sum(axis=1) - sx * sy / pairs
+        var_x = (x * x).sum(axis=1) - sx * sx / pairs
+        var_y = (y * y).sum(axis=1) - sy * sy / pairs
+        r = cov / np.sqrt(var_x * var_y)
+    r[(pairs < MIN_PAIRS) | ~(var_x > 1e-12) | ~(var_y > 1e-12)] = np.nan
+    return np.clip(r, -1.0, 1.0), pairs
+
+
+def best_lags(r, lags):
+    """Strongest |correlation| of every source of r (L, S, F): (lag, field index, r), or None if all NaN."""
+    best = []
+    for s in range(r.shape[1]):
+        block = np.abs(r[:, s, :])
+        if np.all(np.isnan(block)):
+            best.append(None)
+            continue
+        i, f = np.unravel_index(np.nanargmax(block), block.shape)
+        best.append((lags[i], f, r[i, s, f]))
+    return best
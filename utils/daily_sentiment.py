@@ -0,0 +1,110 @@
+from datetime import date, datetime
+
+# ============================
+#    Daily sentiment aggregate
+# ============================
+
+# Article table -> source label used by the analysis and visualization functions
+SENTIMENT_SOURCES = {
+    'nvidia_news_api': 'api_news',
+    'nvidia_originalsite_scrape': 'original',
+    'nvidia_fintimes_scrape': 'ft',
+}
+
+
+def create_daily_sentiment_table(conn):
+    cur = conn.cursor()
+    cur.execute('''CREATE TABLE IF NOT EXISTS daily_sentiment (
+        source TEXT NOT NULL,
+        day DATE NOT NULL,
+        n_articles INTEGER NOT NULL,
+        sum_score DOUBLE PRECISION NOT NULL,
+        mean_score DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (source, day)
+    )''')
+    conn.commit()
+    cur.close()
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+def refresh_days(cur, table, days):
+    """Recompute the aggregate of `table` for the given days from its rows (inside the caller's transaction).
+
+    A day left without articles loses its row.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    source = SENTIMENT_SOURCES[table]
+    cur.execute('''DELETE FROM daily_sentiment WHERE source = %s AND day = ANY(%s)''', (source, days))
+    cur.execute(f'''INSERT INTO daily_sentiment (source, day, n_articles, sum_score, mean_score)
+        SELECT %s, day, COUNT(*), COALESCE(SUM(sentiment_score), 0), COALESCE(AVG(sentiment_score), 0)
+        FROM {table}
+        WHERE day = ANY(%s)
+        GROUP BY day''',
+                (source, days))
+
+
+class DailySentimentUpdater:
+    """BulkWriter hooks that refresh the days touched by a batch of article rows.
+
+    The upsert of a re-ingested article also rewrites its date, so `before_batch` reads the day
+    stored for every link of the batch: the days articles move away from are refreshed as well,
+    and `moved_days()` returns them for the feature store (see feature_store_updater).
+    """
+
+    def __init__(self, table, date_index, link_index=1):
+        self.table = table
+        self.date_index = date_index
+        self.link_index = link_index
+        self._previous = set()
+
+    def before_batch(self, cur, batch):
+        links = [row[self.link_index] for row in batch if row[self.link_index] is not None]
+        cur.execute(f'''SELECT DISTINCT day FROM {self.table} WHERE link = ANY(%s) AND day IS NOT NULL''',
+                    (links,))
+        self._previous = {row[0] for row in cur.fetchall()}
+
+    def after_batch(self, cur, batch):
+        refresh_days(cur, self.table, self._previous | set(self._batch_days(batch)))
+
+    def moved_days(self):
+        """Days of the last batch's links before the upsert (whether or not their date changed)."""
+        return self._previous
+
+    def _batch_days(self, batch):
+        return (_day(row[self.date_index]) for row in batch if row[self.date_index] is not None)
+
+
+def daily_sentiment_updater(table, date_index, link_index=1):
+    """DailySentimentUpdater of `table`; pass its before_batch and after_batch hooks to the BulkWriter."""
+    return DailySentimentUpdater(table, date_index, link_index)
+
+
+def rebuild_daily_sentiment(conn, table):
+    """Recompute the whole aggregate of one article table (after a migration or a dedup)."""
+    source = SENTIMENT_SOURCES[table]
+    cur = conn.cursor()
+    cur.execute('''DELETE FROM daily_sentiment WHERE source = %s''', (source,))
+    cur.execute(f'''INSERT INTO daily_sentiment (source, day, n_articles, sum_score, mean_score)
+        SELECT %s, day, COUNT(*), COALESCE(SUM(sentiment_score), 0), COALESCE(AVG(sentiment_score), 0)
+        FROM {table}
+        WHERE day IS NOT NULL
+        GROUP BY day''', (source,))
+    conn.commit()
+    cur.close()
+
+
+def has_daily_sentiment(conn, table):
+    cur = conn.cursor()
+    cur.execute('''SELECT 1 FROM daily_sentiment WHERE source = %s LIMIT 1''', (SENTIMENT_SOURCES[table],))
+    found = cur.fetchone() is not None
+    cur.close()
+    return found
@@ -0,0 +1,149 @@
+import pandas as pd
+from sqlalchemy import text
+from .helpers import pandas_db_connection
+from .daily_sentiment import SENTIMENT_SOURCES
+from .metrics import timed, QUERY_SECONDS, QUERY_ROWS
+
+# ============================
+#    Typed data loader
+# ============================
+
+# Shared by the analysis and visualization functions: only the needed columns are selected,
+# the date range and the truncation to days are done in SQL, and the rows are streamed in
+# chunks (server-side cursor) into compact dtypes: float32 sentiment scores, categorical
+# source/symbol and dates truncated to the day. Prices stay float64 so the regression
+# results do not change.
+
+CHUNK_SIZE = 50_000
+STOCK_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+ARTICLE_COLUMNS = ['title', 'link', 'source', 'text', 'sentiment', 'sentiment_score']
+
+DTYPES = {
+    'source': 'category',
+    'symbol': 'category',
+    'sentiment_score': 'float32',
+    'n_articles': 'int32',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64',
+}
+
+
+def _typed(frame):
+    if 'date' in frame.columns:
+        # pandas has no day resolution; second resolution is the most compact one
+        frame['date'] = pd.to_datetime(frame['date']).astype('datetime64[s]')
+    return frame.astype({column: dtype for column, dtype in DTYPES.items() if column in frame.columns})
+
+
+def read_frame(sql, params=None, chunksize=CHUNK_SIZE, query='custom'):
+    """Run `sql` (named :params) through a server-side cursor and return one typed DataFrame.
+
+    `query` labels the query in the db_query_* metrics.
+    """
+    engine = pandas_db_connection()
+    if engine is None:
+        raise RuntimeError("The database is not available")
+    with timed(QUERY_SECONDS, query=query):
+        with engine.connect().execution_options(stream_results=True) as conn:
+            chunks = [_typed(chunk) for chunk in pd.read_sql_query(text(sql), conn, params=params or {},
+                                                                   chunksize=chunksize)]
+    QUERY_ROWS.labels(query=query).inc(sum(len(chunk) for chunk in chunks))
+    if not chunks:
+        return pd.DataFrame()
+    frame = pd.concat(chunks, ignore_index=True)
+    # Concatenating categoricals with different categories falls back to object
+    return frame.astype({column: 'category' for column in ('source', 'symbol') if column in frame.columns})
+
+
+def _date_filter(column, start_date, end_date, params):
+    conditions = []
+    if start_date:
+        conditions.append(f"{column} >= :start_date")
+        params['start_date'] = start_date
+    if end_date:
+        conditions.append(f"{column} <= :end_date")
+        params['end_date'] = end_date
+    return conditions
+
+
+def _where(conditions):
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def load_stock_values(symbols, columns=('close',), start_date=None, end_date=None):
+    """Daily bars of `symbols` in long format: symbol, date and the requested price columns."""
+    unknown = [column for column in columns if column not in STOCK_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown stock columns: {', '.join(unknown)}")
+    params = {'symbols': [symbol.upper() for symbol in symbols]}
+    conditions = ["symbol = ANY(:symbols)"] + _date_filter('date', start_date, end_date, params)
+    sql = f"SELECT symbol, date, {', '.join(columns)} FROM stock_values{_where(conditions)} ORDER BY date"
+    frame = read_frame(sql, params, query='stock_values')
+    if frame.empty:
+        return pd.DataFrame(columns=['symbol', 'date', *columns])
+    return frame
+
+
+def load_stock_wide(symbols, column='close', start_date=None, end_date=None):
+    """One `{column}_{symbol}` column per symbol (lower case), indexed by date."""
+    frame = load_stock_values(symbols, [column], start_date, end_date)
+    wide = frame.pivot(index='date', columns='symbol', values=column)
+    wide = wide.reindex(columns=[symbol.upper() for symbol in symbols])
+    wide.columns = [f"{column}_{symbol.lower()}" for symbol in symbols]
+    wide.columns.name = None
+    return wide
+
+
+def load_daily_sentiment(sources=tuple(SENTIMENT_SOURCES.values()), start_date=None, end_date=None,
+                         weekdays_only=False):
+    """Daily mean sentiment per source from daily_sentiment: source, date, sentiment_score.
+
+    With `weekdays_only`, every weekday between the first and last day of each source is
+    returned, the days without articles scoring 0 (the calendar used by the regression).
+    """
+    params = {'sources': list(sources)}
+    if not weekdays_only:
+        conditions = ["source = ANY(:sources)"] + _date_filter('day', start_date, end_date, params)
+        sql = f'''SELECT source, day AS date, mean_score AS sentiment_score
+            FROM daily_sentiment{_where(conditions)} ORDER BY day'''
+    else:
+        conditions = ["EXTRACT(DOW FROM all_dates.date) NOT IN (0, 6)"]  # Exclude Sundays (0) and Saturdays (6)
+        conditions += _date_filter('all_dates.date', start_date, end_date, params)
+        sql = f'''
+            WITH bounds AS (
+                SELECT source, MIN(day) AS first_day, MAX(day) AS last_day
+                FROM daily_sentiment
+                WHERE source = ANY(:sources)
+                GROUP BY source
+            ),
+            all_dates AS (
+                SELECT source, generate_series(first_day, last_day, '1 day'::interval)::date AS date
+                FROM bounds
+            )
+            SELECT all_dates.source, all_dates.date, COALESCE(d.mean_score, 0) AS sentiment_score
+            FROM all_dates
+            LEFT JOIN daily_sentiment d ON d.source = all_dates.source AND d.day = all_dates.date
+            {_where(conditions)}
+            ORDER BY all_dates.date'''
+    frame = read_frame(sql, params, query='daily_sentiment')
+    if frame.empty:
+        return pd.DataFrame({'source': pd.Categorical([]), 'date': pd.Series(dtype='datetime64[s]'),
+                             'sentiment_score': pd.Series(dtype='float32')})
+    return frame
+
+
+def load_articles(table, columns=('sentiment_score',), start_date=None, end_date=None):
+    """Rows of an article table with their day (as `date`) and the requested columns."""
+    unknown = [column for column in columns if column not in ARTICLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown article columns: {', '.join(unknown)}")
+    params = {}
+    conditions = _date_filter('day', start_date, end_date, params)
+    # NUMERIC scores are cast in SQL, psycopg2 would return them as Decimal objects
+    select = ', '.join('sentiment_score::real AS sentiment_score' if column == 'sentiment_score' else column
+                       for column in columns)
+    sql = f"SELECT day AS date, {select} FROM {table}{_where(conditions)} ORDER BY day"
+    return read_frame(sql, params, query='articles')
@@ -0,0 +1,138 @@
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine
+from psycopg2.pool import ThreadedConnectionPool
+from utils.settings import get_settings
+
+# ============================
+#    Shared database pools
+# ============================
+
+_lock = threading.Lock()
+_engine = None
+_pg_pool = None
+_pg_slots = None
+
+
+def pool_config():
+    """Return the [database_pool] settings (defaults in utils.settings.DatabasePool)."""
+    return get_settings().database_pool
+
+
+def _credentials():
+    credentials = get_settings().database_credentials
+    if credentials is None:
+        raise Exception("Missing [database_credentials] section in keys.toml.")
+    return credentials
+
+
+def _database_url(credentials):
+    if not credentials.password:
+        return f'postgresql+psycopg2://{credentials.username}@{credentials.host}:{credentials.port}/{credentials.database}'
+    return (f'postgresql+psycopg2://{credentials.username}:{credentials.password}'
+            f'@{credentials.host}:{credentials.port}/{credentials.database}')
+
+
+def connect_kwargs(credentials):
+    """psycopg2.connect keyword arguments for the [database_credentials] section."""
+    kwargs = {
+        'dbname': credentials.database,
+        'user': credentials.username,
+        'host': credentials.host,
+        'port': credentials.port,
+    }
+    if credentials.password:
+        kwargs['password'] = credentials.password
+    return kwargs
+
+
+def init_db_pools():
+    """Create the process-wide SQLAlchemy engine and psycopg2 pool (called once from the app lifespan)."""
+    global _engine, _pg_pool, _pg_slots
+    with _lock:
+        if _engine is not None:
+            return
+        credentials = _credentials()
+        config = pool_config()
+
+        _engine = create_engine(
+            _database_url(credentials),
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_recycle=config.pool_recycle,
+            pool_timeout=config.pool_timeout,
+            pool_pre_ping=True,
+        )
+        _pg_pool = ThreadedConnectionPool(config.min_connections, config.max_connections,
+                                          **connect_kwargs(credentials))
+        # ThreadedConnectionPool raises when it is exhausted, the semaphore makes callers wait instead
+        _pg_slots = threading.BoundedSemaphore(config.max_connections)
+
+
+def close_db_pools():
+    """Dispose the engine and close every pooled connection (called on application shutdown)."""
+    global _engine, _pg_pool, _pg_slots
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+        _engine = None
+        _pg_pool = None
+        _pg_slots = None
+
+
+def get_engine():
+    """Return the shared SQLAlchemy engine, creating the pools on first use outside of the app."""
+    if _engine is None:
+        init_db_pools()
+    return _engine
+
+
+@contextmanager
+def db_connection():
+    """Borrow a psycopg2 connection from the shared pool and give it back afterwards.
+
+    The transaction is rolled back if the block raises.
+    """
+    if _pg_pool is None:
+        init_db_pools()
+    pool, slots = _pg_pool, _pg_slots
+    slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        # Database down or refusing the login: give the slot back or the callers would wait forever
+        slots.release()
+        raise
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+        slots.release()
+
+
+def pool_stats():
+    """Usage of both pools, exposed by the /db/pool_stats endpoint."""
+    if _engine is None:
+        return {"initialized": False}
+    engine_pool = _engine.pool
+    config = pool_config()
+    return {
+        "initialized": True,
+        "sqlalchemy": {
+            "size": engine_pool.size(),
+            "checked_in": engine_pool.checkedin(),
+            "checked_out": engine_pool.checkedout(),
+            "overflow": engine_pool.overflow(),
+            "max_overflow": config.max_overflow,
+        },
+        "psycopg2": {
+            "in_use": len(_pg_pool._used),
+            "idle": len(_pg_pool._pool),
+            "max_connections": _pg_pool.maxconn,
+        },
+    }
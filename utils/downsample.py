@@ -0,0 +1,46 @@
+import numpy as np
+
+# ============================
+#    Series downsampling
+# ============================
+
+# Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps `threshold` points of a series
+# so that its drawn shape stays the same. The first and last points are kept; every bucket
+# in between contributes the point forming the largest triangle with the point kept in the
+# previous bucket and the mean of the next bucket, which preserves peaks and dips.
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points LTTB keeps, sorted; all the indices when the series is short enough.
+
+    `x` must be increasing (dates are taken as nanoseconds). NaN values of `y` are never kept.
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x = x.astype(float)
+    y = np.asarray(y, dtype=float)
+
+    valid = np.flatnonzero(~np.isnan(y))
+    if threshold >= len(valid) or threshold < 3:
+        return valid
+    x, y = x[valid], y[valid]
+    n = len(valid)
+
+    # Buckets of the points between the first and the last one
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Mean of the next bucket (the last point for the last bucket)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        # Twice the triangle areas, enough for the argmax
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return valid[kept]
@@ -0,0 +1,212 @@
+import csv
+import io
+import uuid
+from datetime import date
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .db import db_connection
+from .schema import ARTICLE_TABLES
+
+# ============================
+#    Table export
+# ============================
+
+# Tables are read with a server-side cursor and written chunk by chunk, so an export holds
+# at most one chunk in memory whatever the size of the table.
+
+DEFAULT_CHUNK_SIZE = 10_000
+MAX_CHUNK_SIZE = 100_000
+
+FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'csv': ('text/csv', 'csv'),
+}
+
+_ARTICLE_COLUMNS = {
+    'title': ('title', pa.string()),
+    'link': ('link', pa.string()),
+    'date': ('date', pa.timestamp('us')),
+    'source': ('source', pa.string()),
+    'text': ('text', pa.string()),
+    'sentiment': ('sentiment', pa.string()),
+    'sentiment_score': ('sentiment_score::double precision', pa.float64()),
+    'day': ('day', pa.date32()),
+}
+
+# Exportable table -> (column -> (SQL expression, Arrow type), day column, source column)
+EXPORT_TABLES = {
+    **{table: (_ARTICLE_COLUMNS, 'day', 'source') for table in ARTICLE_TABLES},
+    'daily_sentiment': ({
+        'source': ('source', pa.string()),
+        'day': ('day', pa.date32()),
+        'n_articles': ('n_articles', pa.int32()),
+        'sum_score': ('sum_score', pa.float64()),
+        'mean_score': ('mean_score', pa.float64()),
+    }, 'day', 'source'),
+    'stock_values': ({
+        'symbol': ('symbol', pa.string()),
+        'date': ('date', pa.date32()),
+        'open': ('open', pa.float64()),
+        'high': ('high', pa.float64()),
+        'low': ('low', pa.float64()),
+        'close': ('close', pa.float64()),
+        'volume': ('volume', pa.float64()),
+    }, 'date', 'symbol'),
+}
+
+
+def _parse_day(value, name):
+    # Checked here: a malformed date would otherwise only fail once the stream has started
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name} {value!r}, expected Year-Month-Day")
+
+
+def parse_day_range(start_date=None, end_date=None):
+    """(start, end) dates of optional Year-Month-Day strings; ValueError when malformed or reversed."""
+    start, end = _parse_day(start_date, 'start_date'), _parse_day(end_date, 'end_date')
+    if start and end and start > end:
+        raise ValueError("start_date must not be after end_date")
+    return start, end
+
+
+def export_query(table, columns=None, start_date=None, end_date=None, sources=None):
+    """Build the SELECT of an export and the Arrow schema of its result.
+
+    `start_date`/`end_date` (inclusive) filter on the day column of the table and `sources` on
+    its source column (the symbol for stock_values). Raises KeyError for an unknown table and
+    ValueError for an unknown column, a date that is not Year-Month-Day or a reversed range.
+    """
+    spec, day_column, source_column = EXPORT_TABLES[table]
+    start_date, end_date = parse_day_range(start_date, end_date)
+    columns = columns or list(spec)
+    unknown = [column for column in columns if column not in spec]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{day_column} >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{day_column} <= %s")
+        params.append(end_date)
+    if sources:
+        conditions.append(f"{source_column} = ANY(%s)")
+        params.append(list(sources))
+
+    select = ", ".join(f"{spec[column][0]} AS {column}" for column in columns)
+    sql = f"SELECT {select} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {day_column}"
+    schema = pa.schema([(column, spec[column][1]) for column in columns])
+    return sql, params, schema
+
+
+def iter_chunks(sql, params, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of rows read through a server-side cursor."""
+    with db_connection() as conn:
+        cur = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+        cur.itersize = chunk_size
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+            # Read-only transaction; also ends it when the client disconnects mid-stream
+            conn.rollback()
+
+
+def _record_batch(rows, schema):
+    arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing back whatever was written since the last `drain()`."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _stream_arrow(chunks, schema):
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.drain()
+    for rows in chunks:
+        writer.write_batch(_record_batch(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _stream_parquet(chunks, schema):
+    # One row group per chunk; the footer is written when the last chunk is done
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    for rows in chunks:
+        writer.write_batch(_record_batch(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _stream_csv(chunks, schema):
+    buffer = io.StringIO()
+    out = csv.writer(buffer)
+    out.writerow(schema.names)
+    for rows in chunks:
+        out.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+_WRITERS = {'arrow': _stream_arrow, 'parquet': _stream_parquet, 'csv': _stream_csv}
+
+
+def stream_export(table, fmt='arrow', columns=None, start_date=None, end_date=None, sources=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE, chunks=None):
+    """Return (byte chunk iterator, media type, file name) of a table export.
+
+    The query is validated before anything is read, so bad arguments raise here rather than
+    in the middle of the stream. `chunks` replaces the database reader (lists of rows).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}, expected one of {', '.join(FORMATS)}")
+    sql, params, schema = export_query(table, columns, start_date, end_date, sources)
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    if chunks is None:
+        chunks = iter_chunks(sql, params, chunk_size)
+    media_type, extension = FORMATS[fmt]
+    body = (data for data in _WRITERS[fmt](chunks, schema) if data)
+    return body, media_type, f"{table}.{extension}"
+
@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from utils.settings import get_settings, MAIN_DIR
+from .daily_sentiment import SENTIMENT_SOURCES, _day
+from .db import db_connection
+
+# ============================
+#    Daily feature store
+# ============================
+
+# One aligned matrix with a row per calendar day and a column per feature, saved as a .npy
+# file and memory-mapped by the readers, so the analysis endpoints get column views without
+# copying or querying anything. Columns:
+#   {open,high,low,close}_{symbol}   daily bars of every symbol in stock_values (NaN when closed)
+#   sentiment_{source}               mean sentiment of the day (NaN without articles)
+#   n_articles_{source}              number of articles of the day
+#   sentiment_{source}_lag{k}        sentiment of k days earlier, k = 1..lags
+# The ingestion writers refresh the days of every committed batch (see feature_store_updater)
+# in a copy of the matrix that atomically replaces the file, so a reader never sees a
+# half-refreshed row.
+
+DEFAULT_DIRECTORY = os.path.join(MAIN_DIR, ".cache", "features")
+DEFAULT_LAGS = 7
+PRICE_FIELDS = ['open', 'high', 'low', 'close']
+SOURCES = list(SENTIMENT_SOURCES.values())
+MATRIX_FILE = "features.npy"
+META_FILE = "features.json"
+
+
+def feature_columns(symbols, lags):
+    columns = [f"{field}_{symbol.lower()}" for symbol in symbols for field in PRICE_FIELDS]
+    columns += [f"{kind}_{source}" for source in SOURCES for kind in ('sentiment', 'n_articles')]
+    columns += [f"sentiment_{source}_lag{k}" for source in SOURCES for k in range(1, lags + 1)]
+    return columns
+
+
+class FeatureMatrix:
+    """Read-only view on the stored matrix, rows are the days from `first_day` on."""
+
+    def __init__(self, values, columns, first_day):
+        self.values = values
+        self.columns = list(columns)
+        self.first_day = first_day
+        self._index = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def days(self):
+        start = np.datetime64(self.first_day or date.today(), 'D')
+        return start + np.arange(len(self.values))
+
+    def column(self, name):
+        """View on one column (no copy); all NaN for a feature the store does not have."""
+        if name not in self._index:
+            return np.full(len(self.values), np.nan)
+        return self.values[:, self._index[name]]
+
+    def frame(self):
+        """The whole matrix as a DataFrame indexed by day, sharing the memory-mapped buffer."""
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.days, name='date'),
+                            columns=self.columns, copy=False)
+
+
+class FeatureStore:
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, lags=DEFAULT_LAGS):
+        self.directory = directory
+        self.lags = lags
+        self._matrix = None
+        self._meta_mtime = None
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path(META_FILE)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    # ---- reading ----
+
+    def load(self):
+        """Return the FeatureMatrix, building it from the database on first use.
+
+        The file is memory-mapped once and mapped again only when another writer replaced it.
+        """
+        with self._lock:
+            try:
+                mtime = os.stat(self._path(META_FILE)).st_mtime_ns
+            except FileNotFoundError:
+                with db_connection() as conn:
+                    self.rebuild(conn)
+                mtime = os.stat(self._path(META_FILE)).st_mtime_ns
+            if self._matrix is None or mtime != self._meta_mtime:
+                meta = self._read_meta()
+                # An empty file cannot be memory-mapped
+                values = np.load(self._path(MATRIX_FILE), mmap_mode='r' if meta['days'] else None)
+                first_day = date.fromisoformat(meta['first_day']) if meta['first_day'] else None
+                self._matrix = FeatureMatrix(values, meta['columns'], first_day)
+                self._meta_mtime = mtime
+            return self._matrix
+
+    # ---- writing ----
+
+    def _write(self, values, symbols, first_day):
+        """Replace the files atomically (readers keep their old mapping until they reload)."""
+        tmp_matrix = self._path(MATRIX_FILE + ".tmp.npy")
+        np.save(tmp_matrix, values)
+        os.replace(tmp_matrix, self._path(MATRIX_FILE))
+        self._write_meta(symbols, first_day, len(values))
+
+    def _write_meta(self, symbols, first_day, n_days):
+        meta = {
+            "symbols": symbols,
+            "lags": self.lags,
+            "columns": feature_columns(symbols, self.lags),
+            "first_day": first_day.isoformat() if first_day else None,
+            "days": n_days,
+        }
+        tmp_meta = self._path(META_FILE + ".tmp")
+        with open(tmp_meta, "w") as file:
+            json.dump(meta, file)
+        os.replace(tmp_meta, self._path(META_FILE))
+
+    def _base_rows(self, conn, first_day, last_day, symbols):
+        """Prices, sentiment and article counts of first_day..last_day read from the database.
+
+        Returns an array shaped (days, len(columns)) with the lag columns left NaN.
+        """
+        columns = feature_columns(symbols, self.lags)
+        index = {column: i for i, column in enumerate(columns)}
+        rows = np.full(((last_day - first_day).days + 1, len(columns)), np.nan)
+        for source in SOURCES:
+            rows[:, index[f"n_articles_{source}"]] = 0
+
+        cur = conn.cursor()
+        cur.execute('''SELECT symbol, date, open, high, low, close FROM stock_values
+            WHERE date BETWEEN %s AND %s AND symbol = ANY(%s)''', (first_day, last_day, symbols))
+        for symbol, day, *prices in cur.fetchall():
+            for field, value in zip(PRICE_FIELDS, prices):
+                rows[(day - first_day).days, index[f"{field}_{symbol.lower()}"]] = value
+        cur.execute('''SELECT source, day, n_articles, mean_score FROM daily_sentiment
+            WHERE day BETWEEN %s AND %s''', (first_day, last_day))
+        for source, day, n_articles, mean_score in cur.fetchall():
+            if source in SOURCES:
+                rows[(day - first_day).days, index[f"n_articles_{source}"]] = n_articles
+                rows[(day - first_day).days, index[f"sentiment_{source}"]] = mean_score
+        cur.close()
+        conn.rollback()  # Read-only, end the transaction
+        return rows
+
+    def _fill_lags(self, values, columns, start, stop):
+        """Recompute the lag columns of rows start..stop-1 from the sentiment columns."""
+        index = {column: i for i, column in enumerate(columns)}
+        rows = np.arange(start, min(stop, len(values)))
+        for source in SOURCES:
+            sentiment = values[:, index[f"sentiment_{source}"]]
+            for k in range(1, self.lags + 1):
+                lagged = np.full(len(rows), np.nan)
+                valid = rows - k >= 0
+                lagged[valid] = sentiment[rows[valid] - k]
+                values[rows, index[f"sentiment_{source}_lag{k}"]] = lagged
+
+    def rebuild(self, conn):
+        """Build the whole matrix from stock_values and daily_sentiment."""
+        with self._lock:
+            cur = conn.cursor()
+            cur.execute("SELECT DISTINCT symbol FROM stock_values ORDER BY symbol")
+            symbols = [row[0] for row in cur.fetchall()]
+            cur.execute('''SELECT MIN(day), MAX(day) FROM (
+                SELECT date AS day FROM stock_values UNION ALL SELECT day FROM daily_sentiment) AS days''')
+            first_day, last_day = cur.fetchone()
+            cur.close()
+            conn.rollback()
+
+            if first_day is None:
+                self._write(np.empty((0, len(feature_columns(symbols, self.lags)))), symbols, None)
+                return
+            values = self._base_rows(conn, first_day, last_day, symbols)
+            self._fill_lags(values, feature_columns(symbols, self.lags), 0, len(values))
+            self._write(values, symbols, first_day)
+
+    def update_days(self, conn, days, symbols=()):
+        """Refresh the rows of `days` (and the lag columns that depend on them) after an ingestion batch."""
+        days = sorted(set(days))
+        if not days:
+            return
+        with self._lock:
+            meta = self._read_meta()
+            if (meta is None or meta['first_day'] is None or meta['lags'] != self.lags
+                    or any(symbol not in meta['symbols'] for symbol in symbols)):
+                self.rebuild(conn)
+                return
+
+            known_symbols = meta['symbols']
+            columns = meta['columns']
+            first_day = date.fromisoformat(meta['first_day'])
+            last_day = first_day + timedelta(days=meta['days'] - 1)
+            low, high = days[0], days[-1]
+
+            if low < first_day or high > last_day:
+                # Grow the matrix: copy the known rows into a larger one, then refresh the new span
+                new_first, new_last = min(low, first_day), max(high, last_day)
+                values = np.full(((new_last - new_first).days + 1, len(columns)), np.nan)
+                offset = (first_day - new_first).days
+                values[offset:offset + meta['days']] = np.load(self._path(MATRIX_FILE), mmap_mode='r')
+                # Also refresh the new days between the batch and the known rows
+                low, high = min(low, last_day + timedelta(days=1)), max(high, first_day - timedelta(days=1))
+                first_day = new_first
+                start, stop = (low - first_day).days, (high - first_day).days + 1
+                values[start:stop] = self._base_rows(conn, low, high, known_symbols)
+                self._fill_lags(values, columns, start, stop + self.lags)
+                self._write(values, known_symbols, first_day)
+                return
+
+            # Patch a copy: readers keep memory-mapping the current file until it is replaced
+            values = np.load(self._path(MATRIX_FILE))
+            start, stop = (low - first_day).days, (high - first_day).days + 1
+            values[start:stop] = self._base_rows(conn, low, high, known_symbols)
+            self._fill_lags(values, columns, start, stop + self.lags)
+            self._write(values, known_symbols, first_day)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Process-wide store configured from the optional [feature_store] section."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                config = get_settings().feature_store
+                _store = FeatureStore(config.directory or DEFAULT_DIRECTORY, config.lags)
+            except Exception as e:
+                print(f"Feature store uses its defaults: {e}")
+                _store = FeatureStore()
+        return _store
+
+
+def load_features():
+    """The current FeatureMatrix, memory-mapped."""
+    return get_feature_store().load()
+
+
+def rebuild_features():
+    with db_connection() as conn:
+        get_feature_store().rebuild(conn)
+
+
+def feature_store_updater(date_index, symbol_index=None, moved_days=None):
+    """BulkWriter `after_commit` hook updating the feature rows of the days of a committed batch.
+
+    `moved_days()` returns extra days to refresh, e.g. DailySentimentUpdater.moved_days.
+    """
+    def after_commit(conn, batch):
+        days = [_day(row[date_index]) for row in batch if row[date_index] is not None]
+        if moved_days is not None:
+            days.extend(moved_days())
+        symbols = {row[symbol_index].upper() for row in batch} if symbol_index is not None else ()
+        try:
+            get_feature_store().update_days(conn, days, symbols)
+        except Exception as e:
+            # The data is committed; the matrix is rebuilt at the next start
+            print(f"Error updating the feature store: {e}")
+    return after_commit
+
+
+if __name__ == "__main__":
+    # python -m utils.feature_store : rebuild the matrix from the database
+    rebuild_features()
+    matrix = load_features()
+    print(f"{len(matrix)} days x {len(matrix.columns)} features from {matrix.first_day}")
@@ -0,0 +1,171 @@
+import datetime
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import finnhub
+from .rate_limit import TokenBucket
+from .metrics import timed, FETCH_SECONDS, FETCH_ERRORS
+
+# ============================
+#    Finnhub company news fetcher
+# ============================
+
+# The date range is split into windows of `window_days` days, each fetched with one
+# company_news call. Windows run concurrently but every call takes a token from a bucket sized
+# to the account's calls-per-minute limit. A window that comes back with `max_items` articles
+# or more may have been truncated by Finnhub, so it is split in two and fetched again.
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_CALLS_PER_MINUTE = 60   # Finnhub free tier
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ITEMS = 250
+MAX_RETRIES = 5
+BACKOFF = 2.0                   # Seconds before the first retry of a 429, doubled on every retry
+
+
+def split_windows(first_day, last_day, window_days):
+    """Return the (start, end) day pairs, both inclusive, covering first_day..last_day."""
+    windows = []
+    start = first_day
+    while start <= last_day:
+        end = min(last_day, start + datetime.timedelta(days=window_days - 1))
+        windows.append((start, end))
+        start = end + datetime.timedelta(days=1)
+    return windows
+
+
+def _is_rate_limited(error):
+    return getattr(error, 'status_code', None) == 429
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class FinnhubNewsFetcher:
+    """Fetch the company news of `symbol` over a date range with concurrent, rate-limited calls."""
+
+    def __init__(self, client, symbol='NVDA', window_days=DEFAULT_WINDOW_DAYS,
+                 calls_per_minute=DEFAULT_CALLS_PER_MINUTE, workers=DEFAULT_WORKERS,
+                 max_items=DEFAULT_MAX_ITEMS, max_retries=MAX_RETRIES, backoff=BACKOFF, progress=None,
+                 source='finnhub'):
+        self.client = client
+        self.symbol = symbol
+        self.window_days = max(1, window_days)
+        self.workers = max(1, workers)
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress = progress
+        self.source = source  # Label of the fetch metrics
+        # A small burst lets the first windows start together without exceeding the minute limit
+        self.bucket = TokenBucket(calls_per_minute / 60.0, capacity=min(self.workers, calls_per_minute))
+        self.calls = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _call(self, start, end):
+        """One company_news call, retried with exponential backoff while Finnhub answers 429."""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            with self._lock:
+                self.calls += 1
+            try:
+                with timed(FETCH_SECONDS, FETCH_ERRORS, source=self.source):
+                    news = self.client.company_news(symbol=self.symbol, _from=start.strftime('%Y-%m-%d'),
+                                                    to=end.strftime('%Y-%m-%d'))
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                wait = _retry_after(e) or self.backoff * 2 ** attempt
+                with self._lock:
+                    self.retries += 1
+                time.sleep(wait + random.uniform(0, wait / 4))
+                attempt += 1
+                continue
+            if self.progress is not None:
+                self.progress.update(pages=1)
+            return news or []
+
+    def fetch_window(self, start, end):
+        """All the articles of one window, splitting it while the responses look truncated."""
+        news = self._call(start, end)
+        if self.max_items and len(news) >= self.max_items and start < end:
+            middle = start + (end - start) // 2
+            return self.fetch_window(start, middle) + self.fetch_window(middle + datetime.timedelta(days=1), end)
+        return news
+
+    def fetch(self, first_day, last_day):
+        """Yield ((start, end), articles or exception) for every window as soon as it is done.
+
+        Articles already returned for another window (same Finnhub id) are left out.
+        """
+        seen = set()
+        windows = split_windows(first_day, last_day, self.window_days)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch_window, start, end): (start, end) for start, end in windows}
+            for future in as_completed(futures):
+                window = futures[future]
+                try:
+                    news = future.result()
+                except Exception as e:
+                    yield window, e
+                    continue
+                unique = []
+                for item in news:
+                    key = item.get('id') or item.get('url') or (item.get('headline'), item.get('datetime'))
+                    if key not in seen:
+                        seen.add(key)
+                        unique.append(item)
+                yield window, unique
+
+
+# ============================
+#    Offline client
+# ============================
+
+class _FakeResponse:
+    status_code = 429
+    text = '{"error": "API limit reached. Please try again later."}'
+    headers = {}
+    ok = False
+
+    def json(self):
+        return {"error": "API limit reached. Please try again later."}
+
+
+class FakeFinnhubClient:
+    """Stand-in for finnhub.Client serving company_news from a list of article dicts.
+
+    Like Finnhub, at most `max_items` articles are returned per call (newest first), and the
+    first `rate_limited_calls` calls fail with a 429.
+    """
+
+    def __init__(self, articles, max_items=DEFAULT_MAX_ITEMS, rate_limited_calls=0, latency=0.0):
+        self.articles = sorted(articles, key=lambda item: item['datetime'], reverse=True)
+        self.max_items = max_items
+        self.rate_limited_calls = rate_limited_calls
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def company_news(self, symbol, _from, to):
+        with self._lock:
+            self.calls += 1
+            limited = self.calls <= self.rate_limited_calls
+        if self.latency:
+            time.sleep(self.latency)
+        if limited:
+            raise finnhub.FinnhubAPIException(_FakeResponse())
+        first = datetime.datetime.strptime(_from, '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+        last = datetime.datetime.strptime(to, '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+        low, high = first.timestamp(), (last + datetime.timedelta(days=1)).timestamp()
+        news = [item for item in self.articles if low <= item['datetime'] < high]
+        return news[:self.max_items] if self.max_items else news
@@ -1,5 +1,5 @@
-from sqlalchemy import create_engine
-from utils.load_secrets import load_secrets
+from utils.settings import get_settings
+from utils.db import get_engine, connect_kwargs
 import psycopg2
 import pandas as pd
 import json
@@ -24,52 +24,28 @@ def minmax_normalize(df, column):
     
     return df
 
-# Update the database connection function to use SQLAlchemy
+# Shared, pooled SQLAlchemy engine for Pandas
 def pandas_db_connection():
-    """Create a SQLAlchemy engine for Pandas."""
-    secrets = load_secrets()
-    credentials = secrets.get('database_credentials')
-    
-    if not credentials:
-        return None
-
-    username = credentials.get('username')
-    password = credentials.get('password')
-    host = credentials.get('host')
-    port = credentials.get('port')
-    database = credentials.get('database')
-
+    """Return the process-wide pooled SQLAlchemy engine for Pandas."""
     try:
-        if not password:
-            engine = create_engine(f'postgresql+psycopg2://{username}@{host}:{port}/{database}')
-        else:
-            engine = create_engine(f'postgresql+psycopg2://{username}:{password}@{host}:{port}/{database}')
-        return engine
+        return get_engine()
     except Exception as e:
         print(f"Error creating SQLAlchemy engine: {e}")
         return None
 
 def connect_to_db():
-    """Create a psycopg2 connection for raw database access."""
-    secrets = load_secrets()
-    credentials = secrets.get('database_credentials')
+    """Create a standalone psycopg2 connection for raw database access.
+
+    The application borrows connections from the shared pool with `utils.db.db_connection()`;
+    this is kept for scripts and benchmarks that need a private connection.
+    """
+    credentials = get_settings().database_credentials
 
     if not credentials:
         return None
 
-    username = credentials.get('username')
-    password = credentials.get('password')
-    host = credentials.get('host')
-    port = credentials.get('port')
-    database = credentials.get('database')
-
     try:
-        if not password:
-            conn = psycopg2.connect(dbname=database, user=username, host=host, port=port)
-        else:
-            conn = psycopg2.connect(dbname=database, user=username, password=password, host=host, port=port)
-        return conn
+        return psycopg2.connect(**connect_kwargs(credentials))
     except Exception as e:
         print(f"Error connecting to the database: {e}")
         return None
-
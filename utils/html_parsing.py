@@ -0,0 +1,180 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.html
+from lxml import etree
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# ============================
+#    HTML parsing backends
+# ============================
+
+# The scrapers only need a few fields of every teaser, so the pages are parsed with the
+# fastest backend available and only the teaser / article containers are looked at:
+#   selectolax  lexbor parser and CSS selectors (optional, `pip install selectolax`)
+#   lxml        libxml2 parser and XPath expressions compiled once at import
+#   bs4         BeautifulSoup restricted with a SoupStrainer, the pure-Python reference
+# Every backend returns the same plain tuples, see the parse_* functions.
+
+BACKENDS = ['selectolax', 'lxml', 'bs4']
+DEFAULT_BACKEND = 'selectolax' if LexborHTMLParser is not None else 'lxml'
+
+
+def available_backends():
+    return [backend for backend in BACKENDS if backend != 'selectolax' or LexborHTMLParser is not None]
+
+
+def _check_backend(backend):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in available_backends():
+        raise ValueError(f"Unknown or unavailable HTML backend {backend}, expected one of "
+                         f"{', '.join(available_backends())}")
+    return backend
+
+
+def _has_class(name):
+    # XPath equivalent of the CSS class selector .name
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text(value):
+    return value.strip() if value is not None else None
+
+
+def _first(elements):
+    return elements[0] if elements else None
+
+
+def _lxml_root(html):
+    # lxml refuses an empty document, treat it as a page without teasers
+    if not html or not html.strip():
+        return lxml.html.fromstring('<html></html>')
+    return lxml.html.fromstring(html)
+
+
+# ---- Financial Times listing page ----
+
+FT_TEASER = 'div.o-teaser__content'
+FT_DATE = 'time.o-teaser__timestamp-date'
+FT_HEADING = 'a.js-teaser-heading-link'
+FT_STANDFIRST = 'p.o-teaser__standfirst'
+
+_FT_XPATH = {
+    'teaser': etree.XPath(f"//div[{_has_class('o-teaser__content')}]"),
+    'date': etree.XPath(f".//time[{_has_class('o-teaser__timestamp-date')}]"),
+    'heading': etree.XPath(f".//a[{_has_class('js-teaser-heading-link')}]"),
+    'standfirst': etree.XPath(f".//p[{_has_class('o-teaser__standfirst')}]"),
+}
+_FT_STRAINER = SoupStrainer('div', class_='o-teaser__content')
+
+
+def parse_ft_listing(html, backend=None):
+    """Return (date text, title, href, standfirst) for every teaser of an FT listing page.
+
+    A field is None when the teaser does not have it.
+    """
+    backend = _check_backend(backend)
+    teasers = []
+    if backend == 'selectolax':
+        for teaser in LexborHTMLParser(html).css(FT_TEASER):
+            date, heading, standfirst = (teaser.css_first(FT_DATE), teaser.css_first(FT_HEADING),
+                                         teaser.css_first(FT_STANDFIRST))
+            teasers.append((
+                _text(date.text()) if date is not None else None,
+                _text(heading.text()) if heading is not None else None,
+                heading.attributes.get('href') if heading is not None else None,
+                _text(standfirst.text()) if standfirst is not None else None,
+            ))
+    elif backend == 'lxml':
+        for teaser in _FT_XPATH['teaser'](_lxml_root(html)):
+            date, heading, standfirst = (_first(_FT_XPATH['date'](teaser)), _first(_FT_XPATH['heading'](teaser)),
+                                         _first(_FT_XPATH['standfirst'](teaser)))
+            teasers.append((
+                _text(date.text_content()) if date is not None else None,
+                _text(heading.text_content()) if heading is not None else None,
+                heading.get('href') if heading is not None else None,
+                _text(standfirst.text_content()) if standfirst is not None else None,
+            ))
+    else:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=_FT_STRAINER)
+        for teaser in soup.find_all('div', class_='o-teaser__content'):
+            date = teaser.find('time', class_='o-teaser__timestamp-date')
+            heading = teaser.find('a', class_='js-teaser-heading-link')
+            standfirst = teaser.find('p', class_='o-teaser__standfirst')
+            teasers.append((
+                _text(date.get_text()) if date is not None else None,
+                _text(heading.get_text()) if heading is not None else None,
+                heading.get('href') if heading is not None else None,
+                _text(standfirst.get_text()) if standfirst is not None else None,
+            ))
+    return teasers
+
+
+# ---- NVIDIA newsroom listing page ----
+
+NVIDIA_TEASER = 'div.index-item-text'
+NVIDIA_DATE = 'span.index-item-text-info-date'
+
+_NVIDIA_XPATH = {
+    'teaser': etree.XPath(f"//div[{_has_class('index-item-text')}]"),
+    'date': etree.XPath(f".//span[{_has_class('index-item-text-info-date')}]"),
+    'link': etree.XPath(".//a"),
+}
+_NVIDIA_STRAINER = SoupStrainer('div', class_='index-item-text')
+
+
+def parse_nvidia_listing(html, backend=None):
+    """Return (date text, title, href) for every teaser of an NVIDIA newsroom listing page.
+
+    Teasers without a date or a link are left out.
+    """
+    backend = _check_backend(backend)
+    teasers = []
+    if backend == 'selectolax':
+        for teaser in LexborHTMLParser(html).css(NVIDIA_TEASER):
+            date, link = teaser.css_first(NVIDIA_DATE), teaser.css_first('a')
+            if date is not None and link is not None:
+                teasers.append((_text(date.text()), _text(link.text()), link.attributes.get('href')))
+    elif backend == 'lxml':
+        for teaser in _NVIDIA_XPATH['teaser'](_lxml_root(html)):
+            date, link = _first(_NVIDIA_XPATH['date'](teaser)), _first(_NVIDIA_XPATH['link'](teaser))
+            if date is not None and link is not None:
+                teasers.append((_text(date.text_content()), _text(link.text_content()), link.get('href')))
+    else:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=_NVIDIA_STRAINER)
+        for teaser in soup.find_all('div', class_='index-item-text'):
+            date, link = teaser.find('span', class_='index-item-text-info-date'), teaser.find('a')
+            if date is not None and link is not None:
+                teasers.append((_text(date.get_text()), _text(link.get_text()), link.get('href')))
+    return teasers
+
+
+# ---- Article page ----
+
+_ARTICLE_XPATH = {
+    'article': etree.XPath("//article"),
+    'paragraph': etree.XPath(".//p"),
+}
+_ARTICLE_STRAINER = SoupStrainer(['article', 'p'])
+
+
+def parse_article_text(html, backend=None):
+    """Text of an article page: its <p> tags inside <article>, or on the whole page without one."""
+    backend = _check_backend(backend)
+    if backend == 'selectolax':
+        tree = LexborHTMLParser(html)
+        root = tree.css_first('article')
+        if root is None:
+            root = tree.root
+        paragraphs = [p.text() for p in root.css('p')] if root is not None else []
+    elif backend == 'lxml':
+        tree = _lxml_root(html)
+        root = _first(_ARTICLE_XPATH['article'](tree))
+        paragraphs = [p.text_content() for p in _ARTICLE_XPATH['paragraph'](tree if root is None else root)]
+    else:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=_ARTICLE_STRAINER)
+        root = soup.find('article') or soup
+        paragraphs = [p.get_text() for p in root.find_all('p')]
+    return " ".join(paragraphs)
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import requests
+from utils.settings import get_settings, MAIN_DIR
+from utils.metrics import timed, FETCH_SECONDS, FETCH_ERRORS, FETCH_CACHE
+
+# ============================
+#    HTTP page cache
+# ============================
+
+# Scraped pages are kept on disk (zlib-compressed body + a small JSON file with the ETag,
+# Last-Modified and freshness of the response), so that a re-run revalidates them with
+# If-None-Match / If-Modified-Since and mostly gets 304 Not Modified answers instead of the
+# full pages, or no request at all while the server's Cache-Control max-age holds. The
+# bodies are evicted oldest-used first once they take more than `max_mb` on disk.
+
+DEFAULT_DIRECTORY = os.path.join(MAIN_DIR, ".cache", "http")
+DEFAULT_MAX_MB = 200
+DEFAULT_TIMEOUT = 10.0
+EVICT_TO = 0.9      # Evict down to this share of max_mb
+
+
+def _max_age(headers):
+    """Seconds the response may be reused without revalidation; None when it must not be stored."""
+    cache_control = (headers.get('cache-control') or '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class CachedPage:
+
+    def __init__(self, url, body, encoding=None, etag=None, last_modified=None, expires=0.0):
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def meta(self):
+        return {"url": self.url, "encoding": self.encoding, "etag": self.etag,
+                "last_modified": self.last_modified, "expires": self.expires}
+
+
+class HttpCache:
+    """On-disk cache of page bodies and their validators, keyed by URL."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 2**20)
+        self.hits = 0           # Served from disk without a request (still fresh)
+        self.revalidated = 0    # 304 Not Modified answers
+        self.downloads = 0      # Full responses
+        self._size = None       # Bytes of the bodies on disk, computed on first use
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.directory, key + ".json"), os.path.join(self.directory, key + ".z")
+
+    def get(self, url):
+        """The stored page of `url`, or None."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            with open(body_path, "rb") as file:
+                body = zlib.decompress(file.read())
+        except (FileNotFoundError, ValueError, zlib.error):
+            return None
+        os.utime(body_path)  # Most recently used, for the eviction
+        return CachedPage(body=body, **meta)
+
+    def _write_meta(self, page):
+        meta_path, _ = self._paths(page.url)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(page.meta(), file)
+        os.replace(tmp_path, meta_path)
+
+    def store(self, url, headers, body, encoding=None):
+        """Keep a 200 response; returns its CachedPage (not stored when the server forbids it)."""
+        max_age = _max_age(headers)
+        page = CachedPage(url, body, encoding, headers.get('etag'), headers.get('last-modified'),
+                          time.time() + (max_age or 0))
+        self.downloads += 1
+        if max_age is None or not (page.etag or page.last_modified or max_age):
+            # Nothing to revalidate with: a copy stored earlier is stale now, forget it
+            self.remove(url)
+            return page
+
+        _, body_path = self._paths(url)
+        compressed = zlib.compress(body, 6)
+        tmp_path = body_path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(compressed)
+        with self._lock:
+            self._size = self._disk_size() if self._size is None else self._size
+            try:
+                self._size -= os.path.getsize(body_path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, body_path)
+            self._write_meta(page)
+            self._size += len(compressed)
+            if self._size > self.max_bytes:
+                self._evict()
+        return page
+
+    def remove(self, url):
+        """Delete the stored page of `url`, if any."""
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            try:
+                size = os.path.getsize(body_path)
+            except FileNotFoundError:
+                size = 0
+            for path in (body_path, meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if self._size is not None:
+                self._size -= size
+
+    def not_modified(self, page, headers):
+        """Record a 304 answer: the stored page is valid for the new max-age."""
+        self.revalidated += 1
+        max_age = _max_age(headers)
+        page.expires = time.time() + (max_age or 0)
+        page.etag = headers.get('etag') or page.etag
+        page.last_modified = headers.get('last-modified') or page.last_modified
+        self._write_meta(page)
+        return page
+
+    def hit(self, page):
+        self.hits += 1
+        return page
+
+    def _disk_size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".z"))
+
+    def _evict(self):
+        """Remove the least recently used pages until the bodies fit in EVICT_TO * max_bytes."""
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".z")),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes * EVICT_TO:
+                break
+            self._size -= entry.stat().st_size
+            for path in (entry.path, entry.path[:-2] + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            self._size = self._disk_size() if self._size is None else self._size
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "downloads": self.downloads,
+                "size_mb": round(self._size / 2**20, 2),
+                "max_mb": round(self.max_bytes / 2**20, 2),
+                "directory": self.directory,
+            }
+
+
+class CachedSession:
+    """Keep-alive requests.Session answering GETs from the HttpCache when it can.
+
+        with CachedSession() as session:
+            html = session.get(url)
+    """
+
+    def __init__(self, cache=None, timeout=DEFAULT_TIMEOUT, headers=None, source='http'):
+        self.cache = cache if cache is not None else get_http_cache()
+        self.source = source  # Label of the fetch metrics
+        self.timeout = timeout
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def get(self, url):
+        """Return the body of `url` as bytes; raises requests.HTTPError on failure."""
+        page = self.cache.get(url) if self.cache else None
+        if page is not None and page.is_fresh():
+            FETCH_CACHE.labels(source=self.source, result='hit').inc()
+            return self.cache.hit(page).body
+
+        headers = page.conditional_headers() if page is not None else {}
+        with timed(FETCH_SECONDS, FETCH_ERRORS, source=self.source):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code != 304:
+                response.raise_for_status()
+        if response.status_code == 304 and page is not None:
+            FETCH_CACHE.labels(source=self.source, result='revalidated').inc()
+            return self.cache.not_modified(page, response.headers).body
+        response.raise_for_status()
+        FETCH_CACHE.labels(source=self.source, result='download').inc()
+        if self.cache:
+            self.cache.store(url, response.headers, response.content, response.encoding)
+        return response.content
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Process-wide page cache configured from the optional [http_cache] section; None when disabled."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                config = get_settings().http_cache
+                if not config.enabled:
+                    return None
+                _cache = HttpCache(config.directory or DEFAULT_DIRECTORY, config.max_mb)
+            except Exception as e:
+                print(f"HTTP cache uses its defaults: {e}")
+                _cache = HttpCache()
+        return _cache
+
+
+def http_cache_stats():
+    cache = get_http_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+# ============================
+#    Ingestion high-water marks
+# ============================
+
+# One row per source (the name of the table it fills): the newest article stored so far and,
+# for the day-by-day sources, the last day that has been fully fetched.
+
+def create_state_table(conn):
+    cur = conn.cursor()
+    cur.execute('''CREATE TABLE IF NOT EXISTS ingestion_state (
+        source TEXT PRIMARY KEY,
+        last_timestamp TIMESTAMP,
+        last_url TEXT,
+        covered_until DATE,
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    )''')
+    conn.commit()
+    cur.close()
+
+
+def get_state(conn, source):
+    """Return the high-water mark of `source` as a dict, or None if it was never ingested."""
+    create_state_table(conn)
+    cur = conn.cursor()
+    cur.execute('''SELECT last_timestamp, last_url, covered_until FROM ingestion_state WHERE source = %s''', (source,))
+    row = cur.fetchone()
+    cur.close()
+    if row is None:
+        return None
+    return {'last_timestamp': row[0], 'last_url': row[1], 'covered_until': row[2]}
+
+
+def is_seen(state, link, timestamp):
+    """True when an article is at or behind the high-water mark, so newest-first listings can stop there."""
+    if state is None:
+        return False
+    if link is not None and link == state['last_url']:
+        return True
+    return state['last_timestamp'] is not None and timestamp < state['last_timestamp']
+
+
+def first_uncovered_day(state, start_day):
+    """First day to fetch for a day-by-day source: `start_day`, moved past the days already covered."""
+    if state is None or state['covered_until'] is None:
+        return start_day
+    return max(start_day, state['covered_until'] + timedelta(days=1))
+
+
+def can_extend_coverage(state, first_day):
+    """Coverage only grows when the new run starts right after it, so no gap is marked as covered."""
+    return state is None or state['covered_until'] is None or first_day <= state['covered_until'] + timedelta(days=1)
+
+
+def record_state(conn, source, last_timestamp=None, last_url=None, covered_until=None):
+    """Move the high-water mark of `source` forward; older values never overwrite newer ones."""
+    create_state_table(conn)
+    cur = conn.cursor()
+    cur.execute('''INSERT INTO ingestion_state (source, last_timestamp, last_url, covered_until, updated_at)
+        VALUES (%s, %s, %s, %s, now())
+        ON CONFLICT (source) DO UPDATE SET
+            last_url = CASE
+                WHEN EXCLUDED.last_timestamp >= COALESCE(ingestion_state.last_timestamp, EXCLUDED.last_timestamp)
+                THEN EXCLUDED.last_url ELSE ingestion_state.last_url END,
+            last_timestamp = GREATEST(ingestion_state.last_timestamp, EXCLUDED.last_timestamp),
+            covered_until = GREATEST(ingestion_state.covered_until, EXCLUDED.covered_until),
+            updated_at = now()''',
+                (source, last_timestamp, last_url, covered_until))
+    conn.commit()
+    cur.close()
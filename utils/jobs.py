@@ -0,0 +1,150 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import JOB_SECONDS
+
+# ============================
+#    Background ingestion jobs
+# ============================
+
+MAX_WORKERS = 2          # Ingestion jobs running at the same time
+MAX_KEPT_JOBS = 200      # Finished jobs kept in memory for GET /jobs
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class NullProgress:
+    """Progress sink used when an ingestion function runs outside of a job."""
+
+    def update(self, pages=0, items=0, rows=0):
+        pass
+
+    def update_stages(self, stats):
+        pass
+
+
+class Job:
+    """State of a single ingestion run, updated by the worker thread while it runs."""
+
+    def __init__(self, name, params):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.params = params
+        self.status = "queued"
+        self.pages = 0
+        self.items = 0
+        self.rows_inserted = 0
+        self.stages = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._lock = threading.Lock()
+
+    def update(self, pages=0, items=0, rows=0):
+        """Add to the progress counters (called from the ingestion loops)."""
+        with self._lock:
+            self.pages += pages
+            self.items += items
+            self.rows_inserted += rows
+
+    def update_stages(self, stats):
+        """Keep the latest counters of the ingestion pipeline stages (see utils.pipeline)."""
+        with self._lock:
+            self.stages = stats
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return round(end - self.started_at, 3)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "name": self.name,
+                "params": self.params,
+                "status": self.status,
+                "pages": self.pages,
+                "items": self.items,
+                "rows_inserted": self.rows_inserted,
+                "elapsed_seconds": self.elapsed(),
+                "pipeline": self.stages,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingestion")
+        return _executor
+
+
+def _run(job, func, args, kwargs):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        job.result = func(*args, progress=job, **kwargs)
+        job.status = "finished"
+    except Exception as e:
+        print(f"Job {job.id} ({job.name}) failed: {e}")
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+        JOB_SECONDS.labels(job=job.name, status=job.status).observe(job.finished_at - job.started_at)
+
+
+def create_job(name, params):
+    """Register a new queued job and drop the oldest finished ones past MAX_KEPT_JOBS."""
+    job = Job(name, params)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_KEPT_JOBS:
+            oldest_id = next((k for k, j in _jobs.items() if j.status in ("finished", "failed", "cancelled")), None)
+            if oldest_id is None:
+                break
+            del _jobs[oldest_id]
+    return job
+
+
+def run_job(job, func, *args, **kwargs):
+    """Hand the job to the worker pool. Meant to be scheduled through FastAPI's BackgroundTasks."""
+    job.future = _get_executor().submit(_run, job, func, args, kwargs)
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs():
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.to_dict() for job in reversed(jobs)]
+
+
+def shutdown_jobs(wait=False):
+    """Stop accepting jobs and drop the queued ones (marked "cancelled"); used when the application shuts down."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        if job.future is not None and job.future.cancelled():
+            job.status = "cancelled"
+            job.finished_at = time.time()
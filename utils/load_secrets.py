@@ -1,25 +1,18 @@
-import toml
 import os
 import sys
+from utils.settings import get_raw_settings
 
-def load_secrets(file_name="keys.toml"):
-    """Load secrets from a TOML file located in the .secrets directory."""
-    # Get the main directory path using sys.path
-    main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-    # Add the main directory to sys.path if needed
-    if main_dir not in sys.path:
-        sys.path.append(main_dir)
+# Add the main directory to sys.path if needed
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if main_dir not in sys.path:
+    sys.path.append(main_dir)
 
-    # Construct the path to the .secrets/keys.toml file
-    file_path = os.path.join(main_dir, ".secrets", file_name)
 
-    try:
-        with open(file_path, 'r') as file:
-            secrets = toml.load(file)
-        return secrets
-    except FileNotFoundError:
-        raise Exception("Secrets file not found. Make sure the keys.toml file is in the .secrets directory.")
-    except toml.TomlDecodeError:
-        raise Exception("Error decoding the keys.toml file. Ensure it is formatted correctly.")
+def load_secrets(file_name="keys.toml"):
+    """Load secrets from a TOML file located in the .secrets directory.
 
+    The file is parsed once and cached; it is read again only when its mtime changes.
+    Environment variables named FASTAPI_SCRAPE_<SECTION>__<KEY> override single values.
+    The returned dict is shared, do not modify it.
+    """
+    return get_raw_settings(file_name)
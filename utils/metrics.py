@@ -0,0 +1,73 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, REGISTRY,
+                               generate_latest, multiprocess)
+
+# ============================
+#    Prometheus metrics
+# ============================
+
+# Latency histograms and counters of the hot paths, served by GET /metrics. The labels are
+# the endpoint (route template) or the source, which for the ingestion paths is the table
+# name (nvidia_news_api, nvidia_fintimes_scrape, nvidia_originalsite_scrape, stock_values).
+# With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to a shared empty directory
+# so that /metrics adds up the metrics of every worker.
+
+# Requests served by the API
+HTTP_REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time to answer an API request',
+                                 ['endpoint', 'method', 'status'])
+
+# Outgoing requests of the ingestion jobs
+FETCH_SECONDS = Histogram('fetch_duration_seconds', 'Time of an outgoing HTTP or API request', ['source'])
+FETCH_ERRORS = Counter('fetch_errors_total', 'Outgoing requests that failed', ['source'])
+FETCH_CACHE = Counter('fetch_cache_total', 'Page requests by HTTP cache outcome (hit, revalidated, download)',
+                      ['source', 'result'])
+
+# Sentiment scoring
+SCORING_SECONDS = Histogram('sentiment_scoring_duration_seconds', 'Time to score a batch of texts', ['scorer'])
+SCORED_TEXTS = Counter('sentiment_texts_total', 'Texts scored, without the sentiment cache hits', ['scorer'])
+
+# Database
+DB_WRITE_SECONDS = Histogram('db_write_duration_seconds', 'Time to insert and commit one batch', ['table'])
+DB_ROWS = Counter('db_rows_written_total', 'Rows inserted or updated', ['table'])
+DB_WRITE_ERRORS = Counter('db_write_errors_total', 'Batches rolled back', ['table'])
+QUERY_SECONDS = Histogram('db_query_duration_seconds', 'Time of a read query of the data loader', ['query'])
+QUERY_ROWS = Counter('db_query_rows_total', 'Rows read by the data loader', ['query'])
+
+# Analysis and visualization steps (load, merge, fit, correlate, render)
+COMPUTE_SECONDS = Histogram('compute_duration_seconds', 'Time of one step of an endpoint', ['endpoint', 'step'])
+
+# Ingestion jobs
+JOB_SECONDS = Histogram('ingestion_job_duration_seconds', 'Time of an ingestion job', ['job', 'status'],
+                        buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600))
+INGESTION_ERRORS = Counter('ingestion_errors_total', 'Errors of the ingestion jobs', ['source', 'stage'])
+
+
+@contextmanager
+def timed(histogram, errors=None, **labels):
+    """Observe the duration of the block in `histogram`, and count it in `errors` when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def timed_step(endpoint, step):
+    """Shortcut for timed(COMPUTE_SECONDS, endpoint=..., step=...)."""
+    return timed(COMPUTE_SECONDS, endpoint=endpoint, step=step)
+
+
+def metrics_payload():
+    """(body, content type) of the /metrics answer."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
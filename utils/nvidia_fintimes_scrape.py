@@ -1,58 +1,51 @@
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-from textblob import TextBlob
-import psycopg2
 import time
-from utils.helpers import connect_to_db
+from utils.db import db_connection
 from utils.load_secrets import load_secrets
-
-
-def scrape_nvidia_ft(start_date_str, end_date_str):
-    # Convert dates from strings
-    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-
-    # Database connection
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    
-    # Create table if not exists
-    cursor.execute('''CREATE TABLE IF NOT EXISTS nvidia_fintimes_scrape (
-        title TEXT,
-        link TEXT,
-        date TIMESTAMP,
-        source TEXT,
-        text TEXT,
-        sentiment TEXT,
-        sentiment_score NUMERIC
-    )''')
-    conn.commit()
-
-    # Scraping logic
-    secrets = load_secrets()
-    ft_secrets = secrets.get('fin_times_site')
-    url_base = ft_secrets.get('site_ft')
-    sup = ft_secrets.get('ft_sup')
-    link_ft_for_href = ft_secrets.get('link_ft_for_href')
-
+from utils.jobs import NullProgress
+from utils.bulk_insert import BulkWriter
+from utils.schema import ARTICLE_COLUMNS, article_upsert, ensure_article_table
+from utils.daily_sentiment import daily_sentiment_updater
+from utils.feature_store import feature_store_updater
+from utils.sentiment import score_texts
+from utils.ingestion_state import get_state, is_seen, record_state
+from utils.html_parsing import parse_ft_listing
+from utils.http_cache import CachedSession
+from utils.pipeline import Pipeline, Stage, pipeline_settings
+
+PAGE_DELAY = 1.0  # Seconds between two listing pages, to avoid overwhelming the server
+
+
+def _listing_pages(session, url_base, sup, link_ft_for_href, start_date, end_date, progress, state, walk,
+                   page_delay=PAGE_DELAY):
+    """Yield the (title, link, date, text) articles of every listing page of the date range.
+
+    The walk stops at the first article older than start_date or already stored;
+    a listing page that cannot be fetched is counted in walk['failed'].
+    """
     i = 1
     loop_control = True
 
     while loop_control:
         url = f'{url_base}&page={i}{sup}' if i > 1 else f'{url_base}{sup}'
-        response = requests.get(url, timeout=5)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        hyper_news = soup.find_all('div', class_='o-teaser__content')
+        try:
+            html = session.get(url)
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            walk['failed'] += 1
+            break
+        # Only the teaser containers are parsed: (date text, title, href, standfirst) of each
+        teasers = parse_ft_listing(html)
+        progress.update(pages=1)
 
-        if not hyper_news:
+        if not teasers:
             break
 
-        for news in hyper_news:
-            # Safely find and parse the date element
-            news_date_element = news.find('time', class_='o-teaser__timestamp-date')
-            if news_date_element:
-                news_date_text = news_date_element.get_text().strip()
+        page_articles = []
+        for news_date_text, title, href, standfirst in teasers:
+            # Safely parse the date
+            if news_date_text:
                 news_date = datetime.strptime(news_date_text, '%B %d, %Y')
 
                 if news_date < start_date:
@@ -64,32 +57,95 @@ def scrape_nvidia_ft(start_date_str, end_date_str):
                 continue  # Skip if date is missing
 
             # Safely extract the title
-            title_element = news.find('a', class_='js-teaser-heading-link')
-            if title_element:
-                title = title_element.get_text().strip()
-                link = link_ft_for_href + title_element['href']
+            if title is not None and href is not None:
+                link = link_ft_for_href + href
             else:
                 continue  # Skip if title or link is missing
 
-            # Safely extract the text (standfirst)
-            text_element = news.find('p', class_='o-teaser__standfirst')
-            text = text_element.get_text().strip() if text_element else ''
+            if is_seen(state, link, news_date):
+                loop_control = False
+                break
+
+            # The text (standfirst)
+            text = standfirst or ''
+
+            page_articles.append((title, link, news_date, text))
+
+        if page_articles:
+            yield page_articles
 
-            # Sentiment analysis
-            sentiment_analysis = TextBlob(text)
-            sentiment_score = sentiment_analysis.sentiment.polarity
-            sentiment = 'Positive' if sentiment_score > 0 else 'Negative' if sentiment_score < 0 else 'Neutral'
+        if loop_control:
+            i += 1
+            time.sleep(page_delay)
 
-            # Insert data into the database
-            cursor.execute('''INSERT INTO nvidia_fintimes_scrape (title, link, date, source, text, sentiment, sentiment_score)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)''', (title, link, news_date, "Financial Times", text, sentiment, sentiment_score))
-            conn.commit()
 
-            time.sleep(1)  # Delay to avoid overwhelming the server
+def _stages(writer, progress, settings, walk):
+    """score -> write stages of the listing pages (the walk itself fetches and parses them).
 
-        i += 1
+    walk['newest'] is set to (date, link) of the newest article queued for the insert.
+    """
 
-    cursor.close()
-    conn.close()
+    def score(page_articles):
+        # Sentiment analysis of the whole page in one batch
+        scores = score_texts([text for _, _, _, text in page_articles])
+        return [(title, link, news_date, "Financial Times", text, sentiment, sentiment_score)
+                for (title, link, news_date, text), (sentiment_score, sentiment) in zip(page_articles, scores)]
+
+    def write(rows):
+        # Queue the rows for the next batched insert
+        for row in rows:
+            writer.add(row)
+            if walk['newest'] is None or row[2] > walk['newest'][0]:
+                walk['newest'] = (row[2], row[1])
+        progress.update(items=len(rows))
+
+    return [Stage("score", score, workers=settings.score_workers), Stage("write", write)]
+
+
+def _scrape_nvidia_ft(conn, start_date_str, end_date_str, progress, incremental):
+    # Convert dates from strings
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
+
+    # Create or migrate the table (unique link, indexed day)
+    ensure_article_table(conn, 'nvidia_fintimes_scrape')
+
+    # Scraping logic
+    secrets = load_secrets()
+    ft_secrets = secrets.get('fin_times_site')
+    url_base = ft_secrets.get('site_ft')
+    sup = ft_secrets.get('ft_sup')
+    link_ft_for_href = ft_secrets.get('link_ft_for_href')
+    page_delay = ft_secrets.get('page_delay', PAGE_DELAY)
+
+    daily = daily_sentiment_updater('nvidia_fintimes_scrape', date_index=2)
+    writer = BulkWriter(conn, 'nvidia_fintimes_scrape', ARTICLE_COLUMNS,
+                        on_conflict=article_upsert('nvidia_fintimes_scrape'), dedupe_on='link',
+                        before_batch=daily.before_batch, after_batch=daily.after_batch,
+                        after_commit=feature_store_updater(date_index=2, moved_days=daily.moved_days),
+                        progress=progress)
+
+    # In incremental mode the walk stops at the newest article stored by a previous run
+    state = get_state(conn, 'nvidia_fintimes_scrape') if incremental else None
+    walk = {'newest': None, 'failed': 0}
+
+    # One keep-alive session for the whole walk; unchanged pages come from the HTTP cache.
+    # The next listing page is fetched while the previous one is scored and written.
+    settings = pipeline_settings()
+    with writer, CachedSession(timeout=5, source='nvidia_fintimes_scrape') as session:
+        pipeline = Pipeline(_stages(writer, progress, settings, walk), settings.queue_size, progress)
+        pipeline.run(_listing_pages(session, url_base, sup, link_ft_for_href, start_date, end_date, progress,
+                                    state, walk, page_delay))
+
+    # After a failed listing page the next incremental run must not stop at this mark
+    newest = walk['newest']
+    if newest is not None and not walk['failed']:
+        record_state(conn, 'nvidia_fintimes_scrape', last_timestamp=newest[0], last_url=newest[1])
 
     return "Financial Times NVIDIA news scraped and inserted into the database."
+
+
+def scrape_nvidia_ft(start_date_str, end_date_str, progress=None, incremental=False):
+    progress = progress or NullProgress()
+    with db_connection() as conn:
+        return _scrape_nvidia_ft(conn, start_date_str, end_date_str, progress, incremental)
@@ -1,79 +1,137 @@
 import finnhub
-import psycopg2
-from textblob import TextBlob
 import pandas as pd
 import datetime
-import time
-from .helpers import connect_to_db
+import threading
+from .db import db_connection
 from utils.load_secrets import load_secrets
-
-
-def get_nvidia_news_via_api(start_date, end_date):
-    # Set up the Finnhub client
-    secrets = load_secrets()
-    api_key = secrets.get('api_finhub')['api_key']
-
-    finnhub_client = finnhub.Client(api_key=api_key)
-
-    conn = connect_to_db()
-    cur = conn.cursor()
-    
-    # Create table if not exists
-    cur.execute('''CREATE TABLE IF NOT EXISTS nvidia_news_api (
-        title TEXT,
-        link TEXT,
-        date TIMESTAMP,
-        source TEXT,
-        text TEXT,
-        sentiment TEXT,
-        sentiment_score NUMERIC
-    )''')
-    conn.commit()
-
-    # Convert string dates to datetime objects
-    start_date_utc = pd.to_datetime(start_date, utc=True)
-    end_date_utc = pd.to_datetime(end_date, utc=True)
-
-    current_date = start_date_utc
-
-    while current_date <= end_date_utc:
-        # Convert date to string format (YYYY-MM-DD)
-        date_str = current_date.strftime('%Y-%m-%d')
-
+from utils.jobs import NullProgress
+from utils.bulk_insert import BulkWriter
+from utils.schema import ARTICLE_COLUMNS, article_upsert, ensure_article_table
+from utils.daily_sentiment import daily_sentiment_updater
+from utils.feature_store import feature_store_updater
+from utils.sentiment import score_texts
+from utils.ingestion_state import get_state, first_uncovered_day, can_extend_coverage, record_state
+from utils.finnhub_fetch import (FinnhubNewsFetcher, DEFAULT_WINDOW_DAYS, DEFAULT_CALLS_PER_MINUTE,
+                                 DEFAULT_WORKERS)
+from utils.pipeline import Pipeline, Stage, pipeline_settings
+from utils.metrics import INGESTION_ERRORS
+
+
+def finnhub_fetcher(client=None, progress=None):
+    """News fetcher configured from the [api_finhub] section.
+
+    Optional keys: `calls_per_minute` (default 60), `window_days` (default 7) and `workers` (default 4).
+    """
+    config = load_secrets().get('api_finhub', {})
+    if client is None:
+        client = finnhub.Client(api_key=config['api_key'])
+    return FinnhubNewsFetcher(client, symbol='NVDA',
+                              window_days=config.get('window_days', DEFAULT_WINDOW_DAYS),
+                              calls_per_minute=config.get('calls_per_minute', DEFAULT_CALLS_PER_MINUTE),
+                              workers=config.get('workers', DEFAULT_WORKERS),
+                              progress=progress, source='nvidia_news_api')
+
+
+def _stages(writer, progress, settings, walk):
+    """score -> write stages of the fetched windows; failed days and the newest article go to `walk`."""
+    lock = threading.Lock()
+
+    def failed(window_start, window_end, stage):
+        INGESTION_ERRORS.labels(source='nvidia_news_api', stage=stage).inc()
+        with lock:
+            walk['failed_days'] += (window_end - window_start).days + 1
+
+    def score(window):
+        (window_start, window_end), news = window
+        if isinstance(news, Exception):
+            print(f"Error fetching data for {window_start} to {window_end}: {news}")
+            failed(window_start, window_end, 'fetch')
+            return None
         try:
-            # Fetch news for the current day
-            news = finnhub_client.company_news(symbol='NVDA', _from=date_str, to=date_str)
-
-            for item in news:
+            # Sentiment analysis of the whole window in one batch
+            scores = score_texts([item.get('summary', 'No Summary') for item in news])
+        except Exception as e:
+            print(f"Error scoring data for {window_start} to {window_end}: {e}")
+            failed(window_start, window_end, 'score')
+            return None
+        return (window_start, window_end), news, scores
+
+    def write(window):
+        (window_start, window_end), news, scores = window
+        rows = []
+        try:
+            for item, (sentiment_score, sentiment) in zip(news, scores):
                 headline = item.get('headline', 'No Title')
-                url = item.get('url', 'No URL')
+                url = item.get('url') or None  # Missing links stay NULL so they never collide on the unique key
 
                 # Convert the timestamp to UTC using pandas
                 date = pd.to_datetime(item['datetime'], unit='s', utc=True).strftime('%Y-%m-%d %H:%M:%S')
 
                 source = item.get('source', 'Unknown Source')
                 summary = item.get('summary', 'No Summary')  # Avoid potential NoneType issue
-                blob = TextBlob(summary)
-                sentiment_score = blob.sentiment.polarity
-                sentiment = 'Positive' if sentiment_score > 0 else 'Negative' if sentiment_score < 0 else 'Neutral'
+                rows.append(((headline, url, date, source, summary, sentiment, sentiment_score), item['datetime']))
+        except Exception as e:
+            print(f"Error reading the news of {window_start} to {window_end}: {e}")
+            failed(window_start, window_end, 'write')
+            return
 
-                # Insert news data into the database
-                cur.execute('''INSERT INTO nvidia_news_api (title, link, date, source, text, sentiment, sentiment_score)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)''', 
-                            (headline, url, date, source, summary, sentiment, sentiment_score))
-                conn.commit()
+        # Queue the rows for the next batched insert. A failed flush can hold the rows of earlier
+        # windows too, so it is not counted per window: it fails the whole job.
+        for row, timestamp in rows:
+            writer.add(row)
+            progress.update(items=1)
+            if walk['newest'] is None or timestamp > walk['newest'][0]:
+                walk['newest'] = (timestamp, row[1])
 
-        except Exception as e:
-            print(f"Error fetching or inserting data for {date_str}: {e}")
+    return [Stage("score", score, workers=settings.score_workers), Stage("write", write)]
 
-        # Move to the next day
-        current_date += pd.Timedelta(days=1)
 
-        # Sleep for 2 seconds before the next API call
-        time.sleep(2)
+def _get_nvidia_news_via_api(conn, start_date, end_date, progress, incremental, client):
+    # Set up the Finnhub fetcher (rate limited, concurrent multi-day windows)
+    fetcher = finnhub_fetcher(client, progress)
 
-    # Close the cursor and connection
-    cur.close()
-    conn.close()
+    # Create or migrate the table (unique link, indexed day)
+    ensure_article_table(conn, 'nvidia_news_api')
+
+    # Convert string dates to datetime objects
+    start_date_utc = pd.to_datetime(start_date, utc=True)
+    end_date_utc = pd.to_datetime(end_date, utc=True)
 
-    return "NVIDIA news from API fetched and inserted into the database."
\ No newline at end of file
+    daily = daily_sentiment_updater('nvidia_news_api', date_index=2)
+    writer = BulkWriter(conn, 'nvidia_news_api', ARTICLE_COLUMNS,
+                        on_conflict=article_upsert('nvidia_news_api'), dedupe_on='link',
+                        before_batch=daily.before_batch, after_batch=daily.after_batch,
+                        after_commit=feature_store_updater(date_index=2, moved_days=daily.moved_days),
+                        progress=progress)
+
+    # In incremental mode the days already fully fetched by previous runs are skipped
+    state = get_state(conn, 'nvidia_news_api')
+    first_day = first_uncovered_day(state, start_date_utc.date()) if incremental else start_date_utc.date()
+    walk = {'failed_days': 0, 'newest': None}
+
+    # The windows are scored while the next ones are fetched, and written while those are scored
+    settings = pipeline_settings()
+    with writer:
+        pipeline = Pipeline(_stages(writer, progress, settings, walk), settings.queue_size, progress)
+        pipeline.run(fetcher.fetch(first_day, end_date_utc.date()))
+    failed_days, newest = walk['failed_days'], walk['newest']
+
+    # Today's news is still coming in, so coverage stops at yesterday; a failed day leaves a hole
+    last_complete_day = min(end_date_utc.date(), pd.Timestamp.now(tz='UTC').date() - datetime.timedelta(days=1))
+    covered_until = None
+    if not failed_days and last_complete_day >= first_day and can_extend_coverage(state, first_day):
+        covered_until = last_complete_day
+    if newest is not None or covered_until is not None:
+        record_state(conn, 'nvidia_news_api',
+                     last_timestamp=pd.to_datetime(newest[0], unit='s').to_pydatetime() if newest else None,
+                     last_url=newest[1] if newest else None,
+                     covered_until=covered_until)
+
+    return "NVIDIA news from API fetched and inserted into the database."
+
+
+def get_nvidia_news_via_api(start_date, end_date, progress=None, incremental=False, client=None):
+    """Fetch NVDA company news from Finnhub; `client` replaces finnhub.Client (e.g. FakeFinnhubClient)."""
+    progress = progress or NullProgress()
+    with db_connection() as conn:
+        return _get_nvidia_news_via_api(conn, start_date, end_date, progress, incremental, client)
@@ -1,82 +1,168 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 from datetime import datetime
-import psycopg2
-import time
-from textblob import TextBlob
-from .helpers import connect_to_db
+from .db import db_connection
 from utils.load_secrets import load_secrets
+from utils.jobs import NullProgress
+from utils.bulk_insert import BulkWriter
+from utils.schema import ARTICLE_COLUMNS, article_upsert, ensure_article_table
+from utils.daily_sentiment import daily_sentiment_updater
+from utils.feature_store import feature_store_updater
+from utils.sentiment import score_texts
+from utils.ingestion_state import get_state, is_seen, record_state
+from utils.html_parsing import parse_nvidia_listing, parse_article_text
+from utils.async_fetch import AsyncFetcher, DEFAULT_CONCURRENCY, DEFAULT_RATE_PER_HOST
+from utils.http_cache import get_http_cache
+from utils.pipeline import Pipeline, Stage, pipeline_settings
 
+LISTING_PAGES_PER_ROUND = 3  # Listing pages requested together before checking the stop date
 
-def scrape_nvidia_news_site(start_date_str, end_date_str):
-    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-
-    conn = connect_to_db()
-    cur = conn.cursor()
-    
-    # Create table if not exists
-    cur.execute('''CREATE TABLE IF NOT EXISTS nvidia_originalsite_scrape (
-        title TEXT,
-        link TEXT,
-        date TIMESTAMP,
-        source TEXT,
-        text TEXT,
-        sentiment TEXT,
-        sentiment_score NUMERIC
-    )''')
-    conn.commit()
-
-    secrets = load_secrets()
-    nvidia_or = secrets.get('original_nvidia_site')
-    base_url = nvidia_or['site_nv_url']
-    i = 1
-    keep_going = True
-
-    while keep_going:
-        url_page = base_url + "page=" + str(i)
-        res = requests.get(url_page)
-        soup = BeautifulSoup(res.text, "html.parser")
-        articles_section = soup.find_all('div', class_="index-item-text")
 
-        for article in articles_section:
-            date_str = article.find('span', class_="index-item-text-info-date").get_text().strip()
-            article_date = datetime.strptime(date_str, "%B %d, %Y")
+def parse_listing_page(html, relative_url):
+    """Return (title, link, date) for every teaser of a listing page."""
+    articles = []
+    for date_str, title, link in parse_nvidia_listing(html):
+        article_date = datetime.strptime(date_str, "%B %d, %Y")
 
-            if article_date < start_date:
-                keep_going = False
-                break
-            if article_date > end_date:
-                continue
+        # If the link is relative, prepend the base URL
+        if link.startswith("/"):
+            link = relative_url + link
+        articles.append((title, link, article_date))
+    return articles
 
-            link = article.find('a').get('href')
-            title = article.find('a').get_text().strip()
 
-            # If the link is relative, prepend the base URL
-            if link.startswith("/"):
-                link = nvidia_or['relative_site_nv_url'] + link
+def parse_article_page(html):
+    """Extract the text of an article page from its <p> tags."""
+    return parse_article_text(html)
 
-            # Fetch the full article from the link and extract the text from <p> tags
-            article_res = requests.get(link)
-            article_soup = BeautifulSoup(article_res.text, "html.parser")
-            text = " ".join([p.get_text() for p in article_soup.find_all('p')])
 
-            # Analyze sentiment
-            blob = TextBlob(text)
-            sentiment_score = blob.sentiment.polarity
-            sentiment = 'Positive' if sentiment_score > 0 else 'Negative' if sentiment_score < 0 else 'Neutral'
+async def _listing(fetcher, base_url, relative_url, start_date, end_date, progress, state, walk):
+    """Yield (title, link, date) of the articles of the date range, newest first.
 
-            # Insert data into the PostgreSQL database
-            cur.execute('''INSERT INTO nvidia_originalsite_scrape (title, link, date, source, text, sentiment, sentiment_score)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)''', (title, link, article_date, "NVIDIA", text, sentiment, sentiment_score))
-            conn.commit()
-
-            time.sleep(2)  # Be polite and avoid overwhelming the server
-
-        i += 1
+    The walk stops at the first article older than start_date or already stored;
+    a listing page that cannot be fetched is counted in walk['failed'].
+    """
+    i = 1
+    # Walk the listing pages a few at a time; the articles go down the pipeline as soon as they are known
+    while True:
+        page_urls = [base_url + "page=" + str(n) for n in range(i, i + LISTING_PAGES_PER_ROUND)]
+        pages = await fetcher.fetch_many(page_urls)
+
+        for page_url, page in zip(page_urls, pages):
+            if isinstance(page, Exception):
+                print(f"Error fetching {page_url}: {page}")
+                walk['failed'] += 1
+                return
+            progress.update(pages=1)
+
+            articles = parse_listing_page(page, relative_url)
+            if not articles:
+                return
+
+            for title, link, article_date in articles:
+                if article_date < start_date:
+                    return
+                if article_date > end_date:
+                    continue
+                if is_seen(state, link, article_date):
+                    return
+                yield title, link, article_date
+
+        i += LISTING_PAGES_PER_ROUND
+
+
+def _stages(fetcher, writer, progress, settings, concurrency, walk):
+    """fetch -> parse -> score -> write stages of the article pages.
+
+    Failed article downloads are counted in walk['failed'] and walk['newest'] is set to
+    (date, link) of the newest article queued for the insert.
+    """
+
+    async def fetch(article):
+        title, link, article_date = article
+        try:
+            html = await fetcher.fetch(link)
+        except Exception as e:
+            print(f"Error fetching {link}: {e}")
+            walk['failed'] += 1
+            return None
+        progress.update(pages=1)
+        return title, link, article_date, html
+
+    def parse(article):
+        title, link, article_date, html = article
+        return title, link, article_date, parse_article_page(html)
+
+    def score(articles):
+        # Sentiment analysis of a batch of articles at once
+        scores = score_texts([text for _, _, _, text in articles])
+        # A single item for the writer: the rows of the whole batch
+        return [[(title, link, article_date, "NVIDIA", text, sentiment, sentiment_score)
+                 for (title, link, article_date, text), (sentiment_score, sentiment) in zip(articles, scores)]]
+
+    def write(rows):
+        # Queue the rows for the next batched insert
+        for row in rows:
+            writer.add(row)
+            if walk['newest'] is None or row[2] > walk['newest'][0]:
+                walk['newest'] = (row[2], row[1])
+        progress.update(items=len(rows))
+
+    return [
+        Stage("fetch", fetch, workers=settings.fetch_workers or concurrency),
+        Stage("parse", parse, workers=settings.parse_workers),
+        Stage("score", score, workers=settings.score_workers, batch_size=settings.score_batch,
+              max_wait=settings.score_max_wait),
+        Stage("write", write),
+    ]
+
+
+async def _scrape(base_url, relative_url, start_date, end_date, writer, progress, concurrency, rate_per_host,
+                  state=None, cache=None):
+    """Scrape the articles of the date range.
+
+    Returns (date, link) of the newest article written, or None when there is none or when a
+    listing or article page failed (the next incremental run must not stop past the gap).
+    """
+    async with AsyncFetcher(concurrency=concurrency, rate_per_host=rate_per_host, cache=cache,
+                            source='nvidia_originalsite_scrape') as fetcher:
+        settings = pipeline_settings()
+        walk = {'newest': None, 'failed': 0}
+        pipeline = Pipeline(_stages(fetcher, writer, progress, settings, concurrency, walk), settings.queue_size,
+                            progress)
+        await pipeline.run_async(_listing(fetcher, base_url, relative_url, start_date, end_date, progress,
+                                          state, walk))
+        return walk['newest'] if not walk['failed'] else None
+
+
+def scrape_nvidia_news_site(start_date_str, end_date_str, progress=None, incremental=False,
+                            concurrency=DEFAULT_CONCURRENCY, rate_per_host=DEFAULT_RATE_PER_HOST):
+    progress = progress or NullProgress()
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
 
-    cur.close()
-    conn.close()
+    secrets = load_secrets()
+    nvidia_or = secrets.get('original_nvidia_site')
+    base_url = nvidia_or['site_nv_url']
+    # Politeness budget, overridable from keys.toml
+    concurrency = nvidia_or.get('concurrency', concurrency)
+    rate_per_host = nvidia_or.get('requests_per_second', rate_per_host)
+
+    with db_connection() as conn:
+        # Create or migrate the table (unique link, indexed day)
+        ensure_article_table(conn, 'nvidia_originalsite_scrape')
+        # In incremental mode the walk stops at the newest article stored by a previous run
+        state = get_state(conn, 'nvidia_originalsite_scrape') if incremental else None
+        daily = daily_sentiment_updater('nvidia_originalsite_scrape', date_index=2)
+        writer = BulkWriter(conn, 'nvidia_originalsite_scrape', ARTICLE_COLUMNS,
+                            on_conflict=article_upsert('nvidia_originalsite_scrape'), dedupe_on='link',
+                            before_batch=daily.before_batch, after_batch=daily.after_batch,
+                            after_commit=feature_store_updater(date_index=2, moved_days=daily.moved_days),
+                            progress=progress)
+        with writer:
+            newest = asyncio.run(_scrape(base_url, nvidia_or['relative_site_nv_url'], start_date, end_date,
+                                         writer, progress, concurrency, rate_per_host, state,
+                                         get_http_cache()))
+        if newest is not None:
+            record_state(conn, 'nvidia_originalsite_scrape', last_timestamp=newest[0], last_url=newest[1])
 
     return "NVIDIA news from site scraped and inserted into the database."
-
@@ -1,59 +1,111 @@
-import yfinance as yf
-import psycopg2
-import time
-from .helpers import connect_to_db
-
-def scrape_nvidia_stock(start_date, end_date):
-    # Connect to PostgreSQL
-    conn = connect_to_db()
+from datetime import date, datetime, timedelta
+from .db import db_connection
+from .jobs import NullProgress
+from .bulk_insert import BulkWriter
+from .ingestion_state import get_state, first_uncovered_day, can_extend_coverage, record_state
+from .load_secrets import load_secrets
+from .stock_providers import get_stock_provider
+from .feature_store import feature_store_updater
+
+DEFAULT_TICKERS = ["NVDA", "AAPL", "AMD"]
+
+# The per-company tables of earlier versions, kept as views on stock_values
+LEGACY_TABLES = {"NVDA": "nvda_stock_values", "AAPL": "aapl_stock_values", "AMD": "amd_stock_values"}
+
+STOCK_UPSERT = '''(symbol, date) DO UPDATE SET
+    open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+    close = EXCLUDED.close, volume = EXCLUDED.volume'''
+
+
+def configured_tickers():
+    """Ticker universe from the optional [stocks] section of keys.toml (`tickers = [...]`)."""
+    return load_secrets().get('stocks', {}).get('tickers', DEFAULT_TICKERS)
+
+
+def create_stock_table(conn):
+    """Create the long-format stock_values table and move the legacy per-company tables into it."""
     cursor = conn.cursor()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS stock_values (
+        symbol TEXT NOT NULL,
+        date DATE NOT NULL,
+        open FLOAT NOT NULL,
+        high FLOAT NOT NULL,
+        low FLOAT NOT NULL,
+        close FLOAT NOT NULL,
+        volume FLOAT NOT NULL,
+        PRIMARY KEY (symbol, date)
+    )''')
 
-    # List of companies to scrape data for
-    companies = ["NVDA", "AAPL", "AMD"]
-    
-    # Create tables for each company if they don't exist
-    for company in companies:
-        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {company}_stock_values (
-            date DATE PRIMARY KEY,
-            open FLOAT NOT NULL,
-            high FLOAT NOT NULL,
-            low FLOAT NOT NULL,
-            close FLOAT NOT NULL,
-            volume FLOAT NOT NULL
-        )''')
+    for symbol, table in LEGACY_TABLES.items():
+        cursor.execute('''SELECT table_type FROM information_schema.tables
+            WHERE table_schema = current_schema() AND table_name = %s''', (table,))
+        row = cursor.fetchone()
+        if row is not None and row[0] == 'BASE TABLE':
+            # Copy the old rows over and keep the old table under another name
+            cursor.execute(f'''INSERT INTO stock_values (symbol, date, open, high, low, close, volume)
+                SELECT %s, date, open, high, low, close, volume FROM {table}
+                ON CONFLICT (symbol, date) DO NOTHING''', (symbol,))
+            cursor.execute(f'''ALTER TABLE {table} RENAME TO {table}_legacy''')
+            row = None
+        if row is None:
+            cursor.execute(f'''CREATE VIEW {table} AS
+                SELECT date, open, high, low, close, volume FROM stock_values WHERE symbol = %s''', (symbol,))
     conn.commit()
+    cursor.close()
+
 
-    # Fetch stock data using yfinance for each company
-    stock_data = {}
-    stock_data["NVDA"] = yf.Ticker("NVDA").history(start=start_date, end=end_date, interval='1d')
-    stock_data["AAPL"] = yf.Ticker("AAPL").history(start=start_date, end=end_date, interval='1d')
-    stock_data["AMD"] = yf.Ticker("AMD").history(start=start_date, end=end_date, interval='1d')
-
-    # Function to insert data into PostgreSQL
-    def insert_data(company, data):
-        for index, row in data.iterrows():
-            insert_query = f'''
-            INSERT INTO {company}_stock_values (date, open, high, low, close, volume)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (date) DO NOTHING
-            '''
+def _scrape_nvidia_stock(conn, start_date, end_date, progress, incremental, tickers, provider):
+    create_stock_table(conn)
+
+    # In incremental mode the days already stored by previous runs are not requested again
+    # (the providers treat `end` as exclusive). Every ticker has its own coverage.
+    states = {symbol: get_state(conn, f'stock_values:{symbol}') for symbol in tickers}
+    requested_first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last_day = datetime.strptime(end_date, "%Y-%m-%d").date() - timedelta(days=1)
+    first_days = {
+        symbol: first_uncovered_day(states[symbol], requested_first_day) if incremental else requested_first_day
+        for symbol in tickers
+    }
+    tickers = [symbol for symbol in tickers if first_days[symbol] <= last_day]
+    if not tickers:
+        return "Stock data already up to date."
+    start_date = min(first_days[symbol] for symbol in tickers).strftime("%Y-%m-%d")
+
+    # Fetch all the tickers with one batched call
+    stock_data = provider.history(tickers, start_date, end_date)
+    progress.update(pages=1, items=len(stock_data))
+
+    # Insert the bars in batches
+    writer = BulkWriter(conn, 'stock_values', ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                        on_conflict=STOCK_UPSERT, after_commit=feature_store_updater(date_index=1, symbol_index=0),
+                        progress=progress)
+    with writer:
+        writer.add_many(zip(
+            stock_data['symbol'], stock_data['date'],
             # Convert np.float64 to standard Python float
-            cursor.execute(insert_query, (
-                index.date(), 
-                float(row['Open']), 
-                float(row['High']), 
-                float(row['Low']), 
-                float(row['Close']), 
-                float(row['Volume'])
-            ))
-
-    # Insert stock data for each company
-    for company in companies:
-        insert_data(company, stock_data[company])
-
-    # Commit and close the connection
-    conn.commit()
-    cursor.close()
-    conn.close()
+            stock_data['open'].astype(float).tolist(), stock_data['high'].astype(float).tolist(),
+            stock_data['low'].astype(float).tolist(), stock_data['close'].astype(float).tolist(),
+            stock_data['volume'].astype(float).tolist(),
+        ))
+
+    # The current session is still trading, so coverage stops at yesterday. yf.download only
+    # prints the errors of single tickers, so a ticker without any row is not marked as covered.
+    last_complete_day = min(last_day, date.today() - timedelta(days=1))
+    fetched = set(stock_data['symbol'])
+    for symbol in tickers:
+        if symbol not in fetched:
+            print(f"No stock data returned for {symbol}, its coverage is left unchanged.")
+            continue
+        if last_complete_day >= first_days[symbol] and can_extend_coverage(states[symbol], first_days[symbol]):
+            record_state(conn, f'stock_values:{symbol}', covered_until=last_complete_day)
+
+    return f"Stock data for {', '.join(tickers)} scraped and inserted into the database."
+
 
-    return "Stock data for NVDA, AAPL, and AMD scraped and inserted into the database."
+def scrape_nvidia_stock(start_date, end_date, progress=None, incremental=False, tickers=None, provider=None):
+    """Fetch daily bars of `tickers` (default: the configured universe) into stock_values."""
+    progress = progress or NullProgress()
+    tickers = [symbol.upper() for symbol in (tickers or configured_tickers())]
+    provider = provider or get_stock_provider()
+    with db_connection() as conn:
+        return _scrape_nvidia_stock(conn, start_date, end_date, progress, incremental, tickers, provider)
@@ -0,0 +1,219 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.settings import get_settings, IngestionPipeline
+
+# ============================
+#    Staged ingestion pipeline
+# ============================
+
+# The ingestion sources are split into stages (fetch -> parse -> score -> write) connected by
+# bounded queues, so the network, CPU and database work overlap and the total time tends to
+# the time of the slowest stage instead of the sum of all of them. A full queue blocks the
+# stage feeding it (backpressure), so a slow writer never lets fetched pages pile up.
+# Coroutine functions run on the event loop (e.g. AsyncFetcher downloads), plain functions
+# on the pipeline's threads (parsing, sentiment scoring, the BulkWriter).
+
+DEFAULT_QUEUE_SIZE = 64
+REPORT_INTERVAL = 0.5    # Seconds between two stage reports to the job progress
+
+_DONE = object()         # End of the stream, one per worker of the next stage
+
+
+class Stage:
+    """One step of a Pipeline.
+
+    `func` turns an item into the item passed to the next stage; returning None drops it.
+    With batch_size > 1 it gets a list of up to batch_size items (waiting at most max_wait
+    seconds to fill it) and returns the list of items passed on. `workers` calls run at once.
+    """
+
+    def __init__(self, name, func, workers=1, batch_size=1, max_wait=0.0):
+        if workers < 1 or batch_size < 1:
+            raise ValueError(f"The {name} stage needs at least one worker and a batch size of 1 or more")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.items_in = 0
+        self.items_out = 0
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self.max_queue = 0
+
+    def stats(self, elapsed):
+        """Counters of the stage; utilization near 1 marks the bottleneck."""
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "calls": self.calls,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items_in / elapsed, 2) if elapsed else 0.0,
+            "mean_latency_ms": round(self.busy_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+            "max_queue": self.max_queue,
+        }
+
+
+class Pipeline:
+    """Run the items of a source through stages connected by bounded queues.
+
+        pipeline = Pipeline([Stage("parse", parse, workers=2), Stage("write", write)])
+        pipeline.run(pages)            # or: await pipeline.run_async(pages)
+
+    The source is an iterable (read on a pipeline thread) or an async iterable. The first
+    exception raised by a stage stops the pipeline and is raised again by run().
+    """
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, progress=None):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.progress = progress
+        self.source_items = 0
+        self._started = None
+        self._finished = None
+        self._last_report = 0.0
+        self._executor = None
+
+    def run(self, source):
+        return asyncio.run(self.run_async(source))
+
+    async def run_async(self, source):
+        """Feed the source through the stages and wait until every item went through; returns stats()."""
+        threads = 1 + sum(stage.workers for stage in self.stages if not stage.is_async)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pipeline")
+        self._started = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(self.stages) else None
+            next_workers = self.stages[i + 1].workers if outbox is not None else 0
+            workers = [asyncio.create_task(self._work(stage, queues[i], outbox)) for _ in range(stage.workers)]
+            tasks += workers
+            tasks.append(asyncio.create_task(self._close(workers, outbox, next_workers)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            # Calls already running on the threads cannot be interrupted, wait for them
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+            self._finished = time.perf_counter()
+            self._report(force=True)
+        return self.stats()
+
+    async def _feed(self, source, queue):
+        if hasattr(source, '__aiter__'):
+            async for item in source:
+                self.source_items += 1
+                await queue.put(item)
+        else:
+            loop = asyncio.get_running_loop()
+            iterator = iter(source)
+            while True:
+                item = await loop.run_in_executor(self._executor, next, iterator, _DONE)
+                if item is _DONE:
+                    break
+                self.source_items += 1
+                await queue.put(item)
+        for _ in range(self.stages[0].workers):
+            await queue.put(_DONE)
+
+    async def _close(self, workers, outbox, next_workers):
+        # Once every worker of a stage is done, end the stream of the next one
+        await asyncio.gather(*workers)
+        for _ in range(next_workers):
+            await outbox.put(_DONE)
+
+    async def _next_batch(self, stage, inbox):
+        """Next item (or list of items for a batched stage), and whether the stream ended."""
+        stage.max_queue = max(stage.max_queue, inbox.qsize())
+        item = await inbox.get()
+        if item is _DONE:
+            return None, True
+        if stage.batch_size == 1:
+            return item, False
+
+        loop = asyncio.get_running_loop()
+        batch = [item]
+        deadline = loop.time() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            timeout = deadline - loop.time()
+            try:
+                item = inbox.get_nowait() if timeout <= 0 else await asyncio.wait_for(inbox.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _work(self, stage, inbox, outbox):
+        done = False
+        while not done:
+            item, done = await self._next_batch(stage, inbox)
+            if item is None:
+                continue
+            for output in await self._call(stage, item):
+                if outbox is not None:
+                    await outbox.put(output)
+
+    async def _call(self, stage, item):
+        stage.items_in += len(item) if stage.batch_size > 1 else 1
+        start = time.perf_counter()
+        try:
+            if stage.is_async:
+                result = await stage.func(item)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, stage.func, item)
+        finally:
+            latency = time.perf_counter() - start
+            stage.calls += 1
+            stage.busy_seconds += latency
+            stage.max_latency = max(stage.max_latency, latency)
+
+        if stage.batch_size > 1:
+            outputs = list(result or [])
+        else:
+            outputs = [] if result is None else [result]
+        stage.items_out += len(outputs)
+        self._report()
+        return outputs
+
+    def _report(self, force=False):
+        # Live stage counters for GET /jobs/{job_id}
+        now = time.perf_counter()
+        if self.progress is not None and (force or now - self._last_report >= REPORT_INTERVAL):
+            self._last_report = now
+            self.progress.update_stages(self.stats())
+
+    def stats(self):
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished or time.perf_counter()) - self._started
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "source_items": self.source_items,
+            "stages": [stage.stats(elapsed) for stage in self.stages],
+        }
+
+
+def pipeline_settings():
+    """The optional [pipeline] section (queue size, workers and batch of every stage)."""
+    try:
+        return get_settings().pipeline
+    except Exception as e:
+        print(f"Pipeline uses its defaults: {e}")
+        return IngestionPipeline()
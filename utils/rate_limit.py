@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+# ============================
+#    Token bucket rate limiter
+# ============================
+
+class TokenBucket:
+    """Token bucket shared by threads and coroutines.
+
+    `rate` tokens are added per second up to `capacity`. Each call to `acquire`/`acquire_async`
+    reserves one token and waits until it is available, so callers are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token (possibly going negative) and return how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
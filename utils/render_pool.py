@@ -0,0 +1,36 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================
+#    Chart rendering pool
+# ============================
+
+# Charts are loaded and rendered on these threads so that a slow render never blocks the
+# event loop; the small pool also caps how many figures are in memory at the same time.
+
+RENDER_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+        return _executor
+
+
+async def run_render(func, *args):
+    """Run `func(*args)` on the render pool and wait for its result without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+
+
+def shutdown_render_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
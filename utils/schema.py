@@ -0,0 +1,110 @@
+import threading
+from utils.db import db_connection
+from utils.daily_sentiment import create_daily_sentiment_table, has_daily_sentiment, rebuild_daily_sentiment
+
+# ============================
+#    Article tables schema
+# ============================
+
+ARTICLE_TABLES = ['nvidia_news_api', 'nvidia_fintimes_scrape', 'nvidia_originalsite_scrape']
+ARTICLE_COLUMNS = ['title', 'link', 'date', 'source', 'text', 'sentiment', 'sentiment_score']
+
+# Re-ingested articles replace the stored version, unchanged rows are not rewritten
+ARTICLE_UPSERT = '''(link) DO UPDATE SET
+    title = EXCLUDED.title, date = EXCLUDED.date, source = EXCLUDED.source, text = EXCLUDED.text,
+    sentiment = EXCLUDED.sentiment, sentiment_score = EXCLUDED.sentiment_score
+    WHERE ({table}.title, {table}.date, {table}.text, {table}.sentiment_score)
+        IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.date, EXCLUDED.text, EXCLUDED.sentiment_score)'''
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def article_upsert(table):
+    """ON CONFLICT clause for BulkWriter when writing into an article table."""
+    return ARTICLE_UPSERT.format(table=table)
+
+
+def _has_index(cur, index_name):
+    cur.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", (index_name,))
+    return cur.fetchone() is not None
+
+
+def dedupe_article_table(conn, table):
+    """Delete duplicate links, keeping the row with the latest date. Returns the number of rows removed.
+
+    The tables have no insertion order (ctid is only a physical location), so among rows of a
+    link with the same date an arbitrary one is kept.
+    """
+    cur = conn.cursor()
+    cur.execute(f'''DELETE FROM {table} WHERE ctid IN (
+        SELECT ctid FROM (
+            SELECT ctid, ROW_NUMBER() OVER (PARTITION BY link ORDER BY date DESC NULLS LAST) AS rank
+            FROM {table} WHERE link IS NOT NULL
+        ) AS ranked WHERE rank > 1)''')
+    removed = cur.rowcount
+    conn.commit()
+    cur.close()
+    return removed
+
+
+def migrate_article_table(conn, table):
+    """Bring an article table to the current schema; safe to run any number of times.
+
+    Adds the generated `day` column and its index, removes duplicate links and adds the
+    unique key on `link` used by the upserts, then (re)builds the daily_sentiment rows of the
+    table when they are missing or stale. Returns the number of duplicates removed.
+    """
+    cur = conn.cursor()
+    cur.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+        title TEXT,
+        link TEXT,
+        date TIMESTAMP,
+        source TEXT,
+        text TEXT,
+        sentiment TEXT,
+        sentiment_score NUMERIC,
+        day DATE GENERATED ALWAYS AS (date::date) STORED
+    )''')
+    cur.execute(f'''ALTER TABLE {table}
+        ADD COLUMN IF NOT EXISTS day DATE GENERATED ALWAYS AS (date::date) STORED''')
+    cur.execute(f'''CREATE INDEX IF NOT EXISTS {table}_day_idx ON {table} (day)''')
+    conn.commit()
+
+    removed = 0
+    if not _has_index(cur, f'{table}_link_key'):
+        removed = dedupe_article_table(conn, table)
+        cur.execute(f'''CREATE UNIQUE INDEX IF NOT EXISTS {table}_link_key ON {table} (link)''')
+        conn.commit()
+    cur.close()
+
+    create_daily_sentiment_table(conn)
+    if removed or not has_daily_sentiment(conn, table):
+        rebuild_daily_sentiment(conn, table)
+    return removed
+
+
+def ensure_article_table(conn, table):
+    """Run the migration of `table` once per process (called at the start of every ingestion)."""
+    with _ensured_lock:
+        if table in _ensured:
+            return
+        migrate_article_table(conn, table)
+        _ensured.add(table)
+
+
+def migrate_schema():
+    """Migrate every article table and return the duplicates removed per table."""
+    removed = {}
+    with db_connection() as conn:
+        for table in ARTICLE_TABLES:
+            removed[table] = migrate_article_table(conn, table)
+            with _ensured_lock:
+                _ensured.add(table)
+    return removed
+
+
+if __name__ == "__main__":
+    # python -m utils.schema : migrate the tables and clean the duplicates left by earlier runs
+    for table, count in migrate_schema().items():
+        print(f"{table}: {count} duplicate rows removed")
@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from textblob import TextBlob
+from utils.load_secrets import load_secrets
+from utils.settings import MAIN_DIR
+from utils.sentiment_cache import SentimentCache, text_key, DEFAULT_MAX_ENTRIES
+from utils.metrics import timed, SCORING_SECONDS, SCORED_TEXTS
+
+# ============================
+#    Sentiment scoring service
+# ============================
+
+CHUNK_SIZE = 32       # Texts sent to a worker process at once
+MIN_PARALLEL = 16     # Smaller batches are scored inline, the process hop would cost more
+DEFAULT_CACHE_PATH = os.path.join(MAIN_DIR, ".cache", "sentiment_cache.sqlite")
+
+
+def sentiment_label(score):
+    return 'Positive' if score > 0 else 'Negative' if score < 0 else 'Neutral'
+
+
+def textblob_polarity(texts):
+    """Reference scorer: TextBlob (pattern lexicon) polarity of every text."""
+    return [TextBlob(text or '').sentiment.polarity for text in texts]
+
+
+# Scorer name -> (function scoring a list of texts, version string). Functions must be
+# picklable (module level) to run in the process pool.
+SCORERS = {
+    'textblob': (textblob_polarity, f"textblob-{metadata.version('textblob')}"),
+}
+
+
+def register_scorer(name, func, version):
+    """Add a scorer that can be selected with the `scorer` key of the [sentiment] section."""
+    SCORERS[name] = (func, version)
+
+
+class SentimentScorer:
+    """Score batches of texts, spreading large batches over a pool of worker processes.
+
+    With a SentimentCache, texts already scored by the same scorer version are not scored again.
+    """
+
+    def __init__(self, scorer='textblob', workers=None, chunk_size=CHUNK_SIZE, min_parallel=MIN_PARALLEL,
+                 cache=None):
+        self.name = scorer
+        self.func, self.version = SCORERS[scorer]
+        self.cache = cache
+        self.workers = workers if workers is not None else max(1, (os.cpu_count() or 2) - 1)
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the pool is created from a job thread of a process that
+                # holds other threads, DB pools and locks, which a forked child would inherit
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def scores(self, texts):
+        """Return the polarity of every text, in order."""
+        texts = list(texts)
+        if self.cache is None:
+            return self._compute(texts)
+
+        keys = [text_key(text, self.version) for text in texts]
+        known = self.cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in known and key not in missing:
+                missing[key] = text
+        if missing:
+            new_scores = dict(zip(missing, self._compute(list(missing.values()))))
+            self.cache.put_many(new_scores.items())
+            known.update(new_scores)
+        return [known[key] for key in keys]
+
+    def _compute(self, texts):
+        SCORED_TEXTS.labels(scorer=self.name).inc(len(texts))
+        with timed(SCORING_SECONDS, scorer=self.name):
+            if self.workers <= 1 or len(texts) < self.min_parallel:
+                return self.func(texts)
+            chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+            results = []
+            for chunk_scores in self._get_pool().map(self.func, chunks):
+                results.extend(chunk_scores)
+            return results
+
+    def score(self, texts):
+        """Return (score, label) for every text, in order."""
+        return [(score, sentiment_label(score)) for score in self.scores(texts)]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    """Process-wide scorer configured from the optional [sentiment] section.
+
+    Keys: `scorer`, `workers`, `cache` (default true), `cache_path` and `cache_max_entries`.
+    """
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            config = load_secrets().get('sentiment', {})
+            cache = None
+            if config.get('cache', True):
+                cache = SentimentCache(config.get('cache_path', DEFAULT_CACHE_PATH),
+                                       config.get('cache_max_entries', DEFAULT_MAX_ENTRIES))
+            _scorer = SentimentScorer(config.get('scorer', 'textblob'), config.get('workers'), cache=cache)
+        return _scorer
+
+
+def score_texts(texts):
+    """Shortcut for get_scorer().score(texts), used by the ingestion modules."""
+    return get_scorer().score(texts)
+
+
+def sentiment_cache_stats():
+    """Hit/miss counters of the sentiment cache, exposed by /sentiment_cache/stats."""
+    scorer = _scorer
+    if scorer is None:
+        return {"initialized": False}
+    if scorer.cache is None:
+        return {"initialized": True, "enabled": False}
+    return {"initialized": True, "enabled": True, **scorer.cache.stats()}
+
+
+def close_scorer():
+    global _scorer
+    with _scorer_lock:
+        if _scorer is not None:
+            _scorer.close()
+            _scorer = None
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# ============================
+#    Sentiment score cache
+# ============================
+
+# Scores are stored in a local SQLite file keyed by a hash of the normalized text and the
+# scorer version, so text that comes back in later runs is never scored again. When the file
+# holds more than `max_entries` scores the least recently used ones are evicted.
+
+DEFAULT_MAX_ENTRIES = 200_000
+EVICT_TO = 0.9          # Fraction of max_entries kept after an eviction
+SQLITE_MAX_VARIABLES = 900
+
+
+def text_key(text, scorer_version):
+    normalized = " ".join((text or '').split())
+    return hashlib.sha256(f"{scorer_version}\0{normalized}".encode()).hexdigest()
+
+
+class SentimentCache:
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS scores (
+            key TEXT PRIMARY KEY,
+            score REAL NOT NULL,
+            last_used REAL NOT NULL
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self._conn.commit()
+        # Upper bound of the entries (replaced keys are counted again), exact after every recount
+        self._count = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get_many(self, keys):
+        """Return {key: score} for the keys found in the cache."""
+        found = {}
+        unique = list(set(keys))
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(unique), SQLITE_MAX_VARIABLES):
+                chunk = unique[i:i + SQLITE_MAX_VARIABLES]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, score FROM scores WHERE key IN ({marks})", chunk)
+                found.update(rows.fetchall())
+                self._conn.execute(f"UPDATE scores SET last_used = ? WHERE key IN ({marks})", [now, *chunk])
+            self._conn.commit()
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items):
+        """Store (key, score) pairs and evict the least recently used entries past max_entries.
+
+        The table is only counted when the running count passes max_entries, not on every batch.
+        """
+        now = time.time()
+        rows = [(key, score, now) for key, score in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO scores (key, score, last_used) VALUES (?, ?, ?)", rows)
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+                if self._count > self.max_entries:
+                    evicted = self._conn.execute('''DELETE FROM scores WHERE key IN (
+                        SELECT key FROM scores ORDER BY last_used LIMIT ?)''',
+                                                 (self._count - int(self.max_entries * EVICT_TO),)).rowcount
+                    self._count -= evicted
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
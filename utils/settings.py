@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from typing import Optional, get_args
+import toml
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+# ============================
+#    Typed, cached settings
+# ============================
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRETS_DIR = os.path.join(MAIN_DIR, ".secrets")
+ENV_PREFIX = "FASTAPI_SCRAPE_"   # e.g. FASTAPI_SCRAPE_DATABASE_CREDENTIALS__PASSWORD=...
+STAT_INTERVAL = 1.0              # Seconds between two mtime checks of the secrets file
+
+
+class Section(BaseModel):
+    """A keys.toml section; unknown keys are kept so that new options need no code change."""
+    model_config = ConfigDict(extra='allow')
+
+
+class DatabaseCredentials(Section):
+    username: str
+    password: Optional[str] = None
+    host: str = "localhost"
+    port: int = 5432
+    database: str
+
+
+class DatabasePool(Section):
+    pool_size: int = 5          # SQLAlchemy connections kept open
+    max_overflow: int = 10      # Extra SQLAlchemy connections allowed under load
+    pool_recycle: int = 1800    # Seconds before a SQLAlchemy connection is replaced
+    pool_timeout: int = 30      # Seconds to wait for a free SQLAlchemy connection
+    min_connections: int = 1    # psycopg2 connections opened up front
+    max_connections: int = 10   # psycopg2 connections at most
+
+
+class ResponseCache(Section):
+    max_entries: int = 128              # Responses kept (LRU)
+    directory: Optional[str] = None     # Also keep them on disk, shared between workers
+
+
+class FeatureStore(Section):
+    directory: Optional[str] = None     # Default: .cache/features in the project folder
+    lags: int = 7                       # Lagged sentiment columns (days)
+
+
+class HttpCache(Section):
+    enabled: bool = True                # Cache and revalidate the scraped pages
+    directory: Optional[str] = None     # Default: .cache/http in the project folder
+    max_mb: float = 200                 # Disk space of the compressed pages (LRU eviction)
+
+
+class IngestionPipeline(Section):
+    queue_size: int = 64                # Items waiting between two stages (backpressure)
+    fetch_workers: Optional[int] = None # Downloads at once; default: the source's concurrency
+    parse_workers: int = 2              # Threads parsing article pages
+    score_workers: int = 1              # Threads handing batches to the sentiment scorer
+    score_batch: int = 64               # Texts scored together
+    score_max_wait: float = 0.2         # Seconds to wait for a full scoring batch
+
+
+class Settings(Section):
+    database_credentials: Optional[DatabaseCredentials] = None
+    database_pool: DatabasePool = DatabasePool()
+    response_cache: ResponseCache = ResponseCache()
+    feature_store: FeatureStore = FeatureStore()
+    http_cache: HttpCache = HttpCache()
+    pipeline: IngestionPipeline = IngestionPipeline()
+    original_nvidia_site: Section = Section()
+    fin_times_site: Section = Section()
+    api_finhub: Section = Section()
+
+
+_lock = threading.Lock()
+_cache = {}   # file name -> (mtime, last stat time, raw dict, Settings)
+
+
+def _model(annotation):
+    """The Section class of a Settings field (unwrapping Optional), or None."""
+    for candidate in (annotation, *get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+def _is_str_field(section, key):
+    """True when `key` of `section` is declared as a string (e.g. a password or a database name)."""
+    field = Settings.model_fields.get(section)
+    model = _model(field.annotation) if field is not None else None
+    if model is None or key not in model.model_fields:
+        return False
+    annotation = model.model_fields[key].annotation
+    return str in (annotation, *get_args(annotation))
+
+
+def _parse_env_value(value):
+    """Read an environment value with TOML typing (numbers, booleans), falling back to a plain string."""
+    try:
+        return toml.loads(f"value = {value}")["value"]
+    except toml.TomlDecodeError:
+        return value
+
+
+def _env_overrides():
+    """Collect FASTAPI_SCRAPE_<SECTION>__<KEY> variables as {section: {key: value}}.
+
+    String fields keep the raw value, so PASSWORD=123456 stays "123456"; the other values are
+    read with TOML typing, which also types the keys that no Section declares.
+    """
+    overrides = {}
+    for name, value in os.environ.items():
+        if not name.startswith(ENV_PREFIX) or "__" not in name:
+            continue
+        section, key = name[len(ENV_PREFIX):].lower().split("__", 1)
+        overrides.setdefault(section, {})[key] = value if _is_str_field(section, key) else _parse_env_value(value)
+    return overrides
+
+
+def _load(file_path):
+    overrides = _env_overrides()
+    try:
+        with open(file_path, 'r') as file:
+            raw = toml.load(file)
+    except FileNotFoundError:
+        if not overrides:
+            raise Exception("Secrets file not found. Make sure the keys.toml file is in the .secrets directory.")
+        raw = {}
+    except toml.TomlDecodeError:
+        raise Exception("Error decoding the keys.toml file. Ensure it is formatted correctly.")
+
+    for section, values in overrides.items():
+        raw.setdefault(section, {}).update(values)
+
+    try:
+        settings = Settings(**raw)
+    except ValidationError as e:
+        raise Exception(f"Invalid settings in keys.toml: {e}")
+    return raw, settings
+
+
+def _mtime(file_path):
+    try:
+        return os.stat(file_path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _get(file_name):
+    file_path = os.path.join(SECRETS_DIR, file_name)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(file_name)
+        if entry is not None and now - entry[1] < STAT_INTERVAL:
+            return entry
+        mtime = _mtime(file_path)
+        if entry is not None and entry[0] == mtime:
+            entry = (mtime, now, entry[2], entry[3])
+        else:
+            raw, settings = _load(file_path)
+            entry = (mtime, now, raw, settings)
+        _cache[file_name] = entry
+        return entry
+
+
+def get_settings(file_name="keys.toml"):
+    """Return the typed settings, parsed once and reloaded only when the file changes."""
+    return _get(file_name)[3]
+
+
+def get_raw_settings(file_name="keys.toml"):
+    """Same as get_settings() but as the plain nested dict read from the TOML file."""
+    return _get(file_name)[2]
+
+
+def reload_settings():
+    """Forget the cached settings so the next call parses the file and environment again."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,70 @@
+import pandas as pd
+import yfinance as yf
+from .metrics import timed, FETCH_SECONDS, FETCH_ERRORS
+
+# ============================
+#    Stock data providers
+# ============================
+
+# A provider returns daily bars in long format, one row per (symbol, date), with the columns
+# below. The ingestion only depends on this interface, so tests and benchmarks can swap Yahoo
+# for a local fixture.
+LONG_COLUMNS = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']
+
+
+class YahooProvider:
+    """Daily bars from Yahoo Finance, all symbols fetched with one batched yf.download call."""
+
+    def history(self, symbols, start_date, end_date):
+        with timed(FETCH_SECONDS, FETCH_ERRORS, source='stock_values'):
+            frame = yf.download(list(symbols), start=start_date, end=end_date, interval='1d',
+                                group_by='ticker', auto_adjust=True, threads=True, progress=False)
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=LONG_COLUMNS)
+        if not isinstance(frame.columns, pd.MultiIndex):
+            frame = pd.concat({symbols[0]: frame}, axis=1)
+
+        parts = []
+        for symbol in frame.columns.get_level_values(0).unique():
+            bars = frame[symbol].dropna(how='any', subset=['Open', 'High', 'Low', 'Close'])
+            parts.append(pd.DataFrame({
+                'symbol': symbol,
+                'date': bars.index.date,
+                'open': bars['Open'].to_numpy(dtype=float),
+                'high': bars['High'].to_numpy(dtype=float),
+                'low': bars['Low'].to_numpy(dtype=float),
+                'close': bars['Close'].to_numpy(dtype=float),
+                'volume': bars['Volume'].fillna(0).to_numpy(dtype=float),
+            }))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=LONG_COLUMNS)
+
+
+class FixtureProvider:
+    """Daily bars served from a long-format DataFrame or CSV file (columns LONG_COLUMNS)."""
+
+    def __init__(self, data):
+        if isinstance(data, str):
+            data = pd.read_csv(data)
+        data = data.copy()
+        data['date'] = pd.to_datetime(data['date']).dt.date
+        self.data = data[LONG_COLUMNS]
+
+    def history(self, symbols, start_date, end_date):
+        start = pd.to_datetime(start_date).date()
+        end = pd.to_datetime(end_date).date()
+        # Same convention as yfinance: `end` is exclusive
+        mask = self.data['symbol'].isin(list(symbols)) & (self.data['date'] >= start) & (self.data['date'] < end)
+        return self.data[mask].reset_index(drop=True)
+
+
+_provider = YahooProvider()
+
+
+def get_stock_provider():
+    return _provider
+
+
+def set_stock_provider(provider):
+    """Replace the provider used by the stock ingestion (e.g. FixtureProvider in tests)."""
+    global _provider
+    _provider = provider
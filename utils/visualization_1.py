@@ -1,104 +1,116 @@
-import matplotlib.pyplot as plt
 from io import BytesIO
 import pandas as pd
-from .helpers import pandas_db_connection, minmax_normalize
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .helpers import minmax_normalize
+from .data_loader import load_stock_values, load_daily_sentiment
+from .metrics import timed_step
 
 # ============================
 #    Visualization func 1
 # ============================
-def get_visualization_1(rescale: bool) -> BytesIO:
-    """Generates the NVIDIA Stock vs Sentiment Scores plot.
-
-    Args:
-        normalize (bool): Whether to normalize sentiment scores.
-
-    Returns:
-        BytesIO: The image data in memory as a PNG.
-    """
-    conn = pandas_db_connection()
-
-    # Query to get NVIDIA stock data
-    query_nvidia_stock = "SELECT date, close FROM nvda_stock_values"
-    df_nvidia_stock = pd.read_sql_query(query_nvidia_stock, conn)
-
-    # Query to get sentiment scores from all the sources
-    query_nvidia_news_api = "SELECT date, sentiment_score FROM nvidia_news_api"
-    query_nvidia_original = "SELECT date, sentiment_score FROM nvidia_originalsite_scrape"
-    query_ft_nvidia = "SELECT date, sentiment_score FROM nvidia_fintimes_scrape"
 
-    df_news_api = pd.read_sql_query(query_nvidia_news_api, conn)
-    df_original = pd.read_sql_query(query_nvidia_original, conn)
-    df_ft = pd.read_sql_query(query_ft_nvidia, conn)
+# The figure is drawn with the object-oriented API on its own Agg canvas: no pyplot global
+# state is involved, so renders can run in parallel threads and nothing is left behind.
 
-    # Ensure 'date' is not the index before converting to datetime
-    for df in [df_nvidia_stock, df_news_api, df_original, df_ft]:
-        if df.index.name == 'date':
-            df.reset_index(inplace=True)
+IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml', 'webp': 'image/webp'}
 
-    # Convert 'date' columns to datetime format and extract year-month-day
-    df_nvidia_stock['date'] = pd.to_datetime(df_nvidia_stock['date']).dt.date
-    df_news_api['date'] = pd.to_datetime(df_news_api['date']).dt.date
-    df_original['date'] = pd.to_datetime(df_original['date']).dt.date
-    df_ft['date'] = pd.to_datetime(df_ft['date']).dt.date
 
-    # Group by date and calculate the mean sentiment score, then add the source column
-    df_news_api_daily = df_news_api.groupby('date', as_index=False)['sentiment_score'].mean()
-    df_news_api_daily['source'] = 'api_news'
+def visualization_1_data(rescale=False, start_date=None, end_date=None):
+    """NVIDIA close values and the daily sentiment of every source, sorted by date."""
+    # NVIDIA close values and the daily mean sentiment scores of all the sources
+    df_nvidia_stock = load_stock_values(['NVDA'], ['close'], start_date, end_date)
+    df_sentiment = load_daily_sentiment(start_date=start_date, end_date=end_date)
 
-    df_original_daily = df_original.groupby('date', as_index=False)['sentiment_score'].mean()
-    df_original_daily['source'] = 'nvidia_original'
+    def source_scores(source, label):
+        # The rows are already daily means, relabel the source for the plot
+        df = df_sentiment.loc[df_sentiment['source'] == source, ['date', 'sentiment_score']].copy()
+        df['source'] = label
+        return df
 
-    df_ft_daily = df_ft.groupby('date', as_index=False)['sentiment_score'].mean()
-    df_ft_daily['source'] = 'ft_nvidia'
+    df_news_api_daily = source_scores('api_news', 'api_news')
+    df_original_daily = source_scores('original', 'nvidia_original')
+    df_ft_daily = source_scores('ft', 'ft_nvidia')
 
     # Conditionally normalize the sentiment scores
     if rescale:
         df_news_api_daily = minmax_normalize(df_news_api_daily, 'sentiment_score')
         df_original_daily = minmax_normalize(df_original_daily, 'sentiment_score')
-        df_ft_daily = minmax_normalize(df_ft_daily, 'sentiment_score')    
+        df_ft_daily = minmax_normalize(df_ft_daily, 'sentiment_score')
     # Concatenate all the sentiment DataFrames
     df_sentiments = pd.concat([df_news_api_daily, df_original_daily, df_ft_daily])
 
     # Sort by date
     df_sentiments.sort_values(by='date', inplace=True)
     df_nvidia_stock.sort_values(by='date', inplace=True)
+    return df_nvidia_stock, df_sentiments
 
-    # Plotting the data
-    fig, ax1 = plt.subplots(figsize=(10, 6))
-
-    # Stock prices on the first Y-axis
-    ax1.plot(df_nvidia_stock['date'], df_nvidia_stock['close'], color='b', label='NVIDIA Stock Price')
-    ax1.set_xlabel('Date')
-    ax1.set_ylabel('NVIDIA Stock Price', color='b')
-
-    # Second Y-axis for sentiment scores
-    ax2 = ax1.twinx()
-    
-    # Scatter plot for each sentiment source
-    for source in df_sentiments['source'].unique():
-        source_data = df_sentiments[df_sentiments['source'] == source]
-        if source == 'api_news':
-            ax2.plot(source_data['date'], source_data['sentiment_score'], label='API Sentiment', color='red', alpha=0.5)
-        elif source == 'nvidia_original':
-            ax2.plot(source_data['date'], source_data['sentiment_score'], label='NVIDIA site Sentiment', color='green', alpha=0.5)
-        elif source == 'ft_nvidia':
-            ax2.plot(source_data['date'], source_data['sentiment_score'], label='FT Sentiment', color='black', alpha=0.5)
-    
-    if rescale:
-        ax2.set_ylabel('Sentiment Score (rescale)', color='r')
-    else: 
-        ax2.set_ylabel('Sentiment Score', color='r')
 
-    # Tight layout for better spacing
-    fig.tight_layout()
+def render_visualization_1(df_nvidia_stock, df_sentiments, rescale=False, format='png', dpi=100,
+                           width=10.0, height=6.0) -> bytes:
+    """Draw the plot of the given data and return the encoded image."""
+    if format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format {format}, expected one of {', '.join(IMAGE_FORMATS)}")
 
-    # Set the title and add a legend
-    plt.title("NVIDIA Stock Price vs Sentiment Scores (Rescaled)")
-    ax2.legend(loc='upper left')
+    # Plotting the data
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        ax1 = fig.add_subplot()
+
+        # Stock prices on the first Y-axis
+        ax1.plot(df_nvidia_stock['date'], df_nvidia_stock['close'], color='b', label='NVIDIA Stock Price')
+        ax1.set_xlabel('Date')
+        ax1.set_ylabel('NVIDIA Stock Price', color='b')
+
+        # Second Y-axis for sentiment scores
+        ax2 = ax1.twinx()
+
+        # Scatter plot for each sentiment source
+        for source in df_sentiments['source'].unique():
+            source_data = df_sentiments[df_sentiments['source'] == source]
+            if source == 'api_news':
+                ax2.plot(source_data['date'], source_data['sentiment_score'], label='API Sentiment', color='red', alpha=0.5)
+            elif source == 'nvidia_original':
+                ax2.plot(source_data['date'], source_data['sentiment_score'], label='NVIDIA site Sentiment', color='green', alpha=0.5)
+            elif source == 'ft_nvidia':
+                ax2.plot(source_data['date'], source_data['sentiment_score'], label='FT Sentiment', color='black', alpha=0.5)
+
+        if rescale:
+            ax2.set_ylabel('Sentiment Score (rescale)', color='r')
+        else:
+            ax2.set_ylabel('Sentiment Score', color='r')
+
+        # Tight layout for better spacing
+        fig.tight_layout()
+
+        # Set the title and add a legend
+        ax2.set_title("NVIDIA Stock Price vs Sentiment Scores (Rescaled)")
+        ax2.legend(loc='upper left')
+
+        # Encode the plot in memory
+        buf = BytesIO()
+        fig.savefig(buf, format=format)
+        return buf.getvalue()
+    finally:
+        # Drop the artists right away instead of waiting for the garbage collector
+        fig.clear()
+
+
+def get_visualization_1(rescale: bool, start_date=None, end_date=None, format='png', dpi=100,
+                        width=10.0, height=6.0) -> BytesIO:
+    """Generates the NVIDIA Stock vs Sentiment Scores plot.
 
-    # Save the plot to a BytesIO object
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
+    Args:
+        rescale (bool): Whether to rescale sentiment scores between -1 and 1.
+        start_date, end_date (str): Optional first and last day plotted.
+        format (str): png, svg or webp.
+        dpi, width, height: Resolution and size in inches of the image.
 
-    return buf
+    Returns:
+        BytesIO: The image data in memory.
+    """
+    with timed_step('visualization_1', 'load'):
+        df_nvidia_stock, df_sentiments = visualization_1_data(rescale, start_date, end_date)
+    with timed_step('visualization_1', 'render'):
+        return BytesIO(render_visualization_1(df_nvidia_stock, df_sentiments, rescale, format, dpi, width, height))
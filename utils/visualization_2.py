@@ -1,120 +1,118 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import sys
 import plotly.graph_objects as go
-from .helpers import pandas_db_connection
+import plotly.io as pio
+from .data_loader import load_stock_values
+from .downsample import lttb_indices
+from .metrics import timed_step
 
 # ============================
-#    Visualization func 1
+#    Visualization func 2
 # ============================
-def get_visualization_2():
-    api_apple_query = '''SELECT * FROM aapl_stock_values;'''
-    api_amd_query = '''SELECT * FROM amd_stock_values;'''
-    api_nvidia_query = '''SELECT * FROM nvda_stock_values;'''
-
-    conn = pandas_db_connection()
-
-    #import dataframes from the database
-    apple_values_df = pd.read_sql(api_apple_query, conn)
-    amd_values_df = pd.read_sql(api_amd_query, conn)
-    nvidia_values_df = pd.read_sql(api_nvidia_query, conn)
-
-    #plot the graphs for the mean values of the stock data, (high+low)/2, in an interacting graph using plotly
-    nvidia_mean=nvidia_values_df[['high','low']].mean(axis=1)
-    amd_mean = amd_values_df[['high', 'low']].mean(axis=1)
-    apple_mean = apple_values_df[['high', 'low']].mean(axis=1)
-
-    fig1=go.Figure()
-    # NVIDIA
-    fig1.add_trace(go.Scatter(
-        x=nvidia_values_df['date'],
-        y=nvidia_mean,
-        mode='markers',
-        name='NVIDIA',
-        line=dict(color='green', width=5),
-        hovertemplate=(
-            '<b>Date:</b> %{x}<br>' +  # Display Date
-            '<b>Mean Value:</b> $%{y}<br>' +  # Display Mean with dollar sign
-            '<b>Open:</b> $%{customdata[0]}<br>' +  # Display Open with dollar sign
-            '<b>High:</b> $%{customdata[1]}<br>' +  # Display High with dollar sign
-            '<b>Low:</b> $%{customdata[2]}<br>' +  # Display Low with dollar sign
-            '<b>Close:</b> $%{customdata[3]}<br>' +  # Display Close with dollar sign
-            '<extra></extra>'
-        ),
-        # Round the custom data values to 2 decimal places
-        customdata=nvidia_values_df[['open', 'high', 'low', 'close']].round(2).values
-    ))
 
-    fig1.add_trace(go.Scatter(
-        x=nvidia_values_df['date'],
-        y=nvidia_mean,
-        mode='lines',
-        line=dict(color='green', width=1),
-        showlegend=False
-    ))
+# The figure is returned as a servable artifact: Plotly JSON (for a client-side
+# Plotly.newPlot), a self-contained HTML page, or a static image exported with kaleido.
+# Every series is downsampled with LTTB to about one point per horizontal pixel.
 
-    # AMD 
-    fig1.add_trace(go.Scatter(
-        x=amd_values_df['date'],
-        y=amd_mean,
-        mode='markers',
-        name='AMD',
-        line=dict(color='orange', width=5),
-        hovertemplate=(
-            '<b>Date:</b> %{x}<br>' +
-            '<b>Mean Value:</b> $%{y}<br>' +
-            '<b>Open:</b> $%{customdata[0]}<br>' +
-            '<b>High:</b> $%{customdata[1]}<br>' +
-            '<b>Low:</b> $%{customdata[2]}<br>' +
-            '<b>Close:</b> $%{customdata[3]}<br>' +
-            '<extra></extra>'
-        ),
-        customdata=amd_values_df[['open', 'high', 'low', 'close']].round(2).values
-    ))
+FIGURE_FORMATS = {
+    'json': 'application/json',
+    'html': 'text/html',
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+}
 
-    fig1.add_trace(go.Scatter(
-        x=amd_values_df['date'],
-        y=amd_mean,
-        mode='lines',
-        line=dict(color='orange', width=1),
-        showlegend=False
-    ))
+# Symbol, legend name and color of every company
+STOCKS = [('NVDA', 'NVIDIA', 'green'), ('AMD', 'AMD', 'orange'), ('AAPL', 'Apple', 'grey')]
+
+HOVER_TEMPLATE = (
+    '<b>Date:</b> %{x}<br>' +  # Display Date
+    '<b>Mean Value:</b> $%{y}<br>' +  # Display Mean with dollar sign
+    '<b>Open:</b> $%{customdata[0]}<br>' +  # Display Open with dollar sign
+    '<b>High:</b> $%{customdata[1]}<br>' +  # Display High with dollar sign
+    '<b>Low:</b> $%{customdata[2]}<br>' +  # Display Low with dollar sign
+    '<b>Close:</b> $%{customdata[3]}<br>' +  # Display Close with dollar sign
+    '<extra></extra>'
+)
 
-    # Apple
-    fig1.add_trace(go.Scatter(
-        x=apple_values_df['date'],
-        y=apple_mean,
+
+def _add_stock_traces(fig, values_df, name, color, max_points):
+    #plot the mean values of the stock data, (high+low)/2, as markers joined by a thin line
+    values_df = values_df.sort_values(by='date')
+    mean = values_df[['high', 'low']].mean(axis=1).to_numpy()
+    kept = lttb_indices(values_df['date'].to_numpy(), mean, max_points)
+    dates = values_df['date'].to_numpy()[kept]
+    mean = mean[kept]
+
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=mean,
         mode='markers',
-        name='Apple',
-        line=dict(color='grey', width=5),
-        hovertemplate=(
-            '<b>Date:</b> %{x}<br>' +
-            '<b>Mean Value:</b> $%{y}<br>' +
-            '<b>Open:</b> $%{customdata[0]}<br>' +
-            '<b>High:</b> $%{customdata[1]}<br>' +
-            '<b>Low:</b> $%{customdata[2]}<br>' +
-            '<b>Close:</b> $%{customdata[3]}<br>' +
-            '<extra></extra>'
-        ),
-        customdata=apple_values_df[['open', 'high', 'low', 'close']].round(2).values
+        name=name,
+        line=dict(color=color, width=5),
+        hovertemplate=HOVER_TEMPLATE,
+        # Round the custom data values to 2 decimal places
+        customdata=values_df[['open', 'high', 'low', 'close']].round(2).to_numpy()[kept]
     ))
 
-    fig1.add_trace(go.Scatter(
-        x=apple_values_df['date'],
-        y=apple_mean,
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=mean,
         mode='lines',
-        line=dict(color='grey', width=1),
+        line=dict(color=color, width=1),
         showlegend=False
     ))
 
+
+def build_visualization_2(start_date=None, end_date=None, width=1000, height=600):
+    """The interactive comparison of the NVIDIA, AMD and Apple mean stock values, as a plotly Figure."""
+    #import the price columns of the three companies from the database in one query
+    with timed_step('visualization_2', 'load'):
+        values_df = load_stock_values([symbol for symbol, _, _ in STOCKS], ['open', 'high', 'low', 'close'],
+                                      start_date, end_date)
+
+    fig = go.Figure()
+    for symbol, name, color in STOCKS:
+        _add_stock_traces(fig, values_df[values_df['symbol'] == symbol], name, color, max_points=width)
+
     # Update the layout to add y-axis label
-    fig1.update_layout(
-        xaxis_title='Date',  # Label for the x-axis 
+    fig.update_layout(
+        xaxis_title='Date',  # Label for the x-axis
         yaxis_title='Value [$]',  # Label for the y-axis
-        title='Stock Mean Values'  # Optional title for the plot
+        title='Stock Mean Values',  # Optional title for the plot
+        width=width,
+        height=height
     )
+    return fig
+
+
+def render_figure(fig, format='json'):
+    """Serialize a plotly Figure to (body bytes, media type)."""
+    if format not in FIGURE_FORMATS:
+        raise ValueError(f"Unknown figure format {format}, expected one of {', '.join(FIGURE_FORMATS)}")
+    if format == 'json':
+        body = pio.to_json(fig, validate=False).encode()
+    elif format == 'html':
+        # plotly.js is inlined so that the page also works offline
+        body = pio.to_html(fig, include_plotlyjs=True, full_html=True).encode()
+    else:
+        try:
+            body = pio.to_image(fig, format=format)
+        except Exception as e:
+            raise RuntimeError(f"Static image export failed, it needs kaleido and a Chrome install "
+                               f"(plotly_get_chrome): {e}") from e
+    return body, FIGURE_FORMATS[format]
+
+
+def get_visualization_2(format='json', start_date=None, end_date=None, width=1000, height=600):
+    """Generates the stock comparison plot of NVIDIA, AMD and Apple.
+
+    Args:
+        format (str): json (plotly figure), html (self-contained page), png, svg or webp.
+        start_date, end_date (str): Optional first and last day plotted.
+        width, height (int): Size of the figure in pixels; the series keep at most `width` points.
 
-    # Show the plot
-    fig1.show()
\ No newline at end of file
+    Returns:
+        tuple: The serialized figure (bytes) and its media type.
+    """
+    fig = build_visualization_2(start_date, end_date, width, height)
+    with timed_step('visualization_2', 'render'):
+        return render_figure(fig, format)
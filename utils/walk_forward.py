@@ -0,0 +1,101 @@
+import numpy as np
+
+# ============================
+#    Walk-forward regression
+# ============================
+
+# Ordinary least squares refitted at every step of a backtest without refitting from scratch:
+# X'X and X'y are kept up to date with one block update for the rows entering (and, for a
+# rolling window, leaving) the training window, and the coefficients are solved from these
+# k x k normal equations. A step then costs O(horizon k^2) plus one small solve instead of a
+# least squares fit over the whole window, so the gain grows with the window (see
+# benchmarks/bench_walk_forward.py; with small windows both take about the same time).
+
+REFRESH_EVERY = 1000   # Rebuild the sums from scratch every N steps to bound the rounding drift
+
+
+def _with_intercept(X):
+    return np.column_stack([np.ones(len(X)), X])
+
+
+def _solve(xtx, xty):
+    try:
+        return np.linalg.solve(xtx, xty)
+    except np.linalg.LinAlgError:
+        # Singular when a feature is constant over the window (e.g. a source without articles):
+        # minimum-norm solution, like LinearRegression
+        return np.linalg.lstsq(xtx, xty, rcond=None)[0]
+
+
+def walk_forward(X, y, window, horizon=1, expanding=False, coefficients=False):
+    """Walk-forward backtest of a linear regression.
+
+    The model is fitted on `window` rows, predicts the next `horizon` rows, then the window
+    moves `horizon` rows forward (or only grows, with `expanding`). Returns the out-of-sample
+    predictions (NaN for the first `window` rows) and the list of steps as
+    (train_start, train_end, test_start, test_end) row ranges, ends exclusive. With
+    `coefficients`, the (intercept, *slopes) of every step are returned as a third item.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if not 2 <= window < n:
+        raise ValueError(f"The training window must be between 2 and {n - 1} days, got {window}")
+    if horizon < 1:
+        raise ValueError("The horizon must be at least 1 day")
+
+    Z = _with_intercept(X)
+    predictions = np.full(n, np.nan)
+    steps = []
+    betas = []
+
+    train_start, train_end = 0, window
+    xtx = Z[:window].T @ Z[:window]
+    xty = Z[:window].T @ y[:window]
+    for step, test_start in enumerate(range(window, n, horizon)):
+        if step and step % REFRESH_EVERY == 0:
+            xtx = Z[train_start:train_end].T @ Z[train_start:train_end]
+            xty = Z[train_start:train_end].T @ y[train_start:train_end]
+
+        beta = _solve(xtx, xty)
+        betas.append(beta)
+        test_end = min(n, test_start + horizon)
+        test = Z[test_start:test_end]
+        predictions[test_start:test_end] = test @ beta
+        steps.append((train_start, train_end, test_start, test_end))
+
+        # Block updates: the tested rows join the training window, the oldest ones leave it
+        xtx += test.T @ test
+        xty += test.T @ y[test_start:test_end]
+        train_end = test_end
+        if not expanding and train_end - window > train_start:
+            old = Z[train_start:train_end - window]
+            xtx -= old.T @ old
+            xty -= old.T @ y[train_start:train_end - window]
+            train_start = train_end - window
+
+    if coefficients:
+        return predictions, steps, np.array(betas)
+    return predictions, steps
+
+
+def refit_walk_forward(X, y, window, horizon=1, expanding=False, coefficients=False):
+    """Same backtest refitting every step from scratch; reference for tests and benchmarks.
+
+    With `coefficients`, returns (predictions, coefficients of every step).
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    Z = _with_intercept(X)
+    predictions = np.full(n, np.nan)
+    betas = []
+    for test_start in range(window, n, horizon):
+        train_start = 0 if expanding else test_start - window
+        beta = np.linalg.lstsq(Z[train_start:test_start], y[train_start:test_start], rcond=None)[0]
+        betas.append(beta)
+        test_end = min(n, test_start + horizon)
+        predictions[test_start:test_end] = Z[test_start:test_end] @ beta
+    if coefficients:
+        return predictions, np.array(betas)
+    return predictions